@@ -0,0 +1,74 @@
+"""
+Per-call overhead of the database layer: a fresh connection per call
+(the old get_db) versus the pooled ConnectionManager.
+
+    python -m benchmarks.bench_db [iterations]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_tmp = tempfile.mkdtemp(prefix="bunny_bench_")
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench")
+os.environ.setdefault("COHERE_API_KEY", "bench")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/bench.db"
+
+from src import database  # noqa: E402
+
+DB_PATH = os.environ["DATABASE_URL"].replace("sqlite:///", "")
+
+
+def legacy_get_db() -> sqlite3.Connection:
+    """The pre-pool get_db: mkdir, connect and PRAGMAs on every call"""
+    Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    return conn
+
+
+def legacy_get_user_stats(user_id: int):
+    with legacy_get_db() as conn:
+        row = conn.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        return dict(row) if row else None
+
+
+def legacy_add_points(user_id: int, points: int):
+    with legacy_get_db() as conn:
+        conn.execute("UPDATE users SET points = points + ? WHERE user_id = ?", (points, user_id))
+        conn.commit()
+
+
+def timeit(label: str, fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i % 1000)
+    per_call = (time.perf_counter() - start) / iterations * 1e6
+    print(f"{label:<32} {per_call:9.1f} µs/call")
+    return per_call
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    database.init_db()
+    for user_id in range(1000):
+        database.update_user_activity(user_id, f"user{user_id}", "Bench", None)
+
+    print(f"{iterations} iterations, db at {DB_PATH}\n")
+    before = timeit("read  (connect per call)", legacy_get_user_stats, iterations)
+    after = timeit("read  (pooled)", database.get_user_stats, iterations)
+    print(f"{'':<32} {before / after:9.1f}x faster\n")
+
+    before = timeit("write (connect per call)", lambda uid: legacy_add_points(uid, 1), iterations)
+    after = timeit("write (pooled)", lambda uid: database.add_points(uid, 1), iterations)
+    print(f"{'':<32} {before / after:9.1f}x faster")
+
+    database.close_db()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Leaderboard queries at 1M users: SQLite without and with the points index,
+and the in-memory Leaderboard.
+
+    python -m benchmarks.bench_leaderboard [users]
+"""
+import random
+import sqlite3
+import sys
+import time
+
+from src.services.leaderboard import Leaderboard
+
+TOP_SQL = "SELECT user_id, points FROM users ORDER BY points DESC LIMIT 10"
+RANK_SQL = "SELECT COUNT(*) + 1 FROM users WHERE points > (SELECT points FROM users WHERE user_id = ?)"
+
+
+def timeit(label: str, fn, iterations: int):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    per_call = (time.perf_counter() - start) / iterations * 1e6
+    print(f"{label:<36} {per_call:12.1f} µs/op")
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(42)
+    rows = [(user_id, rng.randint(0, 5000)) for user_id in range(1, users + 1)]
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE users (user_id INTEGER PRIMARY KEY, points INTEGER DEFAULT 0)")
+    conn.executemany("INSERT INTO users VALUES (?, ?)", rows)
+    conn.commit()
+    print(f"{users} users\n")
+
+    probe = lambda i: (i * 7919) % users + 1  # noqa: E731
+    timeit("sqlite top-10 (no index)", lambda i: conn.execute(TOP_SQL).fetchall(), 5)
+    timeit("sqlite rank (no index)", lambda i: conn.execute(RANK_SQL, (probe(i),)).fetchone(), 5)
+
+    start = time.perf_counter()
+    conn.execute("CREATE INDEX idx_users_points ON users(points DESC)")
+    print(f"{'create points index':<36} {(time.perf_counter() - start) * 1e3:12.1f} ms")
+    timeit("sqlite top-10 (indexed)", lambda i: conn.execute(TOP_SQL).fetchall(), 1000)
+    timeit("sqlite rank (indexed)", lambda i: conn.execute(RANK_SQL, (probe(i),)).fetchone(), 50)
+
+    board = Leaderboard()
+    start = time.perf_counter()
+    board.load(rows)
+    print(f"{'in-memory load':<36} {(time.perf_counter() - start) * 1e3:12.1f} ms")
+    timeit("in-memory top-10", lambda i: board.top(10), 10000)
+    timeit("in-memory rank", lambda i: board.rank(probe(i)), 100000)
+    timeit("in-memory add_points", lambda i: board.add(probe(i), 10), 100000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+MarkdownV2 escaping: the old per-character generator, a str.translate table
+and the replace chain in src.utils; then a full /leaderboard and /profile render the old way (escape everything
+on every call) against the pre-escaped templates in src.messages.
+
+    python -m benchmarks.bench_markdown [iterations]
+"""
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench")
+os.environ.setdefault("COHERE_API_KEY", "bench")
+
+from src import messages  # noqa: E402
+from src.utils import escape_markdown  # noqa: E402
+
+
+def legacy_escape(text: str) -> str:
+    """The old src.utils.escape_markdown"""
+    escape_chars = r"_*[]()~`>#+-=|{}.!\\"
+    return ''.join(f"\\{char}" if char in escape_chars else char for char in str(text))
+
+
+_TABLE = str.maketrans({char: f"\\{char}" for char in r"_*[]()~`>#+-=|{}.!\\"})
+
+
+def translate_escape(text: str) -> str:
+    return str(text).translate(_TABLE)
+
+
+def make_users(rng: random.Random):
+    names = ["night_owl", "Mr.Bunny", "anna-maria", "x_x_x", "(╯°□°)╯", "john.doe_99", "Ünïcødé", "carrot!", "[admin]", "zzz"]
+    return [
+        {"user_id": 10_000_000 + i, "username": rng.choice(names), "first_name": "", "last_name": "", "points": rng.randint(0, 99999)}
+        for i in range(10)
+    ]
+
+
+def legacy_leaderboard(users) -> str:
+    response = [legacy_escape("🏆 Top 10 Users")]
+    for i, user in enumerate(users, 1):
+        username = legacy_escape(user["username"])
+        response.append(legacy_escape(f"{i}. {username}: {user['points']} points"))
+    return "\n".join(response)
+
+
+def leaderboard(users) -> str:
+    response = [messages.LEADERBOARD_TITLE]
+    for i, user in enumerate(users, 1):
+        response.append(messages.LEADERBOARD_ROW.format(rank=i, name=user["username"], points=user["points"]))
+    return "\n".join(response)
+
+
+def legacy_profile(user) -> str:
+    return legacy_escape(
+        f"👤 Profile: {user['username']}\n"
+        f"🆔 ID: {user['user_id']}\n"
+        f"⭐ Points: {user['points']}\n"
+        f"✉️ Messages: 1234\n"
+        f"🏆 Achievements: 3"
+        f"\n📊 Rank: #17 of 120345"
+    )
+
+
+def profile(user) -> str:
+    return messages.PROFILE.format(
+        name=user["username"], user_id=user["user_id"], points=user["points"], messages=1234, achievements=3
+    ) + messages.PROFILE_RANK.format(rank=17, total=120345)
+
+
+def timeit(label: str, fn, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call = (time.perf_counter() - start) / iterations * 1e6
+    print(f"{label:<36} {per_call:10.2f} µs/op")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    users = make_users(random.Random(42))
+    help_source = messages.HELP.replace("\\", "")
+
+    assert escape_markdown(help_source) == legacy_escape(help_source) == translate_escape(help_source) == messages.HELP
+    assert leaderboard(users).count("\n") == legacy_leaderboard(users).count("\n")
+
+    timeit("escape help text (legacy)", lambda: legacy_escape(help_source), iterations)
+    timeit("escape help text (str.translate)", lambda: translate_escape(help_source), iterations)
+    timeit("escape help text (replace chain)", lambda: escape_markdown(help_source), iterations)
+    timeit("help text (pre-escaped)", lambda: messages.HELP, iterations)
+    print()
+    timeit("/leaderboard render (legacy)", lambda: legacy_leaderboard(users), iterations)
+    timeit("/leaderboard render (templates)", lambda: leaderboard(users), iterations)
+    print()
+    timeit("/profile render (legacy)", lambda: legacy_profile(users[0]), iterations)
+    timeit("/profile render (templates)", lambda: profile(users[0]), iterations)
+
+
+if __name__ == "__main__":
+    main()
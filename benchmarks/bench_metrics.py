@@ -0,0 +1,64 @@
+"""
+Overhead of the metrics instrumentation: a bare histogram observe, a timed
+block, and a handler call with and without @instrumented.
+
+    python -m benchmarks.bench_metrics [iterations]
+"""
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench")
+os.environ.setdefault("COHERE_API_KEY", "bench")
+
+from src.services.metrics import Histogram  # noqa: E402
+from src.services.utils import instrumented  # noqa: E402
+
+
+async def handler(update, context):
+    return None
+
+
+instrumented_handler = instrumented(handler)
+
+
+def timeit(label: str, fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call = (time.perf_counter() - start) / iterations * 1e6
+    print(f"{label:<36} {per_call:8.3f} µs/op")
+    return per_call
+
+
+async def timeit_async(label: str, fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await fn(None, None)
+    per_call = (time.perf_counter() - start) / iterations * 1e6
+    print(f"{label:<36} {per_call:8.3f} µs/op")
+    return per_call
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    histogram = Histogram("bench_seconds", "bench", ("name",))
+
+    def timed_block():
+        with histogram.time("block"):
+            pass
+
+    timeit("observe", lambda: histogram.observe(0.0123, "observe"), iterations)
+    timeit("timed block", timed_block, iterations)
+
+    async def handlers():
+        bare = await timeit_async("handler call", handler, iterations)
+        wrapped = await timeit_async("handler call (@instrumented)", instrumented_handler, iterations)
+        print(f"{'instrumentation overhead':<36} {wrapped - bare:8.3f} µs/op")
+
+    asyncio.run(handlers())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Memory and per-check cost of the GCRA limiter with 1M distinct users,
+against the old grow-forever timestamp dict from bot.RateLimiter.
+
+A simulated clock advances 1 ms per request (1000 req/s), so each user's
+limiter state expires a few seconds after their message.
+
+    python -m benchmarks.bench_rate_limiter [users]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench")
+os.environ.setdefault("COHERE_API_KEY", "bench")
+
+from src.services.rate_limiter import GCRA, RateLimiter  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class LegacyLimiter:
+    """The old bot.RateLimiter, minus the lock"""
+
+    def __init__(self, clock):
+        self.user_timestamps = {}
+        self.clock = clock
+
+    def check(self, user_id: int, cost: int = 1) -> bool:
+        now = self.clock()
+        if now - self.user_timestamps.get(user_id, 0) < 5:
+            return False
+        self.user_timestamps[user_id] = now
+        return True
+
+    def __len__(self):
+        return len(self.user_timestamps)
+
+
+def run(label: str, make_limiter, users: int):
+    print(f"\n{label}")
+
+    clock = Clock()
+    check = make_limiter(clock).check
+    start = time.perf_counter()
+    for user_id in range(1, users + 1):
+        clock.now += 0.001
+        check(user_id, 2)
+    print(f"{(time.perf_counter() - start) / users * 1e9:.0f} ns/request (incl. clock)")
+
+    clock = Clock()
+    checkpoints = {users * i // 5 for i in range(1, 6)}
+    tracemalloc.start()
+    limiter = make_limiter(clock)
+    print(f"{'users':>10} {'live keys':>10} {'MiB':>8}")
+    for user_id in range(1, users + 1):
+        clock.now += 0.001
+        limiter.check(user_id, 2)
+        if user_id in checkpoints:
+            current, _ = tracemalloc.get_traced_memory()
+            print(f"{user_id:>10} {len(limiter):>10} {current / 2**20:>8.2f}")
+    tracemalloc.stop()
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    run("GCRA, lazy eviction", lambda clock: RateLimiter(GCRA(20, period=60, burst=5), global_limit=GCRA(10**9, period=60), clock=clock), users)
+    run("legacy timestamp dict", LegacyLimiter, users)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Startup cost of the bot: `import bot` under python -X importtime, the
+slowest modules it pulls in, and what the deferred provider SDKs would add
+if they were imported eagerly again.
+
+    python -m benchmarks.bench_startup [runs]
+"""
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFERRED = ("cohere", "google.generativeai", "requests")
+
+
+def import_times(statement: str):
+    """(wall ms, {module: (self µs, cumulative µs)}) of one fresh interpreter"""
+    env = os.environ.copy()
+    env.setdefault("TELEGRAM_BOT_TOKEN", "bench")
+    env.setdefault("COHERE_API_KEY", "bench")
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    wall = (time.perf_counter() - start) * 1000
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented under the module that pulled them in
+        times[name[1:].rstrip()] = (int(own), int(cumulative))
+    return wall, times
+
+
+def main(runs: int = 5):
+    import_times("import bot")  # warm the .pyc files
+
+    walls, totals, runs_times = [], [], []
+    for _ in range(runs):
+        wall, times = import_times("import bot")
+        walls.append(wall)
+        totals.append(times["bot"][1] / 1000)
+        runs_times.append(times)
+    baseline = statistics.median(import_times("pass")[0] for _ in range(runs))
+
+    print(f"import bot (cumulative)   {statistics.median(totals):7.1f} ms  median of {runs}")
+    print(f"process wall time         {statistics.median(walls):7.1f} ms  (bare interpreter {baseline:.1f} ms)")
+
+    times = runs_times[-1]
+    # Modules bot imports directly are indented one level under it
+    direct = {name.strip(): cumulative for name, (_, cumulative) in times.items()
+              if name.startswith("  ") and not name.startswith("   ")}
+    print("\nslowest imports of bot.py")
+    for name, cumulative in sorted(direct.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {name:<30} {cumulative / 1000:7.1f} ms")
+
+    print("\ndeferred until first use")
+    for module in DEFERRED:
+        try:
+            importlib.util.find_spec(module)
+        except ModuleNotFoundError:
+            print(f"  {module:<30} not installed")
+            continue
+        imported = any(name.strip() == module for name in times)
+        _, deferred = import_times(f"import bot, {module}")
+        state = "IMPORTED AT STARTUP" if imported else "saved"
+        print(f"  {module:<30} {deferred[module][1] / 1000:7.1f} ms  {state}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
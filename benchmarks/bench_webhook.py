@@ -0,0 +1,150 @@
+"""
+Local load test for update delivery: webhook against long polling.
+
+Synthetic text-message updates "arrive at Telegram" at a fixed rate. In
+webhook mode they are POSTed (with the secret token header) to the
+Application's embedded webhook server after half a round trip; in polling
+mode FakeTelegram hands them out from getUpdates, whose requests and
+responses each take half a round trip. Latency is measured from arrival at
+Telegram until the handler runs.
+
+    python -m benchmarks.bench_webhook [updates] [rate/s] [rtt ms]
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench")
+os.environ.setdefault("COHERE_API_KEY", "bench")
+
+from telegram.ext import ApplicationBuilder, MessageHandler, filters  # noqa: E402
+
+from benchmarks.fake_telegram import FakeTelegram, text_update  # noqa: E402
+
+SECRET = "bench-secret"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def send(port: int, count: int, rate: float, rtt: float):
+    """Plays Telegram in webhook mode, in its own process and over raw keep-alive connections to keep the client cheap"""
+    async def connection(queue: asyncio.Queue):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        while True:
+            update = await queue.get()
+            if update is None:
+                break
+            body = json.dumps(update).encode()
+            writer.write(
+                b"POST /telegram HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                b"X-Telegram-Bot-Api-Secret-Token: " + SECRET.encode() + b"\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+            )
+            status = await reader.readline()
+            assert b" 200 " in status, status
+            length = 0
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+        writer.close()
+
+    async def deliver():
+        queue: asyncio.Queue = asyncio.Queue()
+        # Telegram's default max_connections
+        connections = [asyncio.create_task(connection(queue)) for _ in range(40)]
+
+        async def arrive(i):
+            update = arrival(i)
+            await asyncio.sleep(rtt / 2)
+            queue.put_nowait(update)
+
+        arrivals = []
+        start = time.perf_counter()
+        for i in range(count):
+            await asyncio.sleep(max(0.0, start + i / rate - time.perf_counter()))
+            arrivals.append(asyncio.create_task(arrive(i)))
+        await asyncio.gather(*arrivals)
+        for _ in connections:
+            queue.put_nowait(None)
+        await asyncio.gather(*connections)
+
+    asyncio.run(deliver())
+
+
+def arrival(i: int):
+    # The arrival time travels in the text; perf_counter is system-wide on Linux
+    return text_update(i + 1, 1000 + i % 50, repr(time.perf_counter()))
+
+
+async def run(mode: str, count: int, rate: float, rtt: float):
+    telegram = FakeTelegram(rtt=rtt)
+    application = ApplicationBuilder().token("123456:BENCH").request(telegram).get_updates_request(telegram).build()
+    latencies = []
+    done = asyncio.Event()
+
+    async def handle(update, context):
+        latencies.append(time.perf_counter() - float(update.message.text))
+        if len(latencies) == count:
+            done.set()
+
+    application.add_handler(MessageHandler(filters.TEXT, handle))
+    await application.initialize()
+    port = free_port()
+    if mode == "webhook":
+        await application.updater.start_webhook(
+            listen="127.0.0.1", port=port, url_path="telegram", secret_token=SECRET,
+            webhook_url="https://bench.invalid/telegram", allowed_updates=["message"]
+        )
+    else:
+        await application.updater.start_polling(poll_interval=0, timeout=10, allowed_updates=["message"])
+    await application.start()
+
+    start = time.perf_counter()
+    if mode == "webhook":
+        sender = multiprocessing.Process(target=send, args=(port, count, rate, rtt))
+        sender.start()
+    else:
+        for i in range(count):
+            await asyncio.sleep(max(0.0, start + i / rate - time.perf_counter()))
+            telegram.push(arrival(i))
+    await asyncio.wait_for(done.wait(), timeout=60 + count / rate)
+    elapsed = time.perf_counter() - start
+    if mode == "webhook":
+        sender.join()
+
+    await application.updater.stop()
+    await application.stop()
+    await application.shutdown()
+
+    print(
+        f"{mode:<8} {count / elapsed:9.0f} updates/s   "
+        f"p50 {percentile(latencies, 50) * 1000:7.1f} ms   p95 {percentile(latencies, 95) * 1000:7.1f} ms   "
+        f"p99 {percentile(latencies, 99) * 1000:7.1f} ms   getUpdates calls: {telegram.calls.get('getUpdates', 0)}"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 500
+    rtt = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.05
+    print(f"{count} updates at {rate:.0f}/s, simulated round trip {rtt * 1000:.0f} ms")
+    for mode in ("polling", "webhook"):
+        asyncio.run(run(mode, count, rate, rtt))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+A local stand-in for the Cohere API, as an httpx transport.
+
+Pass it to CohereProvider(transport=...) and the real cohere client talks
+to it instead of the network. /v1/generate answers after `latency` seconds
+(plus up to `jitter`), either as one JSON body or, for streaming requests,
+as `chunks` text-generation events spread over `stream_time` seconds.
+"""
+import asyncio
+import json
+import random
+import uuid
+from typing import AsyncIterator
+
+import httpx
+
+
+class _EventStream(httpx.AsyncByteStream):
+    def __init__(self, events, first_delay: float, gap: float):
+        self.events = events
+        self.first_delay = first_delay
+        self.gap = gap
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        await asyncio.sleep(self.first_delay)
+        for i, event in enumerate(self.events):
+            if i and self.gap:
+                await asyncio.sleep(self.gap)
+            yield (json.dumps(event) + "\n").encode()
+
+
+class FakeCohere(httpx.AsyncBaseTransport):
+    def __init__(self, latency: float = 0.5, jitter: float = 0.0, stream_time: float = 0.5, chunks: int = 10,
+                 error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.stream_time = stream_time
+        self.chunks = chunks
+        self.error_rate = error_rate
+        self.requests = 0
+        self._rng = random.Random(seed)
+
+    def _answer(self, prompt: str) -> str:
+        return f"Here is a made-up answer to: {prompt[-80:]}"
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        delay = self.latency + self._rng.random() * self.jitter
+        if self._rng.random() < self.error_rate:
+            await asyncio.sleep(delay)
+            return httpx.Response(500, json={"message": "fake upstream error"}, request=request)
+
+        body = json.loads(request.content)
+        text = self._answer(body["prompt"])
+        if not body.get("stream"):
+            await asyncio.sleep(delay)
+            return httpx.Response(200, json={
+                "id": str(uuid.uuid4()),
+                "prompt": body["prompt"],
+                "generations": [{"id": str(uuid.uuid4()), "text": text}],
+            }, request=request)
+
+        words = text.split(" ")
+        size = max(1, len(words) // self.chunks)
+        events = [
+            {"event_type": "text-generation", "is_finished": False, "text": " ".join(words[i:i + size]) + " "}
+            for i in range(0, len(words), size)
+        ]
+        events.append({
+            "event_type": "stream-end", "is_finished": True, "finish_reason": "COMPLETE",
+            "response": {"id": str(uuid.uuid4()), "generations": [{"id": str(uuid.uuid4()), "text": text}]},
+        })
+        return httpx.Response(
+            200, headers={"content-type": "application/stream+json"},
+            stream=_EventStream(events, delay, self.stream_time / len(events)), request=request
+        )
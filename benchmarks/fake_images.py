@@ -0,0 +1,81 @@
+"""
+A local stand-in for the Hugging Face text-to-image endpoint.
+
+FakeImageServer is a real HTTP/1.1 server on 127.0.0.1 (keep-alive, one
+request at a time per connection), so ImageProvider runs unchanged against
+it with IMAGE_API_URL=server.url. POST /models/<name> with {"inputs": ...}
+answers after `latency` seconds with bytes derived from the prompt. The
+first `loading` requests get the 503 "model is loading" reply, and prompts
+containing "fail" get a 500.
+"""
+import asyncio
+import hashlib
+import json
+from typing import Optional
+
+
+class FakeImageServer:
+    def __init__(self, latency: float = 0.1, loading: int = 0, estimated_time: float = 0.05, size: int = 4096):
+        self.latency = latency
+        self.loading = loading
+        self.estimated_time = estimated_time
+        self.size = size
+        self.requests = 0
+        self.active = 0
+        self.peak = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/models/fake-diffusion"
+
+    @staticmethod
+    def image(prompt: str, size: int = 4096) -> bytes:
+        """What the server returns for `prompt`"""
+        digest = hashlib.sha256(prompt.encode()).digest()
+        return b"\x89PNG\r\n\x1a\n" + (digest * (size // len(digest) + 1))[:size]
+
+    async def _respond(self, body: bytes):
+        self.requests += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            prompt = json.loads(body)["inputs"]
+            if self.loading:
+                self.loading -= 1
+                return 503, "application/json", json.dumps({"error": "Model is loading", "estimated_time": self.estimated_time}).encode()
+            await asyncio.sleep(self.latency)
+            if "fail" in prompt:
+                return 500, "application/json", b'{"error": "generation failed"}'
+            return 200, "image/png", self.image(prompt, self.size)
+        finally:
+            self.active -= 1
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                headers = dict(
+                    line.split(":", 1) for line in head.decode("latin-1").split("\r\n")[1:] if ":" in line
+                )
+                length = int(next((value for name, value in headers.items() if name.lower() == "content-length"), 0))
+                status, content_type, payload = await self._respond(await reader.readexactly(length))
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
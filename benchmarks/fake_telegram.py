@@ -0,0 +1,114 @@
+"""
+An in-process stand-in for the Telegram Bot API.
+
+FakeTelegram plugs into ApplicationBuilder().request(...) and
+.get_updates_request(...) so an Application runs end to end without a
+network: getMe/setWebhook/deleteWebhook succeed, getUpdates long-polls a
+local queue of synthetic updates, and every other method returns a fake
+message. `rtt` simulates the network round trip to Telegram.
+"""
+import asyncio
+import itertools
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+from telegram.request import BaseRequest, RequestData
+
+BOT = {"id": 1, "is_bot": True, "first_name": "Bunny", "username": "bunny_test_bot"}
+
+
+def text_update(update_id: int, user_id: int, text: str) -> Dict:
+    """A private-chat text message update, as Telegram would send it"""
+    user = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private", "first_name": user["first_name"]},
+            "from": user,
+            "text": text,
+        },
+    }
+
+
+def callback_update(update_id: int, user_id: int, data: str) -> Dict:
+    """An inline keyboard button press on a message the bot sent to the user"""
+    update = text_update(update_id, user_id, "")
+    message = update.pop("message")
+    message["from"] = BOT
+    update["callback_query"] = {
+        "id": str(update_id),
+        "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+        "chat_instance": str(user_id),
+        "message": message,
+        "data": data,
+    }
+    return update
+
+
+class FakeTelegram(BaseRequest):
+    def __init__(self, rtt: float = 0.0):
+        self.rtt = rtt
+        self.calls: Dict[str, int] = {}
+        self.sent: List[Dict] = []
+        # message_id -> its text after the last edit
+        self.texts: Dict[int, str] = {}
+        self._pending: List[Dict] = []
+        self._arrived = asyncio.Event()
+        self._message_ids = itertools.count(1)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def push(self, update: Dict):
+        """An update arrives at Telegram; the next getUpdates picks it up"""
+        self._pending.append(update)
+        self._arrived.set()
+
+    async def _get_updates(self, params: Dict) -> List[Dict]:
+        offset = params.get("offset") or 0
+        self._pending = [update for update in self._pending if update["update_id"] >= offset]
+        if not self._pending:
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), timeout=params.get("timeout") or 0)
+            except asyncio.TimeoutError:
+                pass
+        return self._pending[:params.get("limit") or 100]
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None, pool_timeout=None) -> Tuple[int, bytes]:
+        endpoint = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data else {}
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        # Half the round trip there, half back
+        if self.rtt:
+            await asyncio.sleep(self.rtt / 2)
+
+        if endpoint == "getMe":
+            result = BOT
+        elif endpoint == "getUpdates":
+            result = await self._get_updates(params)
+        elif endpoint in ("sendMessage", "editMessageText", "sendDocument", "sendPhoto"):
+            self.sent.append(params)
+            message_id = params.get("message_id") if endpoint == "editMessageText" else next(self._message_ids)
+            if "text" in params:
+                self.texts[message_id] = params["text"]
+            result = {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": params.get("chat_id"), "type": "private"},
+                "from": BOT,
+                "text": params.get("text", ""),
+            }
+        else:
+            result = True
+
+        if self.rtt:
+            await asyncio.sleep(self.rtt / 2)
+        return 200, json.dumps({"ok": True, "result": result}).encode()
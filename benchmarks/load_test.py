@@ -0,0 +1,248 @@
+"""
+End-to-end load test of the bot.
+
+Builds the real Application through bot.build_application(), with the Bot
+API replaced by FakeTelegram and Cohere by FakeCohere (the real cohere
+client runs against a local httpx transport), on a throwaway database.
+Synthetic updates (chat messages and commands, in --mix proportions, from
+--users users picked uniformly or Zipf-distributed) are fed to the
+Application at --rate per second for --duration seconds.
+
+Reports throughput, p50/p95/p99 latency per update kind (from entering the
+update queue until its handler returned) and how much of the handlers' time
+went to database work.
+
+    python -m benchmarks.load_test --users 2000 --rate 100 --duration 30 --distribution zipf
+
+Config still comes from the environment. Telegram's sending limits are
+lifted unless --telegram-limits is given, since FakeTelegram does not
+enforce them; the per-user rate limits stay as configured.
+"""
+import argparse
+import asyncio
+import functools
+import itertools
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+# Start of the bot's failure and rate-limit replies
+WARNING_PREFIXES = ("⚠", "\u23F3 Please wait")
+
+KINDS = {
+    # kind: message text (None for an AI prompt)
+    "message": None,
+    "profile": "/profile",
+    "leaderboard": "/leaderboard",
+    "daily": "/daily",
+    "help": "/help",
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=50, help="updates per second")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load")
+    parser.add_argument("--distribution", choices=("uniform", "zipf"), default="uniform")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent")
+    parser.add_argument("--mix", default="message=60,profile=15,leaderboard=10,daily=5,help=10")
+    parser.add_argument("--prompts", type=int, default=5000, help="distinct prompts to pick from")
+    parser.add_argument("--telegram-rtt", type=float, default=50, help="Bot API round trip, ms")
+    parser.add_argument("--ai-latency", type=float, default=800, help="Cohere time to first token, ms")
+    parser.add_argument("--ai-jitter", type=float, default=400, help="extra random Cohere latency, ms")
+    parser.add_argument("--ai-stream", type=float, default=1000, help="Cohere streaming time, ms")
+    parser.add_argument("--ai-errors", type=float, default=0.0, help="share of failing Cohere calls")
+    parser.add_argument("--telegram-limits", action="store_true", help="keep the outbound scheduler's Telegram limits")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    args.mix = {kind: float(weight) for kind, weight in (item.split("=") for item in args.mix.split(","))}
+    unknown = set(args.mix) - set(KINDS)
+    if unknown:
+        parser.error(f"unknown kinds in --mix: {', '.join(sorted(unknown))}")
+    return args
+
+
+def prepare_environment(args):
+    # Before anything imports src.config
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:LOADTEST")
+    os.environ.setdefault("COHERE_API_KEY", "load-test")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bunny_load_')}/load.db"
+    os.environ["GEMINI_API_KEY"] = ""
+    if not args.telegram_limits:
+        for name in ("OUTBOUND_GLOBAL_RATE", "OUTBOUND_CHAT_RATE", "OUTBOUND_GROUP_RATE"):
+            os.environ.setdefault(name, "1000000")
+        os.environ.setdefault("OUTBOUND_CHAT_BURST", "1000")
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class UserPicker:
+    def __init__(self, users: int, distribution: str, exponent: float, rng: random.Random):
+        self.ids = list(range(100_000, 100_000 + users))
+        weights = [1.0] * users if distribution == "uniform" else [1 / (rank + 1) ** exponent for rank in range(users)]
+        self.cum_weights = list(itertools.accumulate(weights))
+        self.rng = rng
+
+    def pick(self) -> int:
+        return self.rng.choices(self.ids, cum_weights=self.cum_weights)[0]
+
+
+class DBTimer:
+    """Times every query inside the DB threads by wrapping async_db.run_read/run_write"""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+    def _timed(self, fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.calls += 1
+                self.seconds += time.perf_counter() - started
+        return timed
+
+    def install(self, async_db):
+        run_read, run_write = async_db.run_read, async_db.run_write
+
+        async def timed_read(fn, *args, **kwargs):
+            return await run_read(self._timed(fn), *args, **kwargs)
+
+        async def timed_write(fn, *args, **kwargs):
+            return await run_write(self._timed(fn), *args, **kwargs)
+
+        async_db.run_read, async_db.run_write = timed_read, timed_write
+
+
+async def run(args):
+    from telegram import Update
+    from telegram.ext import ApplicationBuilder
+
+    import bot
+    from benchmarks.fake_cohere import FakeCohere
+    from benchmarks.fake_telegram import FakeTelegram, text_update
+    from models import cohere_provider
+    from src import async_db
+    from src.config import Config
+    from src.database import init_db
+
+    rng = random.Random(args.seed)
+    telegram = FakeTelegram(rtt=args.telegram_rtt / 1000)
+    cohere = FakeCohere(
+        latency=args.ai_latency / 1000, jitter=args.ai_jitter / 1000, stream_time=args.ai_stream / 1000,
+        error_rate=args.ai_errors, seed=args.seed
+    )
+    cohere_provider._provider = cohere_provider.CohereProvider(
+        Config.COHERE_API_KEY, max_concurrency=Config.AI_MAX_CONCURRENCY, timeout=Config.AI_TIMEOUT, transport=cohere
+    )
+    db_timer = DBTimer()
+    db_timer.install(async_db)
+
+    assert init_db(), "database failed to initialize"
+    application = bot.build_application(ApplicationBuilder().request(telegram).get_updates_request(telegram))
+
+    handler_seconds = 0.0
+
+    def timed_callback(callback):
+        @functools.wraps(callback)
+        async def timed(update, context):
+            nonlocal handler_seconds
+            started = time.perf_counter()
+            try:
+                return await callback(update, context)
+            finally:
+                handler_seconds += time.perf_counter() - started
+        return timed
+
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            handler.callback = timed_callback(handler.callback)
+
+    enqueued: Dict[int, float] = {}
+    kinds: Dict[int, str] = {}
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    finished = asyncio.Event()
+    total = int(args.rate * args.duration)
+    process_update = application.process_update
+
+    async def timed_process_update(update):
+        await process_update(update)
+        latencies[kinds[update.update_id]].append(time.perf_counter() - enqueued[update.update_id])
+        if sum(len(values) for values in latencies.values()) == total:
+            finished.set()
+
+    application.process_update = timed_process_update
+
+    await application.initialize()
+    await application.post_init(application)
+    await application.start()
+
+    users = UserPicker(args.users, args.distribution, args.zipf, rng)
+    kind_names = list(args.mix)
+    kind_weights = list(itertools.accumulate(args.mix.values()))
+
+    print(f"{total} updates from {args.users} users ({args.distribution}) at {args.rate:.0f}/s")
+    started = time.perf_counter()
+    for update_id in range(1, total + 1):
+        await asyncio.sleep(max(0.0, started + (update_id - 1) / args.rate - time.perf_counter()))
+        kind = rng.choices(kind_names, cum_weights=kind_weights)[0]
+        text = KINDS[kind] or f"Question number {rng.randrange(args.prompts)}: what should I read next?"
+        data = text_update(update_id, users.pick(), text)
+        if text.startswith("/"):
+            data["message"]["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+        kinds[update_id] = kind
+        enqueued[update_id] = time.perf_counter()
+        await application.update_queue.put(Update.de_json(data, application.bot))
+
+    try:
+        await asyncio.wait_for(finished.wait(), timeout=120)
+    except asyncio.TimeoutError:
+        print("Timed out waiting for the remaining updates")
+    elapsed = time.perf_counter() - started
+
+    await application.stop()
+    await application.shutdown()
+    await application.post_shutdown(application)
+
+    done = sum(len(values) for values in latencies.values())
+    print(f"throughput: {done / elapsed:.1f} updates/s ({done} in {elapsed:.1f} s)")
+    print(f"{'kind':<12} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for kind in kind_names:
+        ordered = sorted(latencies.get(kind, []))
+        if not ordered:
+            continue
+        print(
+            f"{kind:<12} {len(ordered):>6} {percentile(ordered, 50) * 1000:>9.1f} {percentile(ordered, 95) * 1000:>9.1f} "
+            f"{percentile(ordered, 99) * 1000:>9.1f} {ordered[-1] * 1000:>9.1f}"
+        )
+    share = db_timer.seconds / handler_seconds if handler_seconds else 0.0
+    print(
+        f"db: {db_timer.calls} calls, {db_timer.seconds:.2f} s "
+        f"({share:.1%} of {handler_seconds:.1f} s handler time, {db_timer.seconds / elapsed:.1%} of wall time)"
+    )
+    # Failures and rate-limit notices, by each message's final text; a streamed
+    # reply's placeholder is edited into the answer and is not one
+    warnings = sum(1 for text in telegram.texts.values() if str(text).startswith(WARNING_PREFIXES))
+    print(
+        f"bot api: {sum(telegram.calls.values())} calls ({len(telegram.sent)} sends/edits, {warnings} warnings)   "
+        f"cohere: {cohere.requests} requests"
+    )
+
+
+def main():
+    args = parse_args()
+    prepare_environment(args)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,8 @@
 import logging
-import time
+import math
 import signal
 import sys
 import asyncio
-from threading import Lock
 
 from telegram import Update
 from telegram.ext import (
@@ -14,12 +13,26 @@ from telegram.ext import (
     filters
 )
 
-from src.database import init_db, update_user_activity, list_users
-from models.ai_router import generate_with_fallback
+from src.database import init_db
+from src import async_db as db
+from models.ai_router import generate_with_fallback, stream_with_fallback, close_router
+from models.cohere_provider import close_provider
+from models.image_gen import close_image_provider
 from models import user
 from src.config import Config
 from src.handlers import setup_commands
 from src.handlers.admin import setup_admin
+from src.handlers.images import setup_images
+from src.services.broadcast import broadcaster
+from src.services.image_jobs import image_queue
+from src.services.lanes import LanedApplication
+from src.services.memory import render_prompt
+from src.services.metrics import MetricsServer
+from src.services.outbound import outbound
+from src.services.streaming import StreamingReply
+from src.services.utils import instrumented
+from src.services import updates
+from src.services.rate_limiter import user_limiter, COSTS
 
 # Configure logging
 logging.basicConfig(
@@ -28,46 +41,46 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Rate limiter to prevent spam
-class RateLimiter:
-    def __init__(self):
-        self.user_timestamps = {}
-        self.lock = Lock()
-
-    def check_user(self, user_id: int) -> bool:
-        with self.lock:
-            current_time = time.time()
-            last_time = self.user_timestamps.get(user_id, 0)
-            if current_time - last_time < 5:
-                return False
-            self.user_timestamps[user_id] = current_time
-            return True
-
-rate_limiter = RateLimiter()
+metrics_server = MetricsServer(host=Config.METRICS_HOST, port=Config.METRICS_PORT)
 
 # Handle text messages with AI response
+@instrumented
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         user = update.effective_user
-        update_user_activity(
+        await db.update_user_activity(
             user_id=user.id,
             username=user.username,
             first_name=user.first_name,
             last_name=user.last_name
         )
 
-        if not rate_limiter.check_user(user.id):
-            await update.message.reply_text("\u23F3 Please wait 5 seconds between messages.", parse_mode="Markdown")
+        wait = user_limiter.check(user.id, COSTS["message"])
+        if wait:
+            await update.message.reply_text(f"\u23F3 Please wait {math.ceil(wait)} seconds between messages.", parse_mode="Markdown")
             return
 
         prompt = update.message.text
-        response = await generate_with_fallback(prompt)
-        if len(response) > 4000:
-            # Break into parts to avoid Telegram limits
-            for i in range(0, len(response), 4000):
-                await update.message.reply_text(response[i:i + 4000], parse_mode="Markdown", disable_web_page_preview=True)
+        history = await db.memory.history(user.id)
+        full_prompt = render_prompt(history, prompt, Config.HISTORY_TOKEN_BUDGET)
+        if Config.STREAM_REPLIES:
+            response = await StreamingReply(update.message).run(stream_with_fallback(full_prompt))
         else:
-            await update.message.reply_text(response, parse_mode="Markdown", disable_web_page_preview=True)
+            response = await generate_with_fallback(full_prompt)
+            if len(response) > 4000:
+                # Break into parts to avoid Telegram limits
+                for i in range(0, len(response), 4000):
+                    await update.message.reply_text(response[i:i + 4000], parse_mode="Markdown", disable_web_page_preview=True)
+            else:
+                await update.message.reply_text(response, parse_mode="Markdown", disable_web_page_preview=True)
+
+        if Config.LOG_CHAT:
+            await db.log_message(user.id, "message", prompt)
+            await db.log_message(user.id, "response", response)
+
+        # Failed answers are not worth remembering
+        if not response.startswith("\u26A0"):
+            await db.memory.add_turn(user.id, prompt, response)
 
     except Exception as e:
         logger.error(f"Message processing failed: {str(e)}", exc_info=True)
@@ -80,13 +93,14 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.effective_message.reply_text("\u26A0 An unexpected error occurred.", parse_mode="Markdown")
 
 # Admin-only: list users
+@instrumented
 async def handle_list_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     if user_id not in Config.ADMIN_USER_IDS:
         await update.message.reply_text("🚫 You are not authorized to use this command.")
         return
 
-    users = list_users()
+    users = await db.list_users()
     if not users:
         await update.message.reply_text("No users found.")
         return
@@ -101,9 +115,15 @@ async def handle_list_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # Post-startup
 async def post_init(application):
     logger.info("Bot starting up...")
+    await db.start()
+    if Config.METRICS_PORT:
+        await metrics_server.start()
+    await broadcaster.resume(application.bot)
+    image_queue.start()
     await application.bot.set_my_commands([
         ("start", "Start the bot"),
         ("help", "Get help information"),
+        ("imagine", "Generate an image"),
         ("admin", "Admin controls"),
         ("users", "List all users")
     ])
@@ -111,16 +131,45 @@ async def post_init(application):
 # Shutdown
 async def post_shutdown(application):
     logger.info("Bot shutting down...")
+    await broadcaster.stop()
+    await image_queue.stop()
+    await metrics_server.stop()
+    await db.close()
+    await close_router()
+    await close_provider()
+    await close_image_provider()
 
 def handle_sigterm():
     logger.info("Received shutdown signal.")
     sys.exit(0)
 
+def build_application(builder: ApplicationBuilder = None):
+    """The bot's Application with every handler registered; `builder` lets load tests swap the network out"""
+    application = (builder or ApplicationBuilder()) \
+        .token(Config.TELEGRAM_TOKEN) \
+        .application_class(LanedApplication) \
+        .concurrent_updates(Config.UPDATE_BACKLOG) \
+        .rate_limiter(outbound) \
+        .post_init(post_init) \
+        .post_shutdown(post_shutdown) \
+        .build()
+
+    setup_commands(application)
+    setup_admin(application)
+    setup_images(application)
+
+    application.add_handler(CommandHandler("users", handle_list_users))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    application.add_error_handler(error_handler)
+    return application
+
 # Main bot runner
 def main():
     try:
-        if not Config.TELEGRAM_TOKEN:
-            logger.critical("Telegram token missing!")
+        try:
+            Config.validate()
+        except ValueError as e:
+            logger.critical(f"Invalid configuration: {str(e)}")
             sys.exit(1)
 
         if not init_db():
@@ -130,21 +179,10 @@ def main():
         signal.signal(signal.SIGINT, lambda s, f: handle_sigterm())
         signal.signal(signal.SIGTERM, lambda s, f: handle_sigterm())
 
-        application = ApplicationBuilder() \
-            .token(Config.TELEGRAM_TOKEN) \
-            .post_init(post_init) \
-            .post_shutdown(post_shutdown) \
-            .build()
-
-        setup_commands(application)
-        setup_admin(application)
-
-        application.add_handler(CommandHandler("users", handle_list_users))
-        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
-        application.add_error_handler(error_handler)
+        application = build_application()
 
         logger.info("Starting bot...")
-        application.run_polling(drop_pending_updates=True, allowed_updates=Update.ALL_TYPES)
+        updates.run(application)
 
     except Exception as e:
         logger.critical(f"Startup error: {str(e)}", exc_info=True)
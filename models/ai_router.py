@@ -1,10 +1,334 @@
 # models/ai_router.py
 
-from models.cohere_model import generate_response as cohere_generate
+"""
+Latency-aware routing across AI providers.
 
-async def generate_with_fallback(prompt: str) -> str:
+Each provider gets rolling latency percentiles, an error rate and a circuit
+breaker. Requests go to the healthiest, fastest provider; if it has not
+answered by its own p95 latency a second provider is started in parallel
+(hedging) and whichever answers first wins. Failed providers are skipped
+until their circuit cools down.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional
+
+from src.config import Config
+from src.services.metrics import registry
+from src.services.response_cache import response_cache
+from src.services.single_flight import SingleFlight
+from src.services.utils import get_cache_key
+
+logger = logging.getLogger(__name__)
+
+MAX_TOKENS = 300
+TEMPERATURE = 0.7
+# Everything besides the prompt that changes the answer; part of the cache key
+CACHE_PARAMS = f"{MAX_TOKENS}:{TEMPERATURE}"
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Collapses concurrent identical prompts (same cache key) into one upstream call
+ai_flights = SingleFlight()
+registry.gauge("bunny_ai_flights", "AI requests sent upstream, joined to one already in flight, and in flight now",
+               lambda: {"upstream": ai_flights.calls, "collapsed": ai_flights.collapsed, "in_flight": ai_flights.in_flight},
+               labelname="state")
+
+
+class NoProviderAvailable(RuntimeError):
+    pass
+
+
+class ProviderHealth:
+    """Rolling latency/error window and circuit breaker for one provider"""
+
+    def __init__(self, window: int = 100, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.abandoned = 0
+        self._trial_in_flight = False
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def available(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+        return self.state == HALF_OPEN and not self._trial_in_flight
+
+    def begin(self):
+        if self.state == HALF_OPEN:
+            self._trial_in_flight = True
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self, elapsed: Optional[float] = None):
+        """
+        The attempt was abandoned (lost a hedge race) without an outcome.
+        It would have taken at least `elapsed`; when that is already slower
+        than the median it is kept as a latency sample, so a provider that
+        slows down drops in the ranking and gets a later hedge deadline
+        instead of keeping the percentiles of its fast days.
+        """
+        self._trial_in_flight = False
+        if elapsed is not None and self.latencies and elapsed > self.percentile(50):
+            self.latencies.append(elapsed)
+            self.abandoned += 1
+
+    def summary(self) -> Dict:
+        return {
+            "state": self.state,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "error_rate": round(self.error_rate, 3),
+            "samples": len(self.latencies),
+            "abandoned": self.abandoned,
+        }
+
+
+class AIRouter:
+    def __init__(self, providers: List = (), hedge_delay: float = 2.0, min_hedge_delay: float = 0.25, min_samples: int = 10, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.providers: List = []
+        self.health: Dict[str, ProviderHealth] = {}
+        self.hedges = 0
+        for provider in providers:
+            self.register(provider)
+
+    def register(self, provider):
+        self.providers.append(provider)
+        self.health[provider.name] = ProviderHealth(
+            failure_threshold=self.failure_threshold,
+            cooldown=self.cooldown
+        )
+
+    def _candidates(self) -> List:
+        """
+        Available providers: measured ones fastest first, then the rest in
+        configured order (they collect samples as hedges and fallbacks).
+        """
+        ranked = []
+        for index, provider in enumerate(self.providers):
+            health = self.health[provider.name]
+            if not health.available():
+                continue
+            if len(health.latencies) >= self.min_samples:
+                ranked.append((0, health.percentile(50), index, provider))
+            else:
+                ranked.append((1, 0.0, index, provider))
+        ranked.sort(key=lambda item: item[:3])
+        return [item[3] for item in ranked]
+
+    def _deadline(self, provider) -> float:
+        """How long to wait on a provider before hedging with the next one"""
+        health = self.health[provider.name]
+        if len(health.latencies) < self.min_samples:
+            return self.hedge_delay
+        return max(self.min_hedge_delay, health.percentile(95))
+
+    async def _attempt(self, provider, prompt: str, params: Dict) -> str:
+        health = self.health[provider.name]
+        health.begin()
+        started = time.monotonic()
+        try:
+            result = await provider.generate(prompt, **params)
+        except asyncio.CancelledError:
+            health.release(time.monotonic() - started)
+            raise
+        except Exception:
+            health.record_failure()
+            raise
+        health.record_success(time.monotonic() - started)
+        return result
+
+    async def generate(self, prompt: str, **params) -> str:
+        candidates = self._candidates()
+        if not candidates:
+            raise NoProviderAvailable("All AI providers are unavailable")
+
+        tasks: Dict[asyncio.Task, str] = {}
+        errors = []
+
+        def launch():
+            provider = candidates.pop(0)
+            task = asyncio.create_task(self._attempt(provider, prompt, params))
+            tasks[task] = provider.name
+            return provider
+
+        current = launch()
+        try:
+            while tasks:
+                timeout = self._deadline(current) if candidates else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Slow answer: hedge with the next provider and keep both running
+                    self.hedges += 1
+                    current = launch()
+                    continue
+
+                for task in done:
+                    name = tasks.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(f"{name}: {task.exception()}")
+                    logger.warning(f"AI provider {name} failed: {task.exception()}")
+
+                if not tasks and candidates:
+                    current = launch()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        raise RuntimeError("; ".join(errors))
+
+    async def stream(self, prompt: str, **params) -> AsyncIterator[str]:
+        """Stream from the best provider, falling back while nothing has been sent yet"""
+        candidates = [p for p in self._candidates() if hasattr(p, "stream")]
+        if not candidates:
+            raise NoProviderAvailable("No streaming AI provider is available")
+
+        errors = []
+        for provider in candidates:
+            health = self.health[provider.name]
+            health.begin()
+            started = time.monotonic()
+            sent = False
+            try:
+                async for chunk in provider.stream(prompt, **params):
+                    sent = True
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                health.release(time.monotonic() - started)
+                raise
+            except Exception as e:
+                health.record_failure()
+                logger.warning(f"AI provider {provider.name} stream failed: {e}")
+                if sent:
+                    raise
+                errors.append(f"{provider.name}: {e}")
+                continue
+            health.record_success(time.monotonic() - started)
+            return
+
+        raise RuntimeError("; ".join(errors))
+
+    def stats(self) -> Dict[str, Dict]:
+        return {name: health.summary() for name, health in self.health.items()}
+
+    async def aclose(self):
+        for provider in self.providers:
+            await provider.aclose()
+
+
+_router: Optional[AIRouter] = None
+
+def get_router() -> AIRouter:
+    """The process-wide router, with providers configured from Config"""
+    global _router
+    if _router is None:
+        from models.cohere_provider import get_provider
+        providers = [get_provider()]
+        if Config.GEMINI_API_KEY:
+            from models.gemini_provider import GeminiProvider
+            providers.append(GeminiProvider(
+                Config.GEMINI_API_KEY,
+                model=Config.GEMINI_MODEL,
+                max_concurrency=Config.AI_MAX_CONCURRENCY,
+                timeout=Config.AI_TIMEOUT
+            ))
+        _router = AIRouter(
+            providers,
+            hedge_delay=Config.AI_HEDGE_DELAY,
+            failure_threshold=Config.AI_CIRCUIT_FAILURES,
+            cooldown=Config.AI_CIRCUIT_COOLDOWN
+        )
+    return _router
+
+async def close_router():
+    global _router
+    if _router is not None:
+        await _router.aclose()
+        _router = None
+
+
+async def _generate(prompt: str, key: str) -> str:
+    try:
+        response = await get_router().generate(prompt, max_tokens=MAX_TOKENS, temperature=TEMPERATURE)
+    except Exception as e:
+        logger.error(f"AI generation failed: {str(e)}", exc_info=True)
+        return "⚠️ AI service failed. Please try again later."
+
+    if response:
+        await response_cache.set(key, response)
+    return response
+
+async def _stream(prompt: str, key: str) -> AsyncIterator[str]:
+    parts = []
     try:
-        return await cohere_generate(prompt)
+        async for chunk in get_router().stream(prompt, max_tokens=MAX_TOKENS, temperature=TEMPERATURE):
+            parts.append(chunk)
+            yield chunk
     except Exception as e:
-        print(f"[Cohere Error] {e}")
-        return "⚠️ Cohere AI service failed. Please try again later."
+        logger.error(f"AI stream failed after {len(parts)} chunks: {str(e)}", exc_info=True)
+        if parts:
+            yield "\n\n⚠️ The response was cut short."
+        else:
+            yield "⚠️ AI service failed. Please try again later."
+        return
+
+    response = "".join(parts).strip()
+    if response:
+        await response_cache.set(key, response)
+
+async def generate_with_fallback(prompt: str) -> str:
+    key = get_cache_key(prompt, CACHE_PARAMS)
+    cached = await response_cache.get(key)
+    if cached is not None:
+        return cached
+    # Identical prompts already on their way to the model share that one call
+    return await ai_flights.do(key, lambda: _generate(prompt, key))
+
+async def stream_with_fallback(prompt: str) -> AsyncIterator[str]:
+    """Like generate_with_fallback, but yields the answer as it is generated"""
+    key = get_cache_key(prompt, CACHE_PARAMS)
+    cached = await response_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+    async for chunk in ai_flights.stream(key, lambda: _stream(prompt, key)):
+        yield chunk
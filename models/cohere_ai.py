@@ -1,20 +1,14 @@
 # models/cohere_ai.py
 
-import cohere
-import asyncio
-from config import Config
-
-co = cohere.Client(Config.COHERE_API_KEY)
+from models.cohere_provider import get_provider
 
 async def generate_response(prompt: str) -> str:
     try:
-        response = await asyncio.to_thread(
-            co.generate,
+        return await get_provider().generate(
+            prompt,
             model="command-r-plus",
-            prompt=prompt,
             max_tokens=300,
             temperature=0.7
         )
-        return response.generations[0].text.strip()
     except Exception as e:
         raise RuntimeError(f"Cohere failed: {e}")
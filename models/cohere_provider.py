@@ -0,0 +1,103 @@
+# models/cohere_provider.py
+
+"""
+Shared async Cohere client.
+
+One cohere.AsyncClient over a keep-alive httpx connection pool, with a
+semaphore bounding in-flight requests and a timeout on every request. All
+model modules go through get_provider() instead of building their own client.
+
+The cohere SDK takes a third of a second to import, so it is imported when
+the first provider is built rather than with this module.
+"""
+import asyncio
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from src.config import Config
+from src.services.metrics import AI_SECONDS
+
+DEFAULT_MODEL = "command-r-plus"
+
+
+class CohereProvider:
+    name = "cohere"
+
+    def __init__(self, api_key: str, max_concurrency: int = 16, timeout: float = 30.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """`transport` replaces the network, e.g. with a local fake for load tests"""
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._http = httpx.AsyncClient(
+            timeout=timeout,
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+                keepalive_expiry=60
+            )
+        )
+        import cohere
+        self.client = cohere.AsyncClient(api_key=api_key, httpx_client=self._http, timeout=timeout)
+
+    def _options(self):
+        return {"timeout_in_seconds": int(self.timeout), "max_retries": 0}
+
+    async def generate(self, prompt: str, model: str = DEFAULT_MODEL, max_tokens: int = 300, temperature: float = 0.7) -> str:
+        async with self._semaphore:
+            with AI_SECONDS.time(self.name, "generate"):
+                response = await asyncio.wait_for(
+                    self.client.generate(
+                        model=model,
+                        prompt=prompt,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        request_options=self._options()
+                    ),
+                    timeout=self.timeout
+                )
+        return response.generations[0].text.strip()
+
+    async def stream(self, prompt: str, model: str = DEFAULT_MODEL, max_tokens: int = 300, temperature: float = 0.7) -> AsyncIterator[str]:
+        """Yield text chunks as they are generated; the timeout applies between chunks"""
+        async with self._semaphore:
+            with AI_SECONDS.time(self.name, "stream"):
+                events = self.client.generate_stream(
+                    model=model,
+                    prompt=prompt,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    request_options=self._options()
+                )
+                async for event in events:
+                    if event.event_type == "stream-end":
+                        return
+                    if event.event_type == "stream-error":
+                        raise RuntimeError(event.err)
+                    if event.event_type == "text-generation":
+                        yield event.text
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+_provider: Optional[CohereProvider] = None
+
+def get_provider() -> CohereProvider:
+    """The process-wide Cohere provider, created on first use"""
+    global _provider
+    if _provider is None:
+        _provider = CohereProvider(
+            Config.COHERE_API_KEY,
+            max_concurrency=Config.AI_MAX_CONCURRENCY,
+            timeout=Config.AI_TIMEOUT
+        )
+    return _provider
+
+async def close_provider():
+    global _provider
+    if _provider is not None:
+        await _provider.aclose()
+        _provider = None
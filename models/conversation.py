@@ -1,19 +1,11 @@
-import cohere
 import logging
-from src.config import Config
+
+from models.cohere_provider import get_provider
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Initialize Cohere client
-try:
-    co = cohere.Client(Config.COHERE_API_KEY)
-    logger.info("✅ Cohere initialized successfully.")
-except Exception as e:
-    logger.critical(f"❌ Failed to initialize Cohere: {e}")
-    raise RuntimeError("AI service unavailable")
-
-def get_ai_response(prompt: str) -> str:
+async def get_ai_response(prompt: str) -> str:
     """
     Generate a concise AI response using Cohere.
     """
@@ -21,15 +13,13 @@ def get_ai_response(prompt: str) -> str:
         if not prompt.strip():
             return "⚠️ Please enter a valid prompt."
 
-        response = co.generate(
+        return await get_provider().generate(
+            prompt,
             model='command-r-plus',
-            prompt=prompt,
             max_tokens=200,
             temperature=0.7
         )
 
-        return response.generations[0].text.strip()
-
     except Exception as e:
         logger.error(f"Cohere error: {e}")
         return "⚠️ AI response failed. Please try again later."
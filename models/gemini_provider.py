@@ -0,0 +1,50 @@
+# models/gemini_provider.py
+
+"""
+Google Gemini behind the same interface as CohereProvider, so the router can
+use it as a second backend. The SDK is imported when the provider is built.
+"""
+import asyncio
+from typing import AsyncIterator
+
+from src.services.metrics import AI_SECONDS
+
+DEFAULT_MODEL = "gemini-1.5-flash"
+
+
+class GeminiProvider:
+    name = "gemini"
+
+    def __init__(self, api_key: str, model: str = DEFAULT_MODEL, max_concurrency: int = 16, timeout: float = 30.0):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model)
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @staticmethod
+    def _config(max_tokens: int, temperature: float):
+        return {"max_output_tokens": max_tokens, "temperature": temperature}
+
+    async def generate(self, prompt: str, max_tokens: int = 300, temperature: float = 0.7, **_) -> str:
+        async with self._semaphore:
+            with AI_SECONDS.time(self.name, "generate"):
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt, generation_config=self._config(max_tokens, temperature)),
+                    timeout=self.timeout
+                )
+        return response.text.strip()
+
+    async def stream(self, prompt: str, max_tokens: int = 300, temperature: float = 0.7, **_) -> AsyncIterator[str]:
+        async with self._semaphore:
+            with AI_SECONDS.time(self.name, "stream"):
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt, generation_config=self._config(max_tokens, temperature), stream=True),
+                    timeout=self.timeout
+                )
+                async for chunk in response:
+                    if chunk.text:
+                        yield chunk.text
+
+    async def aclose(self):
+        pass
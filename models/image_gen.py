@@ -1,19 +1,87 @@
-import requests
-from io import BytesIO
+"""
+Text-to-image over the Hugging Face inference API.
 
-HF_TOKEN = "YOUR_HUGGINGFACE_TOKEN"  # <-- replace this
-API_URL = "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-2"
+One httpx.AsyncClient with a keep-alive pool sized to the image workers and
+a timeout on every request. While the model is loading the API answers 503
+with an estimated wait, which is honoured (within the timeout) before
+retrying. Handlers do not call this directly; jobs reach it through the
+queue in src.services.image_jobs.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
 
-headers = {
-    "Authorization": f"Bearer {HF_TOKEN}"
-}
+import httpx
 
-def generate_image(prompt: str) -> BytesIO | None:
-    payload = {"inputs": prompt}
-    response = requests.post(API_URL, headers=headers, json=payload)
+from src.config import Config
+from src.services.metrics import AI_SECONDS
 
-    if response.status_code == 200:
-        return BytesIO(response.content)
-    else:
-        print(f"Image generation failed: {response.status_code}, {response.text}")
-        return None
+logger = logging.getLogger(__name__)
+
+
+class ImageGenerationError(Exception):
+    pass
+
+
+class ImageProvider:
+    name = "huggingface"
+
+    def __init__(self, token: str, url: str, timeout: float = 120.0, max_connections: int = 2,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.url = url
+        self.timeout = timeout
+        self._http = httpx.AsyncClient(
+            timeout=timeout,
+            transport=transport,
+            headers={"Authorization": f"Bearer {token}"} if token else None,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=60
+            )
+        )
+
+    async def generate(self, prompt: str) -> bytes:
+        """The image for `prompt`; raises ImageGenerationError or httpx.HTTPError on failure"""
+        deadline = time.monotonic() + self.timeout
+        with AI_SECONDS.time(self.name, "image"):
+            while True:
+                response = await self._http.post(self.url, json={"inputs": prompt},
+                                                 timeout=max(1.0, deadline - time.monotonic()))
+                if response.status_code == 200:
+                    return response.content
+                if response.status_code == 503:
+                    try:
+                        wait = float(response.json().get("estimated_time") or 5)
+                    except ValueError:
+                        wait = 5.0
+                    if time.monotonic() + wait < deadline:
+                        logger.info(f"Image model loading, retrying in {wait:.0f}s")
+                        await asyncio.sleep(wait)
+                        continue
+                raise ImageGenerationError(f"{response.status_code}: {response.text[:200]}")
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+_provider: Optional[ImageProvider] = None
+
+def get_image_provider() -> ImageProvider:
+    """The process-wide image provider, created on first use"""
+    global _provider
+    if _provider is None:
+        _provider = ImageProvider(
+            Config.HF_TOKEN,
+            Config.IMAGE_API_URL,
+            timeout=Config.IMAGE_TIMEOUT,
+            max_connections=Config.IMAGE_WORKERS
+        )
+    return _provider
+
+async def close_image_provider():
+    global _provider
+    if _provider is not None:
+        await _provider.aclose()
+        _provider = None
@@ -1,30 +1,87 @@
-from src.database import get_user_stats, add_achievement
+"""
+Event-driven achievements.
+
+Every rule is a threshold on one counter. Code that changes a counter
+reports (user_id, counter, old value, new value) and only the rules on that
+counter whose threshold was crossed are considered, found by bisecting the
+counter's sorted thresholds. Nothing re-reads a user's stats or earned
+achievements: awards go to the database in one batched INSERT OR IGNORE,
+and the unique (user_id, name) index drops any already earned.
+"""
+import logging
+from bisect import bisect_right
+from typing import Awaitable, Callable, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
 
 ACHIEVEMENTS = {
     "first_message": {
         "name": "Chat Starter",
         "description": "Send your first message",
-        "check": lambda stats: stats.get('message_count', 0) >= 1
+        "counter": "message_count",
+        "threshold": 1
     },
     "daily_user": {
         "name": "Daily User",
         "description": "Use the bot for 7 consecutive days",
-        "check": lambda stats: stats.get('active_days', 0) >= 7
+        "counter": "active_days",
+        "threshold": 7
     },
     "power_user": {
         "name": "Power User",
         "description": "Send 100 messages",
-        "check": lambda stats: stats.get('message_count', 0) >= 100
+        "counter": "message_count",
+        "threshold": 100
+    },
+    "point_collector": {
+        "name": "Point Collector",
+        "description": "Earn 100 points",
+        "counter": "points",
+        "threshold": 100
     }
 }
 
-def check_achievements(user_id: int):
-    stats = get_user_stats(user_id)
-    existing = {a['name'] for a in get_achievements(user_id)}
-    
-    for achievement_id, data in ACHIEVEMENTS.items():
-        if data['name'] not in existing and data['check'](stats):
-            add_achievement(user_id, data['name'])
-            return data  # Return the earned achievement
-    
-    return None
\ No newline at end of file
+# (user_id, counter, old value, new value)
+CounterChange = Tuple[int, str, int, int]
+
+
+class AchievementEngine:
+    def __init__(self, award: Callable[[List[Tuple[int, str]]], Awaitable[List[Tuple[int, str]]]], rules: Dict[str, Dict] = ACHIEVEMENTS):
+        """award(rows) stores (user_id, name) rows and returns the ones that were new"""
+        self._award_fn = award
+        self._by_name = {rule["name"]: rule for rule in rules.values()}
+        # counter -> (sorted thresholds, rules in the same order)
+        self._by_counter: Dict[str, Tuple[List[int], List[Dict]]] = {}
+        for rule in sorted(rules.values(), key=lambda rule: rule["threshold"]):
+            thresholds, counter_rules = self._by_counter.setdefault(rule["counter"], ([], []))
+            thresholds.append(rule["threshold"])
+            counter_rules.append(rule)
+        self.awarded = 0
+
+    def crossed(self, counter: str, old: int, new: int) -> List[Dict]:
+        """Rules on `counter` with old < threshold <= new"""
+        entry = self._by_counter.get(counter)
+        if entry is None or new <= old:
+            return []
+        thresholds, rules = entry
+        return rules[bisect_right(thresholds, old):bisect_right(thresholds, new)]
+
+    async def process(self, changes: Iterable[CounterChange]) -> Dict[int, List[Dict]]:
+        """Award every achievement the changes unlock; returns the newly earned ones per user"""
+        rows = [
+            (user_id, rule["name"])
+            for user_id, counter, old, new in changes
+            for rule in self.crossed(counter, old, new)
+        ]
+        if not rows:
+            return {}
+        try:
+            new_rows = await self._award_fn(rows)
+        except Exception as e:
+            logger.error(f"Awarding achievements failed: {str(e)}")
+            return {}
+        earned: Dict[int, List[Dict]] = {}
+        for user_id, name in new_rows:
+            earned.setdefault(user_id, []).append(self._by_name[name])
+        self.awarded += len(new_rows)
+        return earned
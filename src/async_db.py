@@ -0,0 +1,230 @@
+"""
+Async facade over src.database for use from handlers.
+
+Queries never run on the event loop: writes go to a single dedicated thread,
+so they are serialized exactly like the one writer connection they use, and
+reads go to a small pool sized to match the reader connections.
+
+    from src import async_db as db
+    stats = await db.get_user_stats(user.id)
+"""
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from src import database
+from src.achievements import AchievementEngine
+from src.config import Config
+from src.services.activity import ActivityBuffer
+from src.services.leaderboard import leaderboard
+from src.services.message_log import MessageLogWriter
+from src.services.metrics import DB_SECONDS
+from src.services.memory import ConversationMemory
+from src.services.stats import BotStats, sketch_activity
+
+_write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+_read_executor = ThreadPoolExecutor(max_workers=max(1, Config.DB_READERS), thread_name_prefix="db-reader")
+
+
+async def run_write(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking write on the serialized DB writer thread"""
+    loop = asyncio.get_running_loop()
+    with DB_SECONDS.time(getattr(fn, "__name__", "query"), "write"):
+        return await loop.run_in_executor(_write_executor, functools.partial(fn, *args, **kwargs))
+
+async def run_read(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking read on the DB reader pool"""
+    loop = asyncio.get_running_loop()
+    with DB_SECONDS.time(getattr(fn, "__name__", "query"), "read"):
+        return await loop.run_in_executor(_read_executor, functools.partial(fn, *args, **kwargs))
+
+# Numbers writes in the order the writer thread runs them
+_write_seq = itertools.count(1)
+
+def _sequenced(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """fn's result and the write sequence number it ran at; call on the writer thread"""
+    @functools.wraps(fn)
+    def sequenced(*args, **kwargs):
+        return fn(*args, **kwargs), next(_write_seq)
+    return sequenced
+
+async def _award(rows):
+    return await run_write(database.award_achievements, rows)
+
+achievements = AchievementEngine(_award)
+
+async def _flush_activity(rows) -> bool:
+    result, seq = await run_write(_sequenced(database.apply_activity_batch), rows)
+    if result is None:
+        return False
+    new_users, counters = result
+    bot_stats.add_users(new_users, seq)
+    changes = []
+    for row, (user_id, message_count, active_days) in zip(rows, counters):
+        leaderboard.ensure(user_id)
+        changes.append((user_id, "message_count", message_count - row[4], message_count))
+        if active_days is not None:
+            changes.append((user_id, "active_days", active_days - 1, active_days))
+    await achievements.process(changes)
+    return True
+
+activity = ActivityBuffer(
+    _flush_activity,
+    interval=Config.ACTIVITY_FLUSH_MS / 1000,
+    max_events=Config.ACTIVITY_FLUSH_EVENTS
+)
+
+def _sketch_recent_activity():
+    return sketch_activity(database.iter_recent_activity())
+
+async def _reconcile_stats():
+    # Counted on the writer thread so it lines up with activity flushes;
+    # sketching a week of activity is CPU work and goes to a reader
+    total, seq = await run_write(_sequenced(database.count_users))
+    sketches = await run_read(_sketch_recent_activity)
+    return total, seq, sketches
+
+bot_stats = BotStats(_reconcile_stats, interval=Config.STATS_RECONCILE_SECONDS)
+
+async def _write_logs(rows) -> bool:
+    # message_logs rows need their users row
+    await activity.flush()
+    return await run_write(database.log_messages, rows)
+
+async def _prune_logs(before: str, limit: int):
+    return await run_write(database.prune_message_logs, before, limit, Config.LOG_ARCHIVE_DB or None)
+
+message_log = MessageLogWriter(
+    _write_logs,
+    max_queue=Config.LOG_QUEUE_SIZE,
+    batch_size=Config.LOG_BATCH_SIZE,
+    interval=Config.LOG_FLUSH_MS / 1000,
+    overflow=Config.LOG_OVERFLOW,
+    prune=_prune_logs,
+    retention_days=Config.LOG_RETENTION_DAYS,
+    prune_chunk=Config.LOG_PRUNE_CHUNK,
+    prune_interval=Config.LOG_PRUNE_INTERVAL
+)
+
+async def _save_turns(user_id: int, turns) -> bool:
+    await activity.flush_user(user_id)
+    return await run_write(database.save_turns, user_id, turns)
+
+async def _load_turns(user_id: int, limit: int):
+    return await run_read(database.load_turns, user_id, limit)
+
+memory = ConversationMemory(
+    max_turns=Config.MAX_HISTORY,
+    max_sessions=Config.HISTORY_MAX_SESSIONS,
+    idle_ttl=Config.HISTORY_IDLE_SECONDS,
+    save=_save_turns if Config.PERSIST_HISTORY else None,
+    load=_load_turns if Config.PERSIST_HISTORY else None
+)
+
+async def start():
+    """Warm in-memory state and start background work"""
+    leaderboard.load(await run_read(database.get_all_points))
+    await bot_stats.reconcile()
+    activity.start()
+    bot_stats.start()
+    message_log.start()
+
+async def close():
+    """Flush buffered writes, close pooled connections and stop the DB threads"""
+    await bot_stats.stop()
+    await memory.flush()
+    await activity.stop()
+    await message_log.stop()
+    await run_write(database.close_db)
+    _write_executor.shutdown(wait=True)
+    _read_executor.shutdown(wait=True)
+
+# ─────────────────────────────── WRITES ─────────────────────────────── #
+
+async def update_user_activity(user_id: int, username: Optional[str] = None, first_name: Optional[str] = None, last_name: Optional[str] = None) -> bool:
+    """Buffered; reaches the users table on the next activity flush"""
+    activity.record(user_id, username, first_name, last_name)
+    bot_stats.record_active(user_id)
+    return True
+
+async def _points_changed(user_id: int, points: int) -> List[Dict]:
+    """Update the leaderboard and award points achievements; returns the ones newly earned"""
+    leaderboard.add(user_id, points)
+    total = leaderboard.points(user_id)
+    earned = await achievements.process([(user_id, "points", total - points, total)])
+    return earned.get(user_id, [])
+
+async def add_points(user_id: int, points: int) -> bool:
+    await activity.flush_user(user_id)
+    ok = await run_write(database.add_points, user_id, points)
+    if ok:
+        await _points_changed(user_id, points)
+    return ok
+
+async def claim_daily(user_id: int, points: int) -> Optional[List[Dict]]:
+    """None if the claim failed, otherwise the achievements it unlocked"""
+    await activity.flush_user(user_id)
+    if not await run_write(database.claim_daily, user_id, points):
+        return None
+    return await _points_changed(user_id, points)
+
+async def add_achievement(user_id: int, achievement_name: str) -> bool:
+    await activity.flush_user(user_id)
+    return await run_write(database.add_achievement, user_id, achievement_name)
+
+async def log_message(user_id: int, message_type: str, content: Optional[str] = None) -> bool:
+    """Queued; written with the next message_log batch"""
+    await message_log.log(user_id, message_type, content)
+    return True
+
+async def create_broadcast(admin_id: int, chat_id: int, text: str) -> Optional[int]:
+    return await run_write(database.create_broadcast, admin_id, chat_id, text)
+
+async def record_deliveries(broadcast_id: int, results: List[tuple], cursor: Optional[int] = None, status: Optional[str] = None) -> bool:
+    return await run_write(database.record_deliveries, broadcast_id, results, cursor, status)
+
+# ─────────────────────────────── READS ─────────────────────────────── #
+
+async def get_user_stats(user_id: int) -> Optional[Dict]:
+    """Stored row plus any activity still waiting in the write-behind buffer"""
+    return await activity.read_through(user_id, lambda: run_read(database.get_user_stats, user_id))
+
+async def get_achievements(user_id: int) -> List[Dict]:
+    return await run_read(database.get_achievements, user_id)
+
+async def get_leaderboard(limit: int = 10) -> List[Dict]:
+    if not leaderboard.loaded:
+        return await run_read(database.get_leaderboard, limit)
+    user_ids = [user_id for user_id, _ in leaderboard.top(limit)]
+    return await run_read(database.get_users_by_ids, user_ids)
+
+async def get_rank(user_id: int) -> Optional[tuple]:
+    """(rank, total users), or None for an unknown user"""
+    if not leaderboard.loaded:
+        return await run_read(database.get_rank, user_id)
+    rank = leaderboard.rank(user_id)
+    return (rank, len(leaderboard)) if rank is not None else None
+
+async def get_bot_stats() -> Dict:
+    """Live counters; the exact database scan runs only on reconcile"""
+    return bot_stats.snapshot()
+
+async def list_users() -> List[Dict]:
+    return await run_read(database.list_users)
+
+async def get_all_users() -> List[Dict]:
+    return await run_read(database.get_all_users)
+
+async def count_users() -> int:
+    return await run_read(database.count_users)
+
+async def get_broadcasts(status: str = 'running') -> List[Dict]:
+    return await run_read(database.get_broadcasts, status)
+
+async def get_user_page(after_user_id: int, limit: int) -> List[int]:
+    return await run_read(database.get_user_page, after_user_id, limit)
+
+async def get_delivered_ids(broadcast_id: int, first_user_id: int, last_user_id: int) -> set:
+    return await run_read(database.get_delivered_ids, broadcast_id, first_user_id, last_user_id)
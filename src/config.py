@@ -1,6 +1,5 @@
 import os
 from dotenv import load_dotenv
-from pathlib import Path
 from typing import List
 
 # Load environment variables from .env file
@@ -9,17 +8,13 @@ load_dotenv()
 class Config:
     """
     App configuration loaded from .env or system environment.
-    Validates presence of required variables.
+    Nothing is checked or touched on disk at import time; the bot calls
+    validate() when it starts.
     """
 
     # ✅ Required
     TELEGRAM_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN")
-    if not TELEGRAM_TOKEN:
-        raise ValueError("TELEGRAM_BOT_TOKEN is required in .env file")
-
     COHERE_API_KEY: str = os.getenv("COHERE_API_KEY")
-    if not COHERE_API_KEY:
-        raise ValueError("COHERE_API_KEY is required in .env file")
 
     # ✅ Admin IDs
     ADMIN_USER_IDS: List[int] = []
@@ -31,13 +26,96 @@ class Config:
             raise ValueError("ADMIN_USER_IDS must be a comma-separated list of integers") from e
 
     # ✅ Database config
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///database.db")
-    db_path = DATABASE_URL.replace("sqlite:///", "")
-    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///database.db")  # directory is created by init_db
+    DB_READERS: int = int(os.getenv("DB_READERS", "4"))
 
     # ✅ Optional configs
     MAX_HISTORY: int = int(os.getenv("MAX_HISTORY", "10"))
-    RATE_LIMIT: int = int(os.getenv("RATE_LIMIT", "20"))
+    RATE_LIMIT: int = int(os.getenv("RATE_LIMIT", "20"))  # per user, per minute
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", "5"))
+    GLOBAL_RATE_LIMIT: int = int(os.getenv("GLOBAL_RATE_LIMIT", "1200"))  # all users, per minute
+    GLOBAL_RATE_LIMIT_BURST: int = int(os.getenv("GLOBAL_RATE_LIMIT_BURST", "100"))
+    AI_MAX_CONCURRENCY: int = int(os.getenv("AI_MAX_CONCURRENCY", "16"))
+    AI_TIMEOUT: float = float(os.getenv("AI_TIMEOUT", "30"))
+    AI_HEDGE_DELAY: float = float(os.getenv("AI_HEDGE_DELAY", "2.0"))
+    AI_CIRCUIT_FAILURES: int = int(os.getenv("AI_CIRCUIT_FAILURES", "5"))
+    AI_CIRCUIT_COOLDOWN: float = float(os.getenv("AI_CIRCUIT_COOLDOWN", "30"))
+    GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
+    GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+    ACTIVITY_FLUSH_MS: int = int(os.getenv("ACTIVITY_FLUSH_MS", "500"))
+    ACTIVITY_FLUSH_EVENTS: int = int(os.getenv("ACTIVITY_FLUSH_EVENTS", "500"))
+    STATS_RECONCILE_SECONDS: int = int(os.getenv("STATS_RECONCILE_SECONDS", "3600"))
+
+    # ✅ AI response cache (RESPONSE_CACHE_DB enables the on-disk tier)
+    RESPONSE_CACHE_TTL: int = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+    RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+    RESPONSE_CACHE_DB: str = os.getenv("RESPONSE_CACHE_DB", "")
+
+    # ✅ Streaming replies (edits are throttled to one per interval per message)
+    STREAM_REPLIES: bool = os.getenv("STREAM_REPLIES", "true").lower() in ("1", "true", "yes")
+    STREAM_EDIT_INTERVAL: float = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
+
+    # ✅ Conversation memory (MAX_HISTORY turns per user, trimmed to HISTORY_TOKEN_BUDGET per prompt)
+    HISTORY_TOKEN_BUDGET: int = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+    HISTORY_MAX_SESSIONS: int = int(os.getenv("HISTORY_MAX_SESSIONS", "10000"))
+    HISTORY_IDLE_SECONDS: int = int(os.getenv("HISTORY_IDLE_SECONDS", "3600"))
+    PERSIST_HISTORY: bool = os.getenv("PERSIST_HISTORY", "false").lower() in ("1", "true", "yes")
+
+    # ✅ Message logs (LOG_CHAT logs every chat turn; LOG_OVERFLOW is "drop_oldest" or "block")
+    LOG_CHAT: bool = os.getenv("LOG_CHAT", "false").lower() in ("1", "true", "yes")
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_BATCH_SIZE: int = int(os.getenv("LOG_BATCH_SIZE", "500"))
+    LOG_FLUSH_MS: int = int(os.getenv("LOG_FLUSH_MS", "1000"))
+    LOG_OVERFLOW: str = os.getenv("LOG_OVERFLOW", "drop_oldest")
+    LOG_RETENTION_DAYS: float = float(os.getenv("LOG_RETENTION_DAYS", "30"))  # 0 keeps everything
+    LOG_PRUNE_CHUNK: int = int(os.getenv("LOG_PRUNE_CHUNK", "1000"))
+    LOG_PRUNE_INTERVAL: int = int(os.getenv("LOG_PRUNE_INTERVAL", "3600"))
+    LOG_ARCHIVE_DB: str = os.getenv("LOG_ARCHIVE_DB", "")  # pruned rows are copied here if set
+
+    # ✅ Receiving updates (UPDATE_MODE is "polling" or "webhook"; WEBHOOK_URL is the public URL Telegram posts to)
+    UPDATE_MODE: str = os.getenv("UPDATE_MODE", "polling").lower()
+    WEBHOOK_URL: str = os.getenv("WEBHOOK_URL", "")
+    WEBHOOK_LISTEN: str = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+    WEBHOOK_PORT: int = int(os.getenv("WEBHOOK_PORT", "8443"))
+    WEBHOOK_PATH: str = os.getenv("WEBHOOK_PATH", "")  # defaults to the path of WEBHOOK_URL
+    WEBHOOK_SECRET: str = os.getenv("WEBHOOK_SECRET", "")  # random per start if empty
+    WEBHOOK_MAX_CONNECTIONS: int = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+    # ✅ Update processing (concurrent across users, in order within one user)
+    UPDATE_CONCURRENCY: int = int(os.getenv("UPDATE_CONCURRENCY", "64"))  # handlers running at once
+    UPDATE_BACKLOG: int = int(os.getenv("UPDATE_BACKLOG", "1024"))  # updates running or waiting in lanes
+    LANE_IDLE_SECONDS: float = float(os.getenv("LANE_IDLE_SECONDS", "60"))
+
+    # ✅ Metrics (Prometheus text format on http://METRICS_HOST:METRICS_PORT/metrics; 0 turns it off)
+    METRICS_PORT: int = int(os.getenv("METRICS_PORT", "0"))
+    METRICS_HOST: str = os.getenv("METRICS_HOST", "127.0.0.1")
+
+    # ✅ Admin profiler (/profiler <seconds>)
+    PROFILE_INTERVAL_MS: int = int(os.getenv("PROFILE_INTERVAL_MS", "10"))
+    PROFILE_MAX_SECONDS: int = int(os.getenv("PROFILE_MAX_SECONDS", "300"))
+
+    # ✅ Outbound scheduler (Telegram limits: ~30 messages/second overall, ~1/second per chat, 20/minute per group)
+    OUTBOUND_GLOBAL_RATE: float = float(os.getenv("OUTBOUND_GLOBAL_RATE", "30"))  # per second
+    OUTBOUND_CHAT_RATE: float = float(os.getenv("OUTBOUND_CHAT_RATE", "1"))  # per second
+    OUTBOUND_CHAT_BURST: int = int(os.getenv("OUTBOUND_CHAT_BURST", "3"))
+    OUTBOUND_GROUP_RATE: float = float(os.getenv("OUTBOUND_GROUP_RATE", "20"))  # per minute
+    OUTBOUND_MAX_RETRIES: int = int(os.getenv("OUTBOUND_MAX_RETRIES", "3"))
+
+    # ✅ Broadcasts (Telegram allows ~30 messages/second across all chats)
+    BROADCAST_RATE: float = float(os.getenv("BROADCAST_RATE", "25"))
+    BROADCAST_CONCURRENCY: int = int(os.getenv("BROADCAST_CONCURRENCY", "20"))
+    BROADCAST_PAGE_SIZE: int = int(os.getenv("BROADCAST_PAGE_SIZE", "500"))
+    BROADCAST_PROGRESS_SECONDS: float = float(os.getenv("BROADCAST_PROGRESS_SECONDS", "5"))
+
+    # ✅ Image generation (/imagine; jobs queue for IMAGE_WORKERS workers, results are cached on disk by prompt)
+    HF_TOKEN: str = os.getenv("HF_TOKEN", "")
+    IMAGE_API_URL: str = os.getenv("IMAGE_API_URL", "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-2")
+    IMAGE_TIMEOUT: float = float(os.getenv("IMAGE_TIMEOUT", "120"))
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", "2"))
+    IMAGE_QUEUE_SIZE: int = int(os.getenv("IMAGE_QUEUE_SIZE", "20"))  # waiting jobs; more are turned away
+    IMAGE_CACHE_DIR: str = os.getenv("IMAGE_CACHE_DIR", "data/images")
+    IMAGE_CACHE_MAX_BYTES: int = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
 
     @classmethod
     def validate(cls):
@@ -54,5 +132,8 @@ class Config:
         if not cls.DATABASE_URL.startswith("sqlite:///"):
             raise ValueError("DATABASE_URL must start with sqlite:///")
 
-# Validate when imported
-Config.validate()
+        if cls.UPDATE_MODE not in ("polling", "webhook"):
+            raise ValueError("UPDATE_MODE must be polling or webhook")
+
+        if cls.UPDATE_MODE == "webhook" and not cls.WEBHOOK_URL:
+            raise ValueError("WEBHOOK_URL is required when UPDATE_MODE is webhook")
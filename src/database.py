@@ -1,83 +1,165 @@
 import sqlite3
 import logging
+import queue
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterator
 from src.config import Config
+from src.migrations import migrate
 
 
 
 logger = logging.getLogger(__name__)
 
+# Applied once per connection when it is opened, not on every query.
+_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Per-connection prepared statement cache; long-lived connections keep it warm.
+STATEMENT_CACHE_SIZE = 256
+
+
+class ConnectionManager:
+    """
+    Long-lived SQLite connections: one writer and a small pool of readers.
+    In WAL mode readers never block the writer (and vice versa).
+    """
+
+    def __init__(self, db_path: str, readers: int = 4):
+        self.db_path = db_path
+        # An in-memory database is private to its connection, so reads go through the writer.
+        self.max_readers = 0 if db_path == ":memory:" else max(0, readers)
+        self._writer: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.RLock()
+        self._readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all_readers: List[sqlite3.Connection] = []
+        self._pool_lock = threading.Lock()
+
+    def _connect(self, readonly: bool = False) -> sqlite3.Connection:
+        try:
+            conn = sqlite3.connect(
+                self.db_path,
+                check_same_thread=False,
+                cached_statements=STATEMENT_CACHE_SIZE
+            )
+            conn.row_factory = sqlite3.Row
+            if not readonly:
+                conn.execute("PRAGMA journal_mode = WAL")
+            for pragma in _PRAGMAS:
+                conn.execute(pragma)
+            if readonly:
+                conn.execute("PRAGMA query_only = ON")
+            return conn
+        except sqlite3.Error as e:
+            logger.error(f"Database connection failed: {str(e)}")
+            raise
+
+    def _get_writer(self) -> sqlite3.Connection:
+        if self._writer is None:
+            self._writer = self._connect()
+        return self._writer
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            if len(self._all_readers) < self.max_readers:
+                conn = self._connect(readonly=True)
+                self._all_readers.append(conn)
+                return conn
+        return self._readers.get()
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """Exclusive access to the writer; commits on success, rolls back on error"""
+        with self._write_lock:
+            conn = self._get_writer()
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a read-only connection from the pool"""
+        if not self.max_readers:
+            with self.write() as conn:
+                yield conn
+            return
+
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    def close(self):
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._pool_lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers.clear()
+            self._readers = queue.LifoQueue()
+
+
+_manager: Optional[ConnectionManager] = None
+_manager_lock = threading.Lock()
+
+def get_manager() -> ConnectionManager:
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                db_path = Config.DATABASE_URL.replace("sqlite:///", "")
+                if db_path != ":memory:":
+                    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+                _manager = ConnectionManager(db_path, readers=Config.DB_READERS)
+    return _manager
+
+def get_db():
+    """Context manager yielding the shared writer connection"""
+    return get_manager().write()
+
+def close_db():
+    """Close all pooled connections (the next call reopens them)"""
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.close()
+            _manager = None
+
 def list_users() -> List[Dict]:
     """Return a list of all users"""
     try:
-        from src.database import get_db
-        with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT user_id, username, first_name, last_name, join_date, last_active FROM users ORDER BY last_active DESC")
+        with get_manager().read() as conn:
+            cursor = conn.execute("SELECT user_id, username, first_name, last_name, join_date, last_active FROM users ORDER BY last_active DESC")
             return [dict(row) for row in cursor.fetchall()]
     except sqlite3.Error as e:
-        import logging
-        logging.error(f"Error listing users: {str(e)}")
+        logger.error(f"Error listing users: {str(e)}")
         return []
 
-def get_db() -> sqlite3.Connection:
-    try:
-        db_path = Config.DATABASE_URL.replace("sqlite:///", "")
-        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")
-        conn.execute("PRAGMA journal_mode = WAL")
-        return conn
-    except sqlite3.Error as e:
-        logger.error(f"Database connection failed: {str(e)}")
-        raise
-
 def init_db() -> bool:
+    """Bring the database to the current schema (see src.migrations)"""
     try:
         with get_db() as conn:
-            conn.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                first_name TEXT,
-                last_name TEXT,
-                message_count INTEGER DEFAULT 0,
-                points INTEGER DEFAULT 0,
-                join_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_active TIMESTAMP,
-                last_daily TIMESTAMP,
-                notification_prefs TEXT DEFAULT '{}'
-            ) STRICT;
-            """)
-
-            conn.execute("""
-            CREATE TABLE IF NOT EXISTS achievements (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                name TEXT NOT NULL,
-                earned_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(user_id) REFERENCES users(user_id) ON DELETE CASCADE
-            ) STRICT;
-            """)
-
-            conn.execute("""
-            CREATE TABLE IF NOT EXISTS message_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                message_type TEXT NOT NULL,
-                content TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(user_id) REFERENCES users(user_id) ON DELETE CASCADE
-            ) STRICT;
-            """)
-
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_users_user_id ON users(user_id)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_achievements_user_id ON achievements(user_id)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_message_logs_user_id ON message_logs(user_id)")
-
-            conn.commit()
+            version = migrate(conn)
+        logger.info(f"Database schema at version {version}")
         return True
     except sqlite3.Error as e:
         logger.error(f"Database initialization failed: {str(e)}")
@@ -101,16 +183,56 @@ def update_user_activity(user_id: int, username: Optional[str] = None, first_nam
                 last_name = COALESCE(?, last_name)
             WHERE user_id = ?
             """, (username, first_name, last_name, user_id))
-
-            conn.commit()
         return True
     except sqlite3.Error as e:
         logger.error(f"Failed to update user activity: {str(e)}")
         return False
 
-def get_user_stats(user_id: int) -> Optional[Dict]:
+def apply_activity_batch(rows: List[tuple]) -> Optional[tuple]:
+    """
+    Apply coalesced activity in one transaction.
+    rows: (user_id, username, first_name, last_name, message_delta, first_seen, last_active)
+    Returns (new users, [(user_id, message_count, active_days)]), where
+    active_days is None unless the row started a new active day.
+    """
     try:
         with get_db() as conn:
+            inserted = conn.executemany("""
+            INSERT OR IGNORE INTO users
+            (user_id, username, first_name, last_name, join_date, last_active)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, [(r[0], r[1], r[2], r[3], r[5], r[6]) for r in rows]).rowcount
+
+            counters = []
+            for user_id, username, first_name, last_name, delta, _, last_active in rows:
+                message_count = conn.execute("""
+                UPDATE users SET
+                    message_count = message_count + ?,
+                    last_active = ?,
+                    username = COALESCE(?, username),
+                    first_name = COALESCE(?, first_name),
+                    last_name = COALESCE(?, last_name)
+                WHERE user_id = ?
+                RETURNING message_count
+                """, (delta, last_active, username, first_name, last_name, user_id)).fetchone()[0]
+
+                # Consecutive active days; only touches the row on the first activity of a day
+                streak = conn.execute("""
+                UPDATE users SET
+                    active_days = CASE WHEN last_active_day = date(?, '-1 day') THEN active_days + 1 ELSE 1 END,
+                    last_active_day = date(?)
+                WHERE user_id = ? AND ? IS NOT NULL AND (last_active_day IS NULL OR last_active_day < date(?))
+                RETURNING active_days
+                """, (last_active, last_active, user_id, last_active, last_active)).fetchone()
+                counters.append((user_id, message_count, streak[0] if streak else None))
+        return inserted, counters
+    except sqlite3.Error as e:
+        logger.error(f"Failed to apply activity batch: {str(e)}")
+        return None
+
+def get_user_stats(user_id: int) -> Optional[Dict]:
+    try:
+        with get_manager().read() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
             row = cursor.fetchone()
@@ -123,25 +245,48 @@ def add_points(user_id: int, points: int) -> bool:
     try:
         with get_db() as conn:
             conn.execute("UPDATE users SET points = points + ? WHERE user_id = ?", (points, user_id))
-            conn.commit()
         return True
     except sqlite3.Error as e:
         logger.error(f"Failed to add points: {str(e)}")
         return False
 
+def claim_daily(user_id: int, points: int) -> bool:
+    """Add the daily reward and stamp last_daily in one transaction"""
+    try:
+        with get_db() as conn:
+            cursor = conn.execute(
+                "UPDATE users SET points = points + ?, last_daily = datetime('now') WHERE user_id = ?",
+                (points, user_id)
+            )
+        return cursor.rowcount == 1
+    except sqlite3.Error as e:
+        logger.error(f"Failed to claim daily reward: {str(e)}")
+        return False
+
 def add_achievement(user_id: int, achievement_name: str) -> bool:
     try:
         with get_db() as conn:
             conn.execute("INSERT INTO achievements (user_id, name) VALUES (?, ?)", (user_id, achievement_name))
-            conn.commit()
         return True
     except sqlite3.Error as e:
         logger.error(f"Failed to add achievement: {str(e)}")
         return False
 
-def get_achievements(user_id: int) -> List[Dict]:
+def award_achievements(rows: List[tuple]) -> List[tuple]:
+    """Insert (user_id, name) rows in one transaction; returns the rows that were not already earned"""
     try:
         with get_db() as conn:
+            return [
+                row for row in rows
+                if conn.execute("INSERT OR IGNORE INTO achievements (user_id, name) VALUES (?, ?)", row).rowcount
+            ]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to award achievements: {str(e)}")
+        return []
+
+def get_achievements(user_id: int) -> List[Dict]:
+    try:
+        with get_manager().read() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT name, strftime('%Y-%m-%d %H:%M:%S', earned_date) as earned_date 
@@ -156,7 +301,7 @@ def get_achievements(user_id: int) -> List[Dict]:
 
 def get_leaderboard(limit: int = 10) -> List[Dict]:
     try:
-        with get_db() as conn:
+        with get_manager().read() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT user_id, username, first_name, last_name, points, message_count
@@ -169,19 +314,243 @@ def get_leaderboard(limit: int = 10) -> List[Dict]:
         logger.error(f"Database error in get_leaderboard: {str(e)}")
         return []
 
+def get_all_points() -> List[tuple]:
+    """(user_id, points) for every user, for building the in-memory leaderboard"""
+    try:
+        with get_manager().read() as conn:
+            return [tuple(row) for row in conn.execute("SELECT user_id, points FROM users")]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to load points: {str(e)}")
+        return []
+
+def get_users_by_ids(user_ids: List[int]) -> List[Dict]:
+    """Leaderboard rows for the given users, in the order given"""
+    if not user_ids:
+        return []
+    try:
+        with get_manager().read() as conn:
+            placeholders = ",".join("?" * len(user_ids))
+            cursor = conn.execute(f"""
+                SELECT user_id, username, first_name, last_name, points, message_count
+                FROM users WHERE user_id IN ({placeholders})
+            """, user_ids)
+            rows = {row['user_id']: dict(row) for row in cursor.fetchall()}
+            return [rows[user_id] for user_id in user_ids if user_id in rows]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to get users by id: {str(e)}")
+        return []
+
+def get_rank(user_id: int) -> Optional[tuple]:
+    """(rank, total users) straight from the points index"""
+    try:
+        with get_manager().read() as conn:
+            row = conn.execute("""
+                SELECT
+                    (SELECT COUNT(*) + 1 FROM users WHERE points > u.points),
+                    (SELECT COUNT(*) FROM users)
+                FROM users u WHERE u.user_id = ?
+            """, (user_id,)).fetchone()
+            return tuple(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Failed to get rank: {str(e)}")
+        return None
+
+def load_turns(user_id: int, limit: int) -> List[tuple]:
+    """The user's last `limit` stored conversation turns, oldest first"""
+    try:
+        with get_manager().read() as conn:
+            cursor = conn.execute("""
+                SELECT message_type, content FROM message_logs
+                WHERE user_id = ? AND message_type IN ('prompt', 'reply')
+                ORDER BY id DESC LIMIT ?
+            """, (user_id, limit * 2))
+            rows = cursor.fetchall()[::-1]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to load conversation: {str(e)}")
+        return []
+    turns = []
+    for (first_type, prompt), (second_type, reply) in zip(rows, rows[1:]):
+        if first_type == 'prompt' and second_type == 'reply':
+            turns.append((prompt, reply))
+    return turns[-limit:]
+
+def count_users() -> int:
+    try:
+        with get_manager().read() as conn:
+            return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to count users: {str(e)}")
+        return 0
+
+def iter_recent_activity(days: int = 7) -> Iterator[tuple]:
+    """(user_id, hours since epoch of last_active) for users active in the last `days` days"""
+    with get_manager().read() as conn:
+        yield from conn.execute("""
+            SELECT user_id, CAST(strftime('%s', last_active) AS INTEGER) / 3600
+            FROM users WHERE last_active > datetime('now', ?)
+        """, (f"-{days} days",))
+
+def get_bot_stats() -> Dict:
+    """Total, 7-day and 1-day active user counts; the active counts only read their range of idx_users_last_active"""
+    try:
+        with get_manager().read() as conn:
+            row = conn.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM users) AS total_users,
+                    (SELECT COUNT(*) FROM users WHERE last_active > datetime('now', '-7 days')) AS active_users,
+                    (SELECT COUNT(*) FROM users WHERE last_active > datetime('now', '-1 day')) AS daily_active
+            """).fetchone()
+            return dict(row)
+    except sqlite3.Error as e:
+        logger.error(f"Failed to get bot stats: {str(e)}")
+        return {"total_users": 0, "active_users": 0, "daily_active": 0}
+
 def log_message(user_id: int, message_type: str, content: Optional[str] = None) -> bool:
     try:
         with get_db() as conn:
             conn.execute("INSERT INTO message_logs (user_id, message_type, content) VALUES (?, ?, ?)", (user_id, message_type, content))
-            conn.commit()
         return True
     except sqlite3.Error as e:
         logger.error(f"Failed to log message: {str(e)}")
         return False
 
-def verify_database() -> bool:
+def log_messages(rows: List[tuple]) -> bool:
+    """Insert (user_id, message_type, content, timestamp) rows in one transaction"""
+    try:
+        with get_db() as conn:
+            conn.executemany(
+                "INSERT INTO message_logs (user_id, message_type, content, timestamp) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Failed to write message logs: {str(e)}")
+        return False
+
+def prune_message_logs(before: str, limit: int, archive_path: Optional[str] = None) -> Optional[int]:
+    """
+    Delete up to `limit` of the oldest message_logs rows older than `before`, copying
+    them to the SQLite file at `archive_path` first if given. Rows are walked in id
+    order, so each call is one short transaction regardless of the table size.
+    Returns the number of rows removed, or None on error.
+    """
+    try:
+        with get_db() as conn:
+            rows = conn.execute("""
+                SELECT id, user_id, message_type, content, timestamp FROM message_logs
+                WHERE id IN (SELECT id FROM message_logs ORDER BY id LIMIT ?) AND timestamp < ?
+                ORDER BY id
+            """, (limit, before)).fetchall()
+            if not rows:
+                return 0
+            if archive_path:
+                _archive_message_logs(archive_path, rows)
+            conn.executemany("DELETE FROM message_logs WHERE id = ?", [(row[0],) for row in rows])
+        return len(rows)
+    except sqlite3.Error as e:
+        logger.error(f"Failed to prune message logs: {str(e)}")
+        return None
+
+def _archive_message_logs(archive_path: str, rows: List[sqlite3.Row]):
+    Path(archive_path).parent.mkdir(parents=True, exist_ok=True)
+    archive = sqlite3.connect(archive_path)
+    try:
+        with archive:
+            archive.execute("""
+            CREATE TABLE IF NOT EXISTS message_logs (
+                id INTEGER PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                message_type TEXT NOT NULL,
+                content TEXT,
+                timestamp TEXT
+            )
+            """)
+            # OR IGNORE: rows archived before a failed delete are simply archived again
+            archive.executemany("INSERT OR IGNORE INTO message_logs VALUES (?, ?, ?, ?, ?)", [tuple(row) for row in rows])
+    finally:
+        archive.close()
+
+def save_turns(user_id: int, turns: List[tuple]) -> bool:
+    """Store (prompt, reply) conversation turns as 'prompt'/'reply' message_logs rows"""
+    try:
+        with get_db() as conn:
+            conn.executemany(
+                "INSERT INTO message_logs (user_id, message_type, content) VALUES (?, ?, ?)",
+                [(user_id, message_type, content) for turn in turns for message_type, content in zip(('prompt', 'reply'), turn)]
+            )
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Failed to save conversation: {str(e)}")
+        return False
+
+def create_broadcast(admin_id: int, chat_id: int, text: str) -> Optional[int]:
+    try:
+        with get_db() as conn:
+            cursor = conn.execute(
+                "INSERT INTO broadcasts (admin_id, chat_id, text) VALUES (?, ?, ?)",
+                (admin_id, chat_id, text)
+            )
+        return cursor.lastrowid
+    except sqlite3.Error as e:
+        logger.error(f"Failed to create broadcast: {str(e)}")
+        return None
+
+def get_broadcasts(status: str = 'running') -> List[Dict]:
+    try:
+        with get_manager().read() as conn:
+            cursor = conn.execute("SELECT * FROM broadcasts WHERE status = ? ORDER BY id", (status,))
+            return [dict(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Failed to get broadcasts: {str(e)}")
+        return []
+
+def get_user_page(after_user_id: int, limit: int) -> List[int]:
+    """Keyset pagination over users by primary key; errors propagate so a broadcast never mistakes them for the end"""
+    with get_manager().read() as conn:
+        cursor = conn.execute(
+            "SELECT user_id FROM users WHERE user_id > ? ORDER BY user_id LIMIT ?",
+            (after_user_id, limit)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+def get_delivered_ids(broadcast_id: int, first_user_id: int, last_user_id: int) -> set:
+    """Users in [first, last] that already have a delivery result"""
+    with get_manager().read() as conn:
+        cursor = conn.execute("""
+            SELECT user_id FROM broadcast_deliveries
+            WHERE broadcast_id = ? AND user_id BETWEEN ? AND ?
+        """, (broadcast_id, first_user_id, last_user_id))
+        return {row[0] for row in cursor.fetchall()}
+
+def record_deliveries(broadcast_id: int, results: List[tuple], cursor: Optional[int] = None, status: Optional[str] = None) -> bool:
+    """
+    Store (user_id, status) delivery results and bump the broadcast's counters,
+    optionally advancing its cursor or finishing it, all in one transaction.
+    """
     try:
         with get_db() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO broadcast_deliveries (broadcast_id, user_id, status) VALUES (?, ?, ?)",
+                [(broadcast_id, user_id, result) for user_id, result in results]
+            )
+            sent = sum(1 for _, result in results if result == 'sent')
+            conn.execute("""
+                UPDATE broadcasts SET
+                    sent = sent + ?,
+                    failed = failed + ?,
+                    cursor = COALESCE(?, cursor),
+                    status = COALESCE(?, status),
+                    finished_at = CASE WHEN ? IS NULL THEN finished_at ELSE datetime('now') END
+                WHERE id = ?
+            """, (sent, len(results) - sent, cursor, status, status, broadcast_id))
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Failed to record deliveries: {str(e)}")
+        return False
+
+def verify_database() -> bool:
+    try:
+        with get_manager().read() as conn:
             cursor = conn.cursor()
             cursor.execute("PRAGMA integrity_check")
             if cursor.fetchone()[0] != "ok":
@@ -198,7 +567,7 @@ def verify_database() -> bool:
 
 def get_all_users() -> List[Dict]:
     try:
-        with get_db() as conn:
+        with get_manager().read() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT user_id, username, first_name, last_name 
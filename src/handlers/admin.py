@@ -1,8 +1,15 @@
+import io
+import time
+
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import CommandHandler, CallbackQueryHandler, ContextTypes
+from telegram.ext import ApplicationHandlerStop, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters
 from src.config import Config
-from src.services.utils import restricted
-from src.database import get_db
+from src.services.broadcast import broadcaster
+from src.services.metrics import AI_SECONDS, DB_SECONDS, HANDLER_SECONDS
+from src.services.outbound import OutboundScheduler
+from src.services.profiler import profiler
+from src.services.utils import instrumented, restricted
+from src import async_db as db
 
 # Sync functions for checking admin/owner status
 def is_admin(user_id):
@@ -11,8 +18,12 @@ def is_admin(user_id):
 
 def is_owner(user_id):
     # Replace with actual logic to check if the user is an owner
-    return user_id == Config.OWNER_USER_ID  # Example check
+    return user_id == getattr(Config, "OWNER_USER_ID", None)  # Example check
+
+def _ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.0f}ms"
 
+@instrumented
 @restricted
 async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     keyboard = [
@@ -25,6 +36,7 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode="Markdown"
     )
 
+@instrumented
 async def admin_button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -37,44 +49,135 @@ async def admin_button_handler(update: Update, context: ContextTypes.DEFAULT_TYP
         return
 
     if query.data == "bot_stats":
-        with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM users")
-            total_users = cursor.fetchone()[0]
-            
-            cursor.execute("""
-            SELECT COUNT(*) FROM users 
-            WHERE last_active > datetime('now', '-7 days')
-            """)
-            active_users = cursor.fetchone()[0]
-            
-            cursor.execute("""
-            SELECT COUNT(*) FROM (
-                SELECT DISTINCT user_id FROM users 
-                WHERE last_active > datetime('now', '-1 day')
-            )""")
-            daily_active = cursor.fetchone()[0]
-        
+        stats = await db.get_bot_stats()
+
         stats_text = (
             "🤖 *Bot Statistics*\n\n"
-            f"👥 Total Users: `{total_users}`\n"
-            f"🟢 Active (7 days): `{active_users}`\n"
-            f"🌞 Daily Active: `{daily_active}`"
+            f"👥 Total Users: `{stats['total_users']}`\n"
+            f"🟢 Active (7 days): `{stats['active_users']}`\n"
+            f"🌞 Daily Active: `{stats['daily_active']}`"
         )
+        scheduler = context.bot.rate_limiter
+        if isinstance(scheduler, OutboundScheduler):
+            outbound = scheduler.stats()
+            latency = outbound["send_latency"]
+            stats_text += (
+                f"\n\n📤 Outbound queue: `{outbound['queue_depth']}`\n"
+                f"⏱ Send latency p50/p95: `{_ms(latency['p50'])} / {_ms(latency['p95'])}`\n"
+                f"🔁 Flood-control retries: `{outbound['retries']}`"
+            )
         await query.edit_message_text(
             stats_text,
             parse_mode="Markdown"
         )
     
     elif query.data == "start_broadcast":
+        context.user_data["awaiting_broadcast"] = True
         await query.edit_message_text(
             "📢 Send the message you want to broadcast to all users:",
             parse_mode="Markdown"
         )
 
+async def _start_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
+    broadcast = await broadcaster.start(context.bot, update.effective_user.id, update.effective_chat.id, text)
+    if broadcast is None:
+        await update.message.reply_text("❌ Could not start the broadcast.")
+
+@instrumented
+async def broadcast_text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Takes the admin's next message after the Broadcast button as the broadcast text"""
+    if not context.user_data.pop("awaiting_broadcast", False):
+        return
+    await _start_broadcast(update, context, update.message.text)
+    raise ApplicationHandlerStop
+
+@instrumented
+@restricted
+async def broadcast_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    text = update.message.text.partition(" ")[2].strip()
+    if not text:
+        await update.message.reply_text("Usage: /broadcast <message>")
+        return
+    await _start_broadcast(update, context, text)
+
+@instrumented
+@restricted
+async def cancel_broadcast_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args or not context.args[0].isdigit():
+        running = ", ".join(f"#{broadcast_id}" for broadcast_id in broadcaster.active) or "none"
+        await update.message.reply_text(f"Usage: /cancel_broadcast <id>\nRunning: {running}")
+        return
+    if broadcaster.cancel(int(context.args[0])):
+        await update.message.reply_text(f"🛑 Cancelling broadcast #{context.args[0]}...")
+    else:
+        await update.message.reply_text(f"❌ No running broadcast #{context.args[0]}.")
+
+def _metrics_table(title, histogram, limit):
+    rows = histogram.top(limit)
+    lines = [f"{title:<30}{'calls':>7}{'err':>5}{'p50':>8}{'p95':>8}"]
+    for row in rows:
+        name = "/".join(row["labels"])[:29]
+        lines.append(f"{name:<30}{row['count']:>7}{int(row['errors']):>5}{_ms(row['p50']):>8}{_ms(row['p95']):>8}")
+    if not rows:
+        lines.append("(nothing yet)")
+    return "\n".join(lines)
+
+@instrumented
+@restricted
+async def metrics_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    tables = [
+        _metrics_table("handler", HANDLER_SECONDS, 10),
+        _metrics_table("db query", DB_SECONDS, 8),
+        _metrics_table("ai provider", AI_SECONDS, 5),
+    ]
+    await update.message.reply_text(
+        "📈 *Metrics* (busiest first)\n```\n" + "\n\n".join(tables) + "\n```",
+        parse_mode="Markdown"
+    )
+
+async def _send_profile(context: ContextTypes.DEFAULT_TYPE, chat_id: int, seconds: int):
+    try:
+        collapsed = await profiler.run(seconds)
+    except Exception as e:
+        await context.bot.send_message(chat_id, f"❌ Profiling failed: {e}")
+        return
+    hot = "\n".join(f"• {frame}" for frame in profiler.top(collapsed, limit=3))
+    await context.bot.send_document(
+        chat_id,
+        document=io.BytesIO(collapsed.encode()),
+        filename=f"bunny-{time.strftime('%Y%m%d-%H%M%S')}.folded",
+        caption=(
+            f"🔬 {seconds}s, {profiler.samples} samples. Collapsed stacks for flamegraph.pl or speedscope.\n"
+            f"Tasks mostly waiting in:\n{hot or '-'}"
+        )[:1024]
+    )
+
+@instrumented
+@restricted
+async def profiler_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if context.args and not context.args[0].isdigit():
+        await update.message.reply_text(f"Usage: /profiler [seconds, up to {Config.PROFILE_MAX_SECONDS}]")
+        return
+    if profiler.running:
+        await update.message.reply_text("⏳ A profile is already being recorded.")
+        return
+    seconds = min(max(int(context.args[0]) if context.args else 30, 1), Config.PROFILE_MAX_SECONDS)
+    await update.message.reply_text(f"🔬 Profiling for {seconds}s...")
+    # In the background, so this admin's later updates are not held up behind it
+    context.application.create_task(_send_profile(context, update.effective_chat.id, seconds), update=update)
+
 def setup_admin(application):
     application.add_handler(CommandHandler("admin", admin_panel))
-    application.add_handler(CallbackQueryHandler(admin_button_handler))
+    application.add_handler(CommandHandler("broadcast", broadcast_cmd))
+    application.add_handler(CommandHandler("cancel_broadcast", cancel_broadcast_cmd))
+    application.add_handler(CommandHandler("metrics", metrics_cmd))
+    application.add_handler(CommandHandler("profiler", profiler_cmd))
+    application.add_handler(CallbackQueryHandler(admin_button_handler, pattern=r"^(bot_stats|start_broadcast)$"))
+    # Ahead of the AI chat handler so the broadcast text is not answered as chat
+    application.add_handler(
+        MessageHandler(filters.TEXT & ~filters.COMMAND & filters.User(Config.ADMIN_USER_IDS), broadcast_text_handler),
+        group=-1
+    )
 
 async def backup_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not is_admin(update.effective_user.id):
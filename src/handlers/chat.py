@@ -1,15 +1,17 @@
 from telegram import Update
 from telegram.ext import ContextTypes, MessageHandler, filters
 from models.ai_router import generate_with_fallback
-from src.services.utils import rate_limited
-from src.database import update_user_activity
+from src.services.utils import instrumented, rate_limited
+from src.services.rate_limiter import COSTS
+from src import async_db as db
 
-@rate_limited()
+@instrumented
+@rate_limited(cost=COSTS["message"])
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle all text messages"""
     # Update user activity
     user = update.effective_user
-    update_user_activity(
+    await db.update_user_activity(
         user.id,
         user.username or "",
         user.first_name,
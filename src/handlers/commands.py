@@ -5,72 +5,66 @@ from telegram.ext import (
     ContextTypes, CommandHandler, CallbackQueryHandler, Application
 )
 
-from src.database import (
-    get_user_stats,
-    add_points,
-    get_leaderboard,
-    get_achievements,
-    update_user_activity,
-    get_db
-)
-from src.achievements import check_achievements
-from src.utils import escape_markdown
+from src import async_db as db
+from src import messages
+from src.services.utils import instrumented, rate_limited
 
 logger = logging.getLogger(__name__)
 
 # ─────────────────────────────── COMMANDS ─────────────────────────────── #
 
+@instrumented
+@rate_limited()
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         user = update.effective_user
-        update_user_activity(user.id, user.username, user.first_name, user.last_name)
+        await db.update_user_activity(user.id, user.username, user.first_name, user.last_name)
         await update.message.reply_text(
-            escape_markdown("👋 Welcome! Use /help to see available commands."),
+            messages.WELCOME,
             parse_mode="MarkdownV2"
         )
     except Exception as e:
         logger.error(f"Start command failed: {str(e)}")
         await update.message.reply_text(
-            escape_markdown("⚠️ Could not process command. Please try again later."),
+            messages.START_FAILED,
             parse_mode="MarkdownV2"
         )
 
+@instrumented
+@rate_limited()
 async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
-        help_text = escape_markdown("""
-*Available Commands:*
-/start - Start the bot
-/profile - View your profile
-/daily - Claim daily reward
-/leaderboard - Top users
-/help - Show this help message
-""")
-        await update.message.reply_text(help_text, parse_mode="MarkdownV2")
+        await update.message.reply_text(messages.HELP, parse_mode="MarkdownV2")
     except Exception as e:
         logger.error(f"Help command failed: {str(e)}")
         await update.message.reply_text(
-            escape_markdown("⚠️ Could not show help. Please try again later."),
+            messages.HELP_FAILED,
             parse_mode="MarkdownV2"
         )
 
+@instrumented
+@rate_limited()
 async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         user = update.effective_user
-        stats = get_user_stats(user.id) or {}
+        stats = await db.get_user_stats(user.id) or {}
 
         if not stats:
-            update_user_activity(user.id, user.username, user.first_name, user.last_name)
-            stats = get_user_stats(user.id) or {}
-
-        achievements = get_achievements(user.id) or []
-
-        response = escape_markdown(
-            f"👤 Profile: {user.first_name or 'User'}\n"
-            f"🆔 ID: {user.id}\n"
-            f"⭐ Points: {stats.get('points', 0)}\n"
-            f"✉️ Messages: {stats.get('message_count', 0)}\n"
-            f"🏆 Achievements: {len(achievements)}"
+            await db.update_user_activity(user.id, user.username, user.first_name, user.last_name)
+            stats = await db.get_user_stats(user.id) or {}
+
+        achievements = await db.get_achievements(user.id) or []
+        rank = await db.get_rank(user.id)
+
+        response = messages.PROFILE.format(
+            name=user.first_name or 'User',
+            user_id=user.id,
+            points=stats.get('points', 0),
+            messages=stats.get('message_count', 0),
+            achievements=len(achievements)
         )
+        if rank:
+            response += messages.PROFILE_RANK.format(rank=rank[0], total=rank[1])
 
         keyboard = [
             [InlineKeyboardButton("View Achievements", callback_data=f"achievements_{user.id}")],
@@ -85,91 +79,87 @@ async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception as e:
         logger.error(f"Profile command failed: {str(e)}")
         await update.message.reply_text(
-            escape_markdown("⚠️ Could not load profile. Please try again later."),
+            messages.PROFILE_FAILED,
             parse_mode="MarkdownV2"
         )
 
+@instrumented
+@rate_limited()
 async def daily_reward(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         user = update.effective_user
-        stats = get_user_stats(user.id) or {}
+        stats = await db.get_user_stats(user.id) or {}
 
         if not stats:
-            update_user_activity(user.id, user.username, user.first_name, user.last_name)
-            stats = get_user_stats(user.id) or {}
+            await db.update_user_activity(user.id, user.username, user.first_name, user.last_name)
+            stats = await db.get_user_stats(user.id) or {}
 
         last_daily = datetime.strptime(stats['last_daily'], "%Y-%m-%d %H:%M:%S") if stats.get('last_daily') else None
 
         if last_daily and (datetime.now() - last_daily).days < 1:
             remaining = 24 - (datetime.now() - last_daily).seconds // 3600
             await update.message.reply_text(
-                escape_markdown(f"⏳ Come back in {remaining} hours to claim your next reward!"),
+                messages.DAILY_WAIT.format(hours=remaining),
                 parse_mode="MarkdownV2"
             )
             return
 
-        points_added = add_points(user.id, 10)
-
-        if points_added:
-            with get_db() as conn:
-                conn.execute(
-                    "UPDATE users SET last_daily = datetime('now') WHERE user_id = ?", 
-                    (user.id,)
-                )
-                conn.commit()
-
-            achievement = check_achievements(user.id)
-            response = escape_markdown("🎁 Daily Reward Claimed!\n\n+10 points")
+        earned = await db.claim_daily(user.id, 10)
 
-            if achievement:
-                response += escape_markdown(
-                    f"\n\n🏆 New Achievement!\n"
-                    f"{achievement['name']}: {achievement['description']}"
+        if earned is not None:
+            response = messages.DAILY_CLAIMED
+            for achievement in earned:
+                response += messages.NEW_ACHIEVEMENT.format(
+                    name=achievement['name'],
+                    description=achievement['description']
                 )
 
             await update.message.reply_text(response, parse_mode="MarkdownV2")
         else:
             await update.message.reply_text(
-                escape_markdown("⚠️ Could not add points. Please try again later."),
+                messages.POINTS_FAILED,
                 parse_mode="MarkdownV2"
             )
     except Exception as e:
         logger.error(f"Daily reward failed: {str(e)}")
         await update.message.reply_text(
-            escape_markdown("⚠️ Could not process daily reward. Please try again later."),
+            messages.DAILY_FAILED,
             parse_mode="MarkdownV2"
         )
 
+@instrumented
+@rate_limited()
 async def leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
-        top_users = get_leaderboard(limit=10)
+        top_users = await db.get_leaderboard(limit=10)
 
         if not top_users:
             await update.message.reply_text(
-                escape_markdown("🏆 No users on the leaderboard yet! Be the first!"),
+                messages.LEADERBOARD_EMPTY,
                 parse_mode="MarkdownV2"
             )
             return
 
-        response = [escape_markdown("🏆 Top 10 Users")]
+        response = [messages.LEADERBOARD_TITLE]
         for i, user in enumerate(top_users, 1):
-            username = escape_markdown(
+            username = (
                 user.get('username') or 
                 f"{user.get('first_name', '')} {user.get('last_name', '')}".strip() or 
                 f"User {user['user_id']}"
             )
-            response.append(escape_markdown(f"{i}. {username}: {user['points']} points"))
+            response.append(messages.LEADERBOARD_ROW.format(rank=i, name=username, points=user['points']))
 
         await update.message.reply_text("\n".join(response), parse_mode="MarkdownV2")
     except Exception as e:
         logger.error(f"Leaderboard failed: {str(e)}")
         await update.message.reply_text(
-            escape_markdown("⚠️ Could not load leaderboard. Please try again later."),
+            messages.LEADERBOARD_FAILED,
             parse_mode="MarkdownV2"
         )
 
 # ───────────────────────────── CALLBACK HANDLER ───────────────────────────── #
 
+@instrumented
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -177,15 +167,15 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         if query.data.startswith("achievements_"):
             user_id = int(query.data.split("_")[1])
-            achievements = get_achievements(user_id)
+            achievements = await db.get_achievements(user_id)
 
             if achievements:
-                text = [escape_markdown("🏆 Your Achievements")]
+                text = [messages.ACHIEVEMENTS_TITLE]
                 for a in achievements:
-                    text.append(escape_markdown(f"• {a['name']} - {a['earned_date']}"))
+                    text.append(messages.ACHIEVEMENT_ROW.format(name=a['name'], earned=a['earned_date']))
                 response = "\n".join(text)
             else:
-                response = escape_markdown("You haven't earned any achievements yet!")
+                response = messages.NO_ACHIEVEMENTS
 
             await query.edit_message_text(response, parse_mode="MarkdownV2")
 
@@ -195,7 +185,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception as e:
         logger.error(f"Button handler failed: {str(e)}")
         await query.edit_message_text(
-            escape_markdown("⚠️ Action failed."),
+            messages.ACTION_FAILED,
             parse_mode="MarkdownV2"
         )
 
@@ -208,7 +198,7 @@ def setup_commands(application: Application):
         application.add_handler(CommandHandler("profile", profile))
         application.add_handler(CommandHandler("daily", daily_reward))
         application.add_handler(CommandHandler("leaderboard", leaderboard))
-        application.add_handler(CallbackQueryHandler(button_handler))
+        application.add_handler(CallbackQueryHandler(button_handler, pattern=r"^(achievements_\d+|daily)$"))
 
         logger.info("Command handlers registered successfully")
     except Exception as e:
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+
+from telegram import Update
+from telegram.ext import Application, CommandHandler, ContextTypes
+
+from src import messages
+from src.services.image_jobs import DONE, FAILED, STARTED, image_queue
+from src.services.rate_limiter import COSTS
+from src.services.utils import instrumented, rate_limited
+
+logger = logging.getLogger(__name__)
+
+# Telegram's limit on photo captions
+MAX_CAPTION = 1024
+
+# ─────────────────────────────── COMMANDS ─────────────────────────────── #
+
+@instrumented
+@rate_limited(cost=COSTS["image"])
+async def imagine(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Queue an image; the worker that runs it edits the status message and sends the photo"""
+    try:
+        prompt = " ".join(context.args or []).strip()
+        if not prompt:
+            await update.message.reply_text(messages.IMAGE_USAGE, parse_mode="MarkdownV2")
+            return
+        caption = prompt[:MAX_CAPTION]
+
+        image = await image_queue.cached(prompt)
+        if image is not None:
+            await update.message.reply_photo(image, caption=caption)
+            return
+        if image_queue.full:
+            await update.message.reply_text(messages.IMAGE_BUSY, parse_mode="MarkdownV2")
+            return
+
+        status = await update.message.reply_text(
+            messages.IMAGE_QUEUED.format(ahead=image_queue.waiting),
+            parse_mode="MarkdownV2"
+        )
+
+        async def notify(state, image):
+            if state == STARTED:
+                await status.edit_text(messages.IMAGE_GENERATING, parse_mode="MarkdownV2")
+            elif state == DONE:
+                await update.message.reply_photo(image, caption=caption)
+                await status.delete()
+            elif state == FAILED:
+                await status.edit_text(messages.IMAGE_FAILED, parse_mode="MarkdownV2")
+
+        try:
+            image_queue.submit(prompt, notify)
+        except asyncio.QueueFull:
+            await status.edit_text(messages.IMAGE_BUSY, parse_mode="MarkdownV2")
+    except Exception as e:
+        logger.error(f"Imagine command failed: {str(e)}")
+        await update.message.reply_text(messages.IMAGE_FAILED, parse_mode="MarkdownV2")
+
+def setup_images(application: Application):
+    application.add_handler(CommandHandler("imagine", imagine))
@@ -3,10 +3,12 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
-from src.database import get_leaderboard
+from src import async_db as db
+from src.services.utils import instrumented
 
+@instrumented
 async def leaderboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    data = get_leaderboard()
+    data = await db.get_leaderboard()
     if not data:
         await update.message.reply_text("📉 No leaderboard data available yet.")
         return
@@ -1,6 +1,8 @@
 from telegram.ext import CommandHandler
 import asyncio
+from src.services.utils import instrumented
 
+@instrumented
 async def remind(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         delay, task = parse_reminder(context.args)  # Implement parsing logic
@@ -1,14 +1,16 @@
 from telegram import Update
 from telegram.ext import ContextTypes
-from src.database import get_all_users
+from src import async_db as db
 from src.config import Config
+from src.services.utils import instrumented
 
+@instrumented
 async def list_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.effective_user.id != Config.OWNER_ID:
         await update.message.reply_text("❌ You don't have permission to use this command.")
         return
 
-    users = get_all_users()
+    users = await db.get_all_users()
     if not users:
         await update.message.reply_text("No users found.")
         return
@@ -0,0 +1,54 @@
+"""
+User-facing MarkdownV2 texts, escaped once at import.
+
+Static messages are plain pre-escaped strings; messages with dynamic parts
+are MarkdownTemplates, which escape only the substituted values.
+"""
+from src.utils import MarkdownTemplate, escape_markdown
+
+# ─── STATIC ─── #
+
+WELCOME = escape_markdown("👋 Welcome! Use /help to see available commands.")
+HELP = escape_markdown("""
+*Available Commands:*
+/start - Start the bot
+/profile - View your profile
+/daily - Claim daily reward
+/leaderboard - Top users
+/imagine <prompt> - Generate an image
+/help - Show this help message
+""")
+DAILY_CLAIMED = escape_markdown("🎁 Daily Reward Claimed!\n\n+10 points")
+LEADERBOARD_TITLE = escape_markdown("🏆 Top 10 Users")
+LEADERBOARD_EMPTY = escape_markdown("🏆 No users on the leaderboard yet! Be the first!")
+ACHIEVEMENTS_TITLE = escape_markdown("🏆 Your Achievements")
+NO_ACHIEVEMENTS = escape_markdown("You haven't earned any achievements yet!")
+
+START_FAILED = escape_markdown("⚠️ Could not process command. Please try again later.")
+HELP_FAILED = escape_markdown("⚠️ Could not show help. Please try again later.")
+PROFILE_FAILED = escape_markdown("⚠️ Could not load profile. Please try again later.")
+POINTS_FAILED = escape_markdown("⚠️ Could not add points. Please try again later.")
+DAILY_FAILED = escape_markdown("⚠️ Could not process daily reward. Please try again later.")
+LEADERBOARD_FAILED = escape_markdown("⚠️ Could not load leaderboard. Please try again later.")
+ACTION_FAILED = escape_markdown("⚠️ Action failed.")
+
+IMAGE_USAGE = escape_markdown("🎨 Usage: /imagine <description of the image>")
+IMAGE_BUSY = escape_markdown("⏳ Too many images are being generated right now. Please try again in a few minutes.")
+IMAGE_GENERATING = escape_markdown("🎨 Generating your image...")
+IMAGE_FAILED = escape_markdown("⚠️ Could not generate the image. Please try again later.")
+
+# ─── TEMPLATES ─── #
+
+PROFILE = MarkdownTemplate(
+    "👤 Profile: {name}\n"
+    "🆔 ID: {user_id}\n"
+    "⭐ Points: {points}\n"
+    "✉️ Messages: {messages}\n"
+    "🏆 Achievements: {achievements}"
+)
+PROFILE_RANK = MarkdownTemplate("\n📊 Rank: #{rank} of {total}")
+DAILY_WAIT = MarkdownTemplate("⏳ Come back in {hours} hours to claim your next reward!")
+NEW_ACHIEVEMENT = MarkdownTemplate("\n\n🏆 New Achievement!\n{name}: {description}")
+LEADERBOARD_ROW = MarkdownTemplate("{rank}. {name}: {points} points")
+ACHIEVEMENT_ROW = MarkdownTemplate("• {name} - {earned}")
+IMAGE_QUEUED = MarkdownTemplate("🎨 Queued, {ahead} ahead of you...")
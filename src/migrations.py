@@ -0,0 +1,276 @@
+"""
+Versioned schema migrations.
+
+Every database file the bot has written (the STRICT tables of init_db, the
+db/bot_data.db of the old create_tables.py script, the early data/bot.db)
+is brought to the same schema by applying the steps in MIGRATIONS above the
+version recorded in the schema_version table, one row per applied step.
+
+Each step runs in its own BEGIN IMMEDIATE transaction, so the write lock is
+held for one step at a time and WAL readers are never blocked; the version
+is re-read inside the transaction, so two processes starting together apply
+a step once. Steps are idempotent because databases created before
+versioning start at version 0 with most of the schema already in place.
+Steps are never edited once released; a schema change is a new step.
+"""
+import logging
+import sqlite3
+import time
+from typing import Callable, List, NamedTuple
+
+from src.achievements import ACHIEVEMENTS
+
+logger = logging.getLogger(__name__)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Connection], None]
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    """Register a schema step; versions must be applied in increasing order"""
+    def register(fn):
+        MIGRATIONS.append(Migration(version, description, fn))
+        return fn
+    return register
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _exists(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def _is_strict(conn: sqlite3.Connection, table: str) -> bool:
+    row = conn.execute("SELECT strict FROM pragma_table_list WHERE schema = 'main' AND name = ?", (table,)).fetchone()
+    return bool(row and row[0])
+
+
+# The tables as init_db created them when versioning was introduced
+_V1_TABLES = {
+    "users": """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT,
+        first_name TEXT,
+        last_name TEXT,
+        message_count INTEGER DEFAULT 0,
+        points INTEGER DEFAULT 0,
+        join_date TEXT DEFAULT CURRENT_TIMESTAMP,
+        last_active TEXT,
+        last_daily TEXT,
+        notification_prefs TEXT DEFAULT '{}',
+        active_days INTEGER DEFAULT 0,
+        last_active_day TEXT
+    ) STRICT
+    """,
+    "achievements": """
+    CREATE TABLE IF NOT EXISTS achievements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        earned_date TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(user_id) REFERENCES users(user_id) ON DELETE CASCADE
+    ) STRICT
+    """,
+    "message_logs": """
+    CREATE TABLE IF NOT EXISTS message_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        message_type TEXT NOT NULL,
+        content TEXT,
+        timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(user_id) REFERENCES users(user_id) ON DELETE CASCADE
+    ) STRICT
+    """,
+    "broadcasts": """
+    CREATE TABLE IF NOT EXISTS broadcasts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        admin_id INTEGER NOT NULL,
+        chat_id INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'running',
+        cursor INTEGER NOT NULL DEFAULT 0,
+        sent INTEGER NOT NULL DEFAULT 0,
+        failed INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        finished_at TEXT
+    ) STRICT
+    """,
+    "broadcast_deliveries": """
+    CREATE TABLE IF NOT EXISTS broadcast_deliveries (
+        broadcast_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        PRIMARY KEY (broadcast_id, user_id)
+    ) STRICT, WITHOUT ROWID
+    """,
+}
+
+
+@migration(1, "create tables")
+def _create_tables(conn: sqlite3.Connection):
+    for sql in _V1_TABLES.values():
+        conn.execute(sql)
+
+
+@migration(2, "users columns added after the first release")
+def _add_user_columns(conn: sqlite3.Connection):
+    # ADD COLUMN only rewrites the schema, not the rows
+    columns = _columns(conn, "users")
+    if "active_days" not in columns:
+        conn.execute("ALTER TABLE users ADD COLUMN active_days INTEGER DEFAULT 0")
+    if "last_active_day" not in columns:
+        conn.execute("ALTER TABLE users ADD COLUMN last_active_day TEXT")
+
+
+@migration(3, "rebuild tables created before STRICT")
+def _rebuild_loose_tables(conn: sqlite3.Connection):
+    """
+    Files from create_tables.py and the early bot have a users table without
+    STRICT and most columns. Copy it into the canonical definition; STRICT
+    converts values that fit the column type losslessly and fails the step on
+    any that do not. Children of users whose user is gone are dropped, as
+    ON DELETE CASCADE would have done.
+    """
+    rebuilt = False
+    for table, sql in _V1_TABLES.items():
+        if _is_strict(conn, table):
+            continue
+        old = set(_columns(conn, table))
+        conn.execute(sql.replace(f"IF NOT EXISTS {table} ", f"{table}_new ", 1))
+        shared = ", ".join(column for column in _columns(conn, f"{table}_new") if column in old)
+        conn.execute(f"INSERT INTO {table}_new ({shared}) SELECT {shared} FROM {table}")
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+        logger.info(f"Rebuilt {table} as STRICT, keeping {shared}")
+        rebuilt = True
+    if rebuilt:
+        for child in ("achievements", "message_logs"):
+            conn.execute(f"DELETE FROM {child} WHERE user_id NOT IN (SELECT user_id FROM users)")
+
+
+@migration(4, "move the messages table of create_tables.py into message_logs")
+def _merge_messages(conn: sqlite3.Connection):
+    if not _exists(conn, "messages"):
+        return
+    conn.execute("""
+        INSERT INTO message_logs (user_id, message_type, content, timestamp)
+        SELECT user_id, 'message', text, date FROM messages
+        WHERE user_id IN (SELECT user_id FROM users)
+        ORDER BY message_id
+    """)
+    conn.execute("DROP TABLE messages")
+
+
+# Index builds scan their whole table under the write lock, so each one is
+# its own step and writers wait for one build at a time, not all of them
+
+
+@migration(5, "leaderboard index on users.points")
+def _index_points(conn: sqlite3.Connection):
+    # user_id is the rowid; an index on it only costs writes
+    conn.execute("DROP INDEX IF EXISTS idx_users_user_id")
+    # Leaderboard, rank and the in-memory leaderboard load; covers (points, user_id)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_points ON users(points DESC)")
+
+
+@migration(6, "active-user index on users.last_active")
+def _index_last_active(conn: sqlite3.Connection):
+    # Active-user counts and the activity sketch; covers (last_active, user_id)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_last_active ON users(last_active)")
+
+
+@migration(7, "one row per earned achievement")
+def _index_achievements(conn: sqlite3.Connection):
+    # Deduplicated in the same step, or a write between the two could break the build;
+    # awarding relies on this index to skip achievements already earned
+    conn.execute("DELETE FROM achievements WHERE id NOT IN (SELECT MIN(id) FROM achievements GROUP BY user_id, name)")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_achievements_user_name ON achievements(user_id, name)")
+    conn.execute("DROP INDEX IF EXISTS idx_achievements_user_id")
+
+
+@migration(8, "conversation index on message_logs.user_id")
+def _index_message_logs(conn: sqlite3.Connection):
+    # A user's recent turns, newest first by id
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_message_logs_user_id ON message_logs(user_id)")
+
+
+@migration(9, "award the achievements existing users already qualify for")
+def _backfill_achievements(conn: sqlite3.Connection):
+    """
+    Achievements are awarded when a counter crosses a threshold, so users
+    whose counters were past it before the engine existed never crossed it.
+    Insert every achievement the current counters satisfy; the unique
+    (user_id, name) index skips the ones already earned. A rule added later
+    needs a step like this one of its own.
+    """
+    columns = set(_columns(conn, "users"))
+    for rule in ACHIEVEMENTS.values():
+        if rule["counter"] not in columns:
+            continue
+        cursor = conn.execute(
+            f"INSERT OR IGNORE INTO achievements (user_id, name) SELECT user_id, ? FROM users WHERE {rule['counter']} >= ?",
+            (rule["name"], rule["threshold"])
+        )
+        if cursor.rowcount:
+            logger.info(f"Backfilled {rule['name']} for {cursor.rowcount} users")
+
+
+def _version(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def latest_version() -> int:
+    return max(step.version for step in MIGRATIONS)
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply the pending migrations; returns the schema version now in place"""
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+    ) STRICT
+    """)
+    version = _version(conn)
+    pending = [step for step in sorted(MIGRATIONS) if step.version > version]
+    if not pending:
+        return version
+
+    # Rebuilding a table drops it; with foreign keys on that would cascade into its children
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for step in pending:
+            conn.execute("BEGIN IMMEDIATE")
+            started = time.monotonic()
+            try:
+                if _version(conn) >= step.version:
+                    conn.rollback()
+                    continue
+                step.apply(conn)
+                dangling = [row for table in _V1_TABLES for row in conn.execute(f"PRAGMA foreign_key_check({table})")]
+                if dangling:
+                    raise sqlite3.IntegrityError(f"Migration {step.version} left {len(dangling)} dangling foreign keys")
+                conn.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)", (step.version, step.description))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            # How long writers were locked out
+            logger.info(f"Applied schema migration {step.version}: {step.description} "
+                        f"({(time.monotonic() - started) * 1000:.0f} ms)")
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+    return _version(conn)
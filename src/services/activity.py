@@ -0,0 +1,181 @@
+"""
+Write-behind buffer for user activity.
+
+Every incoming message used to cost an INSERT OR IGNORE, an UPDATE and a
+commit. ActivityBuffer merges message-count increments and name changes per
+user in memory and hands them to the database in one batched transaction
+every `interval` seconds or `max_events` events, whichever comes first.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (user_id, username, first_name, last_name, message_delta, first_seen, last_active)
+ActivityRow = Tuple[int, Optional[str], Optional[str], Optional[str], int, str, str]
+
+
+def _utcnow() -> str:
+    # Same format as SQLite's datetime('now')
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+
+
+class PendingActivity:
+    __slots__ = ("count", "username", "first_name", "last_name", "first_seen", "last_active")
+
+    def __init__(self, now: str):
+        self.count = 0
+        self.username = None
+        self.first_name = None
+        self.last_name = None
+        self.first_seen = now
+        self.last_active = now
+
+    def merge(self, newer: "PendingActivity"):
+        """Fold a newer entry for the same user into this one"""
+        self.count += newer.count
+        self.username = newer.username or self.username
+        self.first_name = newer.first_name or self.first_name
+        self.last_name = newer.last_name or self.last_name
+        self.last_active = newer.last_active
+
+
+class ActivityBuffer:
+    def __init__(self, flush: Callable[[List[ActivityRow]], Awaitable[bool]], interval: float = 0.5, max_events: int = 500):
+        self.interval = interval
+        self.max_events = max_events
+        self._flush_fn = flush
+        self._pending: Dict[int, PendingActivity] = {}
+        self._events = 0
+        self._generation = 0
+        self._flush_lock = asyncio.Lock()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending_users(self) -> int:
+        return len(self._pending)
+
+    def record(self, user_id: int, username: Optional[str] = None, first_name: Optional[str] = None, last_name: Optional[str] = None):
+        """Count one message for the user; None names keep the stored value"""
+        now = _utcnow()
+        entry = self._pending.get(user_id)
+        if entry is None:
+            entry = self._pending[user_id] = PendingActivity(now)
+        entry.count += 1
+        entry.username = username or entry.username
+        entry.first_name = first_name or entry.first_name
+        entry.last_name = last_name or entry.last_name
+        entry.last_active = now
+
+        self._events += 1
+        if self._events >= self.max_events:
+            self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """Write everything buffered so far in one transaction"""
+        async with self._flush_lock:
+            if not self._pending:
+                return True
+
+            batch, self._pending = self._pending, {}
+            self._events = 0
+            self._generation += 1
+            self._idle.clear()
+            rows = [
+                (user_id, e.username, e.first_name, e.last_name, e.count, e.first_seen, e.last_active)
+                for user_id, e in batch.items()
+            ]
+            try:
+                ok = await self._flush_fn(rows)
+            except Exception as e:
+                logger.error(f"Activity flush failed: {str(e)}")
+                ok = False
+            finally:
+                self._idle.set()
+
+            if not ok:
+                # Put the batch back in front of whatever arrived meanwhile
+                for user_id, newer in self._pending.items():
+                    if user_id in batch:
+                        batch[user_id].merge(newer)
+                    else:
+                        batch[user_id] = newer
+                self._pending = batch
+            return ok
+
+    async def flush_user(self, user_id: int):
+        """Make sure the user's row exists and is current before a dependent write"""
+        if user_id in self._pending:
+            await self.flush()
+        else:
+            await self._idle.wait()
+
+    async def read_through(self, user_id: int, fetch: Callable[[], Awaitable[Optional[Dict]]]) -> Optional[Dict]:
+        """
+        Fetch a users row and add this user's unflushed deltas to it.
+        Retries if a flush overlapped the read, so deltas are never counted twice or lost.
+        """
+        while True:
+            await self._idle.wait()
+            generation = self._generation
+            stats = await fetch()
+            if generation == self._generation and self._idle.is_set():
+                return self.overlay(user_id, stats)
+
+    def overlay(self, user_id: int, stats: Optional[Dict]) -> Optional[Dict]:
+        entry = self._pending.get(user_id)
+        if entry is None:
+            return stats
+        if stats is None:
+            stats = {
+                "user_id": user_id,
+                "username": None,
+                "first_name": None,
+                "last_name": None,
+                "message_count": 0,
+                "points": 0,
+                "join_date": entry.first_seen,
+                "last_active": None,
+                "last_daily": None,
+                "notification_prefs": "{}",
+                "active_days": 0,
+                "last_active_day": None,
+            }
+        else:
+            stats = dict(stats)
+        stats["message_count"] = (stats.get("message_count") or 0) + entry.count
+        stats["username"] = entry.username or stats.get("username")
+        stats["first_name"] = entry.first_name or stats.get("first_name")
+        stats["last_name"] = entry.last_name or stats.get("last_name")
+        stats["last_active"] = entry.last_active
+        return stats
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # Shielded so stop() never cancels a batch halfway through
+            await asyncio.shield(self.flush())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the periodic flush and write out what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
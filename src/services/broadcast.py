@@ -0,0 +1,246 @@
+"""
+Resumable broadcasts to every user.
+
+Users are walked in user_id order with keyset pagination, one page at a time,
+and each page is sent by a pool of workers sharing one GCRA limiter, so the
+whole bot stays under Telegram's ~30 messages/second. A RetryAfter pauses
+every worker for the time Telegram asks for. Messages go out as BULK
+traffic, so the outbound scheduler lets interactive replies go first.
+
+Each delivery result is stored in broadcast_deliveries, and the broadcast's
+cursor moves past a page once all of the page is stored. After a crash or
+restart a running broadcast picks up from its cursor and skips the users of
+that page that already have a result, so nobody gets the message twice.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+
+from src import async_db as db
+from src.config import Config
+from src.services.outbound import BULK
+from src.services.rate_limiter import GCRA, RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Attempts per user on network errors and timeouts before giving up
+MAX_ATTEMPTS = 3
+# Delivery results are stored at least this often while a page is sent
+FLUSH_RESULTS = 50
+
+
+class Broadcast:
+    def __init__(self, bot: Bot, row: Dict, limiter: RateLimiter, concurrency: int, page_size: int, progress_interval: float):
+        self.bot = bot
+        self.id = row["id"]
+        self.chat_id = row["chat_id"]
+        self.text = row["text"]
+        self.cursor = row["cursor"]
+        self.sent = row["sent"]
+        self.failed = row["failed"]
+        self.limiter = limiter
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.progress_interval = progress_interval
+        self.total: Optional[int] = None
+        self.status = "running"
+        self._results: List[tuple] = []
+        self._paused_until = 0.0
+        self._started = time.monotonic()
+        self._sent_this_run = 0
+        self._progress_message = None
+        self._cancelled = False
+        self.task: Optional[asyncio.Task] = None
+
+    def cancel(self):
+        self._cancelled = True
+
+    # ─── DELIVERY ─── #
+
+    async def _deliver(self, user_id: int) -> str:
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await self.limiter.acquire("broadcast")
+            try:
+                await self.bot.send_message(chat_id=user_id, text=self.text, rate_limit_args=BULK)
+                return "sent"
+            except RetryAfter as e:
+                # Flood control applies to the whole bot: pause every worker
+                self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+                logger.warning(f"Broadcast {self.id} paused for {e.retry_after}s by flood control")
+            except Forbidden:
+                return "blocked"
+            except BadRequest as e:
+                logger.debug(f"Broadcast {self.id} to {user_id} rejected: {str(e)}")
+                return "failed"
+            except TelegramError as e:
+                logger.warning(f"Broadcast {self.id} to {user_id} failed (attempt {attempt}): {str(e)}")
+                await asyncio.sleep(attempt)
+        return "failed"
+
+    async def _flush(self, cursor: Optional[int] = None, status: Optional[str] = None):
+        results, self._results = self._results, []
+        if not await db.record_deliveries(self.id, results, cursor, status):
+            self._results = results + self._results
+            raise RuntimeError(f"Could not store results of broadcast {self.id}")
+        for _, result in results:
+            if result == "sent":
+                self.sent += 1
+            else:
+                self.failed += 1
+
+    async def _worker(self, queue: asyncio.Queue):
+        while not self._cancelled:
+            try:
+                user_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            result = await self._deliver(user_id)
+            self._results.append((user_id, result))
+            if result == "sent":
+                self._sent_this_run += 1
+            if len(self._results) >= FLUSH_RESULTS:
+                await self._flush()
+
+    async def _send_page(self, user_ids: List[int]):
+        done = await db.get_delivered_ids(self.id, user_ids[0], user_ids[-1])
+        queue: asyncio.Queue = asyncio.Queue()
+        for user_id in user_ids:
+            if user_id not in done:
+                queue.put_nowait(user_id)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(min(self.concurrency, queue.qsize()))]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+
+    # ─── PROGRESS ─── #
+
+    def progress_text(self) -> str:
+        elapsed = max(time.monotonic() - self._started, 1e-6)
+        pending = len(self._results)
+        done = self.sent + self.failed + pending
+        total = f" / {self.total}" if self.total is not None else ""
+        headline = {
+            "running": "📢 *Broadcast in progress*",
+            "done": "✅ *Broadcast finished*",
+            "cancelled": "🛑 *Broadcast cancelled*",
+        }[self.status]
+        return (
+            f"{headline} (#{self.id})\n\n"
+            f"📨 Processed: `{done}{total}`\n"
+            f"✅ Sent: `{self.sent + sum(1 for _, r in self._results if r == 'sent')}`\n"
+            f"⚠️ Failed/blocked: `{self.failed + sum(1 for _, r in self._results if r != 'sent')}`\n"
+            f"⚡ Throughput: `{self._sent_this_run / elapsed:.1f} msg/s`"
+        )
+
+    async def _report(self):
+        text = self.progress_text()
+        try:
+            if self._progress_message is None:
+                self._progress_message = await self.bot.send_message(chat_id=self.chat_id, text=text, parse_mode="Markdown")
+            else:
+                await self._progress_message.edit_text(text, parse_mode="Markdown")
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                logger.warning(f"Broadcast {self.id} progress update failed: {str(e)}")
+        except TelegramError as e:
+            logger.warning(f"Broadcast {self.id} progress update failed: {str(e)}")
+
+    async def _report_loop(self):
+        while True:
+            await self._report()
+            await asyncio.sleep(self.progress_interval)
+
+    # ─── MAIN LOOP ─── #
+
+    async def run(self):
+        self.total = await db.count_users()
+        reporter = asyncio.create_task(self._report_loop())
+        try:
+            while not self._cancelled:
+                user_ids = await db.get_user_page(self.cursor, self.page_size)
+                if not user_ids:
+                    break
+                await self._send_page(user_ids)
+                if self._cancelled:
+                    break
+                await self._flush(cursor=user_ids[-1])
+                self.cursor = user_ids[-1]
+
+            self.status = "cancelled" if self._cancelled else "done"
+            await self._flush(status=self.status)
+            logger.info(f"Broadcast {self.id} {self.status}: {self.sent} sent, {self.failed} failed")
+        except asyncio.CancelledError:
+            # Shutdown: keep what was delivered, the broadcast resumes on next start
+            if self._results:
+                await asyncio.shield(self._flush())
+            raise
+        except Exception as e:
+            logger.error(f"Broadcast {self.id} stopped: {str(e)}", exc_info=True)
+        finally:
+            reporter.cancel()
+            try:
+                await reporter
+            except asyncio.CancelledError:
+                pass
+        await self._report()
+
+
+class Broadcaster:
+    def __init__(self, rate: float = Config.BROADCAST_RATE, concurrency: int = Config.BROADCAST_CONCURRENCY,
+                 page_size: int = Config.BROADCAST_PAGE_SIZE, progress_interval: float = Config.BROADCAST_PROGRESS_SECONDS):
+        # One limiter for every broadcast so two at once still share the budget
+        self.limiter = RateLimiter(GCRA(rate, period=1, burst=max(1, int(rate))))
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.progress_interval = progress_interval
+        self.active: Dict[int, Broadcast] = {}
+
+    def _launch(self, bot: Bot, row: Dict) -> Broadcast:
+        broadcast = Broadcast(bot, row, self.limiter, self.concurrency, self.page_size, self.progress_interval)
+        broadcast.task = asyncio.create_task(broadcast.run())
+        broadcast.task.add_done_callback(lambda _: self.active.pop(broadcast.id, None))
+        self.active[broadcast.id] = broadcast
+        return broadcast
+
+    async def start(self, bot: Bot, admin_id: int, chat_id: int, text: str) -> Optional[Broadcast]:
+        broadcast_id = await db.create_broadcast(admin_id, chat_id, text)
+        if broadcast_id is None:
+            return None
+        row = {"id": broadcast_id, "chat_id": chat_id, "text": text, "cursor": 0, "sent": 0, "failed": 0}
+        return self._launch(bot, row)
+
+    async def resume(self, bot: Bot) -> int:
+        """Restart broadcasts left running by a previous process"""
+        rows = [row for row in await db.get_broadcasts("running") if row["id"] not in self.active]
+        for row in rows:
+            logger.info(f"Resuming broadcast {row['id']} after user {row['cursor']}")
+            self._launch(bot, row)
+        return len(rows)
+
+    def cancel(self, broadcast_id: int) -> bool:
+        broadcast = self.active.get(broadcast_id)
+        if broadcast is None:
+            return False
+        broadcast.cancel()
+        return True
+
+    async def stop(self):
+        """Stop sending, saving progress so running broadcasts resume on the next start"""
+        tasks = [broadcast.task for broadcast in self.active.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+broadcaster = Broadcaster()
@@ -0,0 +1,235 @@
+"""
+Image generation jobs.
+
+A handler never waits for an image. It puts a job in a bounded queue and
+returns; a small pool of workers takes jobs in order, runs them against the
+image provider and reports back through the job's `notify` callback
+(STARTED, then DONE with the image or FAILED), which edits the user's status
+message and sends the photo. When the queue is full new jobs are turned away
+instead of piling up behind minutes of work.
+
+Results are kept on disk, one file per prompt hash, and the least recently
+used files are evicted once the directory grows past `max_bytes`. A prompt
+already in the cache never enters the queue, and identical prompts running
+at the same time share one upstream call.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional
+
+from models.image_gen import get_image_provider
+from src.config import Config
+from src.services.metrics import registry
+from src.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+STARTED = "started"
+DONE = "done"
+FAILED = "failed"
+
+Notify = Callable[[str, Optional[bytes]], Awaitable[None]]
+
+
+class ImageCache:
+    """Generated images on disk, named by prompt hash, evicted least recently used first"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self.evictions = 0
+
+    @staticmethod
+    def key(prompt: str) -> str:
+        return hashlib.sha256(" ".join(prompt.lower().split()).encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.img"
+
+    def _files(self) -> List[os.DirEntry]:
+        try:
+            return [entry for entry in os.scandir(self.directory) if entry.name.endswith(".img")]
+        except FileNotFoundError:
+            return []
+
+    @property
+    def size(self) -> int:
+        """Bytes on disk; scanned once, then kept up to date by put()"""
+        with self._lock:
+            if self._size is None:
+                self._size = sum(entry.stat().st_size for entry in self._files())
+            return self._size
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            # The modification time doubles as the last-use time for eviction
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        self.size  # scan before the first write so it is not counted twice
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        # Written aside and renamed, so a reader never sees half an image
+        partial = path.with_suffix(f".{threading.get_ident()}.part")
+        partial.write_bytes(data)
+        with self._lock:
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(partial, path)
+            self._size += len(data) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop the least recently used files until the cache fits; caller holds the lock"""
+        for entry in sorted(self._files(), key=lambda entry: entry.stat().st_mtime):
+            if self._size <= self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            self._size -= size
+            self.evictions += 1
+
+
+class ImageJob:
+    def __init__(self, prompt: str, notify: Notify):
+        self.prompt = prompt
+        self.key = ImageCache.key(prompt)
+        self.notify = notify
+        self.state = QUEUED
+        self.enqueued = time.monotonic()
+
+
+class ImageQueue:
+    def __init__(self, generate: Callable[[str], Awaitable[bytes]], cache: ImageCache,
+                 workers: int = 2, max_queue: int = 20):
+        self._generate = generate
+        self.cache = cache
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._flights = SingleFlight()
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cache_hits = 0
+
+    @property
+    def waiting(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def full(self) -> bool:
+        return self.waiting >= self.max_queue
+
+    async def cached(self, prompt: str) -> Optional[bytes]:
+        """The image for `prompt` if it was generated before"""
+        image = await asyncio.to_thread(self.cache.get, ImageCache.key(prompt))
+        if image is not None:
+            self.cache_hits += 1
+        return image
+
+    def submit(self, prompt: str, notify: Notify) -> ImageJob:
+        """Queue a job; raises asyncio.QueueFull when `max_queue` jobs are already waiting"""
+        if self._queue is None:
+            raise RuntimeError("The image queue is not running")
+        job = ImageJob(prompt, notify)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise
+        return job
+
+    async def _notify(self, job: ImageJob, state: str, image: Optional[bytes] = None):
+        job.state = state
+        try:
+            await job.notify(state, image)
+        except Exception as e:
+            # The user's chat failing must not take the worker down
+            logger.warning(f"Image job update ({state}) failed: {str(e)}")
+
+    async def _render(self, job: ImageJob) -> bytes:
+        # An identical prompt may have finished while this one waited
+        image = await asyncio.to_thread(self.cache.get, job.key)
+        if image is None:
+            image = await self._generate(job.prompt)
+            await asyncio.to_thread(self.cache.put, job.key, image)
+        return image
+
+    async def _run(self, job: ImageJob):
+        await self._notify(job, STARTED)
+        try:
+            image = await self._flights.do(job.key, lambda: self._render(job))
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Image generation failed after {time.monotonic() - job.enqueued:.1f}s: {str(e)}")
+            await self._notify(job, FAILED)
+            return
+        self.completed += 1
+        await self._notify(job, DONE, image)
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            self.running += 1
+            try:
+                await self._run(job)
+            finally:
+                self.running -= 1
+                self._queue.task_done()
+
+    def start(self):
+        if not self._tasks:
+            self._queue = asyncio.Queue(self.max_queue)
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers; jobs still waiting are dropped"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        if self.waiting:
+            logger.warning(f"Dropped {self.waiting} queued image jobs on shutdown")
+        self._queue = None
+
+
+async def _generate(prompt: str) -> bytes:
+    return await get_image_provider().generate(prompt)
+
+
+image_queue = ImageQueue(
+    _generate,
+    ImageCache(Config.IMAGE_CACHE_DIR, Config.IMAGE_CACHE_MAX_BYTES),
+    workers=Config.IMAGE_WORKERS,
+    max_queue=Config.IMAGE_QUEUE_SIZE
+)
+registry.gauge("bunny_image_jobs", "Image jobs waiting and being generated",
+               lambda: {"waiting": image_queue.waiting, "running": image_queue.running}, labelname="state")
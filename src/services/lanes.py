@@ -0,0 +1,130 @@
+"""
+Concurrent update processing with per-user ordering.
+
+Every update is assigned to a lane keyed by its user (or, for updates
+without one, its chat). Updates in different lanes run concurrently, up to
+`max_concurrency` at a time; updates in the same lane run strictly one
+after another in arrival order, so the rate limiter, daily claims and
+conversation memory never see two updates of one user interleave. A slow AI
+call therefore only holds up its own user.
+
+Lanes are created on demand and evicted once they have been idle for
+`idle_ttl` seconds.
+
+LanedApplication plugs the dispatcher into PTB: the builder's
+concurrent_updates value only bounds how many updates may be waiting in
+lanes, while the lanes decide what actually runs. Tasks reach their lane in
+the order PTB created them, because asyncio's Semaphore and Lock both wake
+waiters first in, first out.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+from telegram import Update
+from telegram.ext import Application
+
+from src.config import Config
+from src.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Lane:
+    __slots__ = ("lock", "pending", "last_used")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+        self.last_used = time.monotonic()
+
+
+class LaneDispatcher:
+    def __init__(self, max_concurrency: int = 64, idle_ttl: float = 60):
+        self.max_concurrency = max_concurrency
+        self.idle_ttl = idle_ttl
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lanes: Dict[Hashable, Lane] = {}
+        self._next_sweep = time.monotonic() + idle_ttl
+        self.running = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._lanes)
+
+    @property
+    def waiting(self) -> int:
+        return sum(lane.pending for lane in self._lanes.values()) - self.running
+
+    def _sweep(self, now: float):
+        idle = [
+            key for key, lane in self._lanes.items()
+            if not lane.pending and now - lane.last_used >= self.idle_ttl
+        ]
+        for key in idle:
+            del self._lanes[key]
+        self.evictions += len(idle)
+        self._next_sweep = now + self.idle_ttl
+
+    async def run(self, key: Optional[Hashable], fn: Callable[[], Awaitable[T]]) -> T:
+        """Await fn() after everything queued earlier on `key`; None means no ordering"""
+        if self._slots is None:
+            # Created lazily so the semaphore binds to the running loop
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+
+        if key is None:
+            async with self._slots:
+                return await fn()
+
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = Lane()
+        lane.pending += 1
+        try:
+            async with lane.lock:
+                async with self._slots:
+                    self.running += 1
+                    try:
+                        return await fn()
+                    finally:
+                        self.running -= 1
+        finally:
+            lane.pending -= 1
+            lane.last_used = time.monotonic()
+
+    def stats(self) -> Dict[str, int]:
+        return {"lanes": len(self._lanes), "running": self.running, "waiting": self.waiting, "evictions": self.evictions}
+
+
+def lane_key(update: object) -> Optional[Hashable]:
+    """Updates of one user share a lane; chats stand in for channel posts and the like"""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user is not None:
+        return update.effective_user.id
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    return None
+
+
+lanes = LaneDispatcher(Config.UPDATE_CONCURRENCY, Config.LANE_IDLE_SECONDS)
+registry.gauge("bunny_updates", "Updates being handled, waiting in lanes, and open lanes",
+               lambda: {"running": lanes.running, "waiting": lanes.waiting, "lanes": len(lanes)}, labelname="state")
+
+
+class LanedApplication(Application):
+    """An Application whose updates go through the lane dispatcher
+
+    Build it with ApplicationBuilder().application_class(LanedApplication)
+    and a concurrent_updates value, which caps updates waiting in lanes.
+    """
+    dispatcher = lanes
+
+    async def process_update(self, update: object) -> None:
+        await self.dispatcher.run(lane_key(update), lambda: super(LanedApplication, self).process_update(update))
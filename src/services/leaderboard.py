@@ -0,0 +1,62 @@
+"""
+In-memory leaderboard over users.points.
+
+Users are kept in a SortedList ordered by (-points, user_id), next to a dict
+of current points. Loaded once from the database at startup and then updated
+on every points change, it answers top-N in O(N) and a user's rank in
+O(log n).
+"""
+from itertools import islice
+from typing import Iterable, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+
+class Leaderboard:
+    def __init__(self):
+        self._points = {}
+        self._order = SortedList()
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def load(self, rows: Iterable[Tuple[int, int]]):
+        """Replace the contents with (user_id, points) rows"""
+        self._points = {user_id: points or 0 for user_id, points in rows}
+        self._order = SortedList((-points, user_id) for user_id, points in self._points.items())
+        self.loaded = True
+
+    def set(self, user_id: int, points: int):
+        old = self._points.get(user_id)
+        if old == points:
+            return
+        if old is not None:
+            self._order.remove((-old, user_id))
+        self._points[user_id] = points
+        self._order.add((-points, user_id))
+
+    def add(self, user_id: int, delta: int):
+        self.set(user_id, self._points.get(user_id, 0) + delta)
+
+    def ensure(self, user_id: int):
+        """Track a new user (with no points yet)"""
+        if user_id not in self._points:
+            self.set(user_id, 0)
+
+    def points(self, user_id: int) -> Optional[int]:
+        return self._points.get(user_id)
+
+    def top(self, n: int) -> List[Tuple[int, int]]:
+        """(user_id, points) for the n highest scores"""
+        return [(user_id, -neg_points) for neg_points, user_id in islice(self._order, n)]
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """1-based rank; users with equal points share a rank"""
+        points = self._points.get(user_id)
+        if points is None:
+            return None
+        return self._order.bisect_left((-points,)) + 1
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,125 @@
+"""
+Per-user conversation memory for the AI chat.
+
+Each session is a ring buffer (a bounded deque) of the last `max_turns`
+(prompt, reply) pairs. Sessions live in an LRU capped at `max_sessions`
+and expire after `idle_ttl` seconds without a message, so RAM is bounded by
+active conversations rather than by everyone who ever chatted.
+
+When a `save` callback is given, turns are persisted lazily: only when
+their session is evicted or on flush() at shutdown, never per message. A
+`load` callback rebuilds a session that is no longer in memory the first
+time its user writes again.
+
+render_prompt() folds the remembered turns into the prompt, newest first,
+until a token budget is reached, so the payload sent to the model stays
+small however long the conversation gets.
+"""
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (prompt, reply)
+Turn = Tuple[str, str]
+# Rough tokens-per-character ratio for English text; exact counts need the provider's tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def render_prompt(history: List[Turn], prompt: str, token_budget: int) -> str:
+    """The prompt preceded by as many of the most recent turns as fit in `token_budget`"""
+    if not history:
+        return prompt
+    tail = f"User: {prompt}\nAssistant:"
+    budget = token_budget - estimate_tokens(tail)
+    lines: List[str] = []
+    for user_text, reply in reversed(history):
+        turn = f"User: {user_text}\nAssistant: {reply}\n"
+        cost = estimate_tokens(turn)
+        if cost > budget:
+            break
+        budget -= cost
+        lines.append(turn)
+    if not lines:
+        return prompt
+    lines.reverse()
+    return "".join(lines) + tail
+
+
+class Session:
+    __slots__ = ("turns", "unsaved", "last_used")
+
+    def __init__(self, max_turns: int, turns: Optional[List[Turn]] = None):
+        self.turns: Deque[Turn] = deque(turns or (), maxlen=max_turns)
+        self.unsaved = 0
+        self.last_used = time.monotonic()
+
+
+class ConversationMemory:
+    def __init__(self, max_turns: int = 10, max_sessions: int = 10000, idle_ttl: float = 3600,
+                 save: Optional[Callable[[int, List[Turn]], Awaitable[bool]]] = None,
+                 load: Optional[Callable[[int, int], Awaitable[List[Turn]]]] = None):
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._save_fn = save
+        self._load_fn = load
+        self._sessions: "OrderedDict[int, Session]" = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def _save(self, user_id: int, session: Session):
+        if self._save_fn is None or not session.unsaved:
+            return
+        turns = list(session.turns)[-session.unsaved:]
+        if await self._save_fn(user_id, turns):
+            session.unsaved = 0
+        else:
+            logger.warning(f"Dropped {len(turns)} unsaved turns for user {user_id}")
+
+    async def _evict(self):
+        """Drop expired sessions from the cold end, then the least recently used over the cap"""
+        now = time.monotonic()
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - session.last_used < self.idle_ttl:
+                return
+            del self._sessions[user_id]
+            self.evictions += 1
+            await self._save(user_id, session)
+
+    async def _session(self, user_id: int) -> Session:
+        session = self._sessions.get(user_id)
+        if session is None:
+            turns = await self._load_fn(user_id, self.max_turns) if self._load_fn is not None else None
+            # A concurrent message from the same user may have created the session meanwhile
+            session = self._sessions.get(user_id) or Session(self.max_turns, turns)
+            self._sessions[user_id] = session
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(user_id)
+        return session
+
+    async def history(self, user_id: int) -> List[Turn]:
+        """The user's remembered turns, oldest first"""
+        session = await self._session(user_id)
+        await self._evict()
+        return list(session.turns)
+
+    async def add_turn(self, user_id: int, prompt: str, reply: str):
+        session = await self._session(user_id)
+        session.turns.append((prompt, reply))
+        session.unsaved = min(session.unsaved + 1, self.max_turns)
+        await self._evict()
+
+    async def flush(self):
+        """Persist every session's unsaved turns"""
+        for user_id, session in list(self._sessions.items()):
+            await self._save(user_id, session)
@@ -0,0 +1,146 @@
+"""
+Background pipeline for message_logs.
+
+log() only appends to a bounded in-memory queue; a background task writes
+the queue out in batches of up to `batch_size` rows, one executemany
+transaction each, every `interval` seconds or as soon as a batch is full.
+When the queue is full, the "drop_oldest" policy discards the oldest entry
+(and counts it), while "block" makes log() wait for the writer to catch up.
+
+A retention job deletes rows older than `retention_days` (optionally
+archiving them to another SQLite file) in small chunks, each its own short
+transaction, so it never holds the write lock for long.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+# (user_id, message_type, content, timestamp)
+LogRow = Tuple[int, str, Optional[str], str]
+
+
+def _utcnow(offset: float = 0) -> str:
+    # Same format as SQLite's datetime('now')
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() + offset))
+
+
+class MessageLogWriter:
+    def __init__(self, write: Callable[[List[LogRow]], Awaitable[bool]], max_queue: int = 10000, batch_size: int = 500,
+                 interval: float = 1.0, overflow: str = DROP_OLDEST,
+                 prune: Optional[Callable[[str, int], Awaitable[Optional[int]]]] = None,
+                 retention_days: float = 0, prune_chunk: int = 1000, prune_interval: float = 3600):
+        self._write_fn = write
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.interval = interval
+        self.overflow = overflow
+        self._prune_fn = prune
+        self.retention_days = retention_days
+        self.prune_chunk = prune_chunk
+        self.prune_interval = prune_interval
+        self._queue: Deque[LogRow] = deque()
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._flush_lock = asyncio.Lock()
+        self._tasks: List[asyncio.Task] = []
+        self.written = 0
+        self.dropped = 0
+        self.pruned = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    async def log(self, user_id: int, message_type: str, content: Optional[str] = None):
+        while self.overflow == BLOCK and len(self._queue) >= self.max_queue:
+            self._space.clear()
+            self._wakeup.set()
+            await self._space.wait()
+        if len(self._queue) >= self.max_queue:
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append((user_id, message_type, content, _utcnow()))
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """Write out everything queued so far"""
+        async with self._flush_lock:
+            while self._queue:
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                try:
+                    ok = await self._write_fn(batch)
+                except Exception as e:
+                    logger.error(f"Message log write failed: {str(e)}")
+                    ok = False
+                if not ok:
+                    # Back to the front; if newer entries filled the queue meanwhile, the oldest go
+                    keep = min(len(batch), max(0, self.max_queue - len(self._queue)))
+                    self._queue.extendleft(reversed(batch[len(batch) - keep:]))
+                    self.dropped += len(batch) - keep
+                    return False
+                self.written += len(batch)
+                self._space.set()
+            return True
+
+    async def prune(self) -> int:
+        """Delete rows past the retention period, one chunk per transaction"""
+        if self._prune_fn is None or self.retention_days <= 0:
+            return 0
+        before = _utcnow(-self.retention_days * 86400)
+        total = 0
+        while True:
+            removed = await self._prune_fn(before, self.prune_chunk)
+            if not removed:
+                break
+            total += removed
+            if removed < self.prune_chunk:
+                break
+            # Let queued writes in between chunks
+            await asyncio.sleep(0)
+        if total:
+            logger.info(f"Pruned {total} message log rows older than {before}")
+        self.pruned += total
+        return total
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await asyncio.shield(self.flush())
+
+    async def _run_retention(self):
+        while True:
+            try:
+                await self.prune()
+            except Exception as e:
+                logger.error(f"Message log retention failed: {str(e)}")
+            await asyncio.sleep(self.prune_interval)
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run())]
+            if self._prune_fn is not None and self.retention_days > 0:
+                self._tasks.append(asyncio.create_task(self._run_retention()))
+
+    async def stop(self):
+        """Stop the background jobs and write out what is left"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        await self.flush()
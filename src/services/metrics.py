@@ -0,0 +1,268 @@
+"""
+In-process metrics: counters, latency histograms and gauges.
+
+Histograms use fixed buckets, so observing a value is one bisect and two
+additions, and percentiles are estimated from the buckets the way
+Prometheus' histogram_quantile() does. Everything is recorded on the event
+loop thread, so no locks are needed.
+
+    with HANDLER_SECONDS.time("profile"):
+        ...
+
+The registry renders the Prometheus text format; MetricsServer serves it on
+a local port (METRICS_PORT) for scraping, and the admin /metrics command
+shows a summary.
+"""
+import asyncio
+import logging
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Type, Union
+
+from telegram.ext import ApplicationHandlerStop
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in self._values.items()]
+
+
+class _Series:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: "Histogram", labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        if exc_type is not None and self.histogram.errors is not None and not issubclass(exc_type, self.histogram.ignore):
+            self.histogram.errors.inc(*self.labels)
+        return False
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS,
+                 errors: Optional[Counter] = None, ignore: Tuple[Type[BaseException], ...] = ()):
+        """`errors` counts exceptions raised inside time() blocks, except cancellation and `ignore`"""
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.errors = errors
+        self.ignore = (asyncio.CancelledError, GeneratorExit) + tuple(ignore)
+        self._series: Dict[Labels, _Series] = {}
+
+    def observe(self, seconds: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = _Series(len(self.buckets))
+        series.counts[bisect_left(self.buckets, seconds)] += 1
+        series.sum += seconds
+        series.count += 1
+
+    def time(self, *labels: str) -> _Timer:
+        return _Timer(self, labels)
+
+    def series(self) -> Dict[Labels, _Series]:
+        return self._series
+
+    def percentile(self, pct: float, *labels: str) -> Optional[float]:
+        """Estimated from the buckets, interpolating linearly inside the one that holds the rank"""
+        series = self._series.get(labels)
+        if series is None or not series.count:
+            return None
+        rank = series.count * pct / 100
+        seen = 0
+        for i, count in enumerate(series.counts):
+            if count and seen + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def top(self, limit: int = 10) -> List[Dict]:
+        """The series that took the most time in total, busiest first"""
+        rows = [
+            {
+                "labels": labels,
+                "count": series.count,
+                "errors": self.errors.value(*labels) if self.errors is not None else 0,
+                "total": series.sum,
+                "p50": self.percentile(50, *labels),
+                "p95": self.percentile(95, *labels),
+            }
+            for labels, series in self._series.items()
+        ]
+        rows.sort(key=lambda row: row["total"], reverse=True)
+        return rows[:limit]
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series.counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series.sum)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series.count}")
+        return lines
+
+
+class Gauge:
+    """A value read from a callback at scrape time; the callback may return {label value: value}"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Union[float, Dict[str, float]]], labelname: str = ""):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labelname = labelname
+
+    def samples(self) -> List[str]:
+        try:
+            value = self.fn()
+        except Exception as e:
+            logger.warning(f"Gauge {self.name} failed: {str(e)}")
+            return []
+        if isinstance(value, dict):
+            return [f"{self.name}{_labels((self.labelname,), (label,))} {_number(v)}" for label, v in value.items()]
+        return [f"{self.name} {_number(value)}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Union[Counter, Histogram, Gauge]] = {}
+
+    def _add(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS,
+                  errors: Optional[Counter] = None, ignore: Tuple[Type[BaseException], ...] = ()) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets, errors, ignore))
+
+    def gauge(self, name: str, help: str, fn: Callable[[], Union[float, Dict[str, float]]], labelname: str = "") -> Gauge:
+        return self._add(Gauge(name, help, fn, labelname))
+
+    def render(self) -> str:
+        """Everything in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HANDLER_ERRORS = registry.counter("bunny_handler_errors_total", "Exceptions escaping update handlers", ("handler",))
+# ApplicationHandlerStop is how a handler ends update processing, not a failure
+HANDLER_SECONDS = registry.histogram("bunny_handler_seconds", "Update handler run time", ("handler",),
+                                     errors=HANDLER_ERRORS, ignore=(ApplicationHandlerStop,))
+DB_ERRORS = registry.counter("bunny_db_errors_total", "Failed database calls", ("query", "mode"))
+DB_SECONDS = registry.histogram("bunny_db_seconds", "Database call time, including the wait for a DB thread",
+                                ("query", "mode"), errors=DB_ERRORS)
+AI_ERRORS = registry.counter("bunny_ai_errors_total", "Failed AI provider calls", ("provider", "method"))
+AI_SECONDS = registry.histogram("bunny_ai_seconds", "AI provider call time (streams: until the last chunk)",
+                                ("provider", "method"), errors=AI_ERRORS)
+
+
+class MetricsServer:
+    """Serves GET /metrics in the Prometheus text format"""
+
+    def __init__(self, registry: Registry = registry, host: str = "127.0.0.1", port: int = 9090):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=5)
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", self.registry.render().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"Metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
@@ -0,0 +1,137 @@
+"""
+Central scheduler for everything the bot sends to Telegram.
+
+Registered as the Application's rate limiter, so every Bot API call made by
+any handler passes through it. A call first waits for its chat's budget
+(about 1 message/second in private chats, 20/minute in groups), then takes a
+place in one priority queue for the global budget (~30/second). A single
+dispatcher hands out global slots in priority order, so interactive replies
+overtake bulk traffic such as broadcasts:
+
+    await bot.send_message(chat_id, text, rate_limit_args=BULK)
+
+A RetryAfter from Telegram pauses all sending for the delay it asks for,
+after which the call is retried, up to `max_retries` times.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Callable, Coroutine, Dict, Optional
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from src.config import Config
+from src.services.metrics import registry
+from src.services.rate_limiter import GCRA, RateLimiter
+from src.services.streaming import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+# Priorities; lower goes first
+INTERACTIVE = 0
+BULK = 10
+
+
+class OutboundScheduler(BaseRateLimiter[int]):
+    def __init__(self, global_rate: float = 30, chat_rate: float = 1, chat_burst: int = 3,
+                 group_rate: float = 20, max_retries: int = 3):
+        self.global_limit = RateLimiter(GCRA(global_rate, period=1, burst=max(1, int(global_rate))))
+        self.chat_limit = RateLimiter(GCRA(chat_rate, period=1, burst=chat_burst))
+        self.group_limit = RateLimiter(GCRA(group_rate, period=60, burst=chat_burst))
+        self.max_retries = max_retries
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._sequence = itertools.count()
+        self._paused_until = 0.0
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.queue_latency = LatencyTracker()
+        self.send_latency = LatencyTracker()
+        self.retries = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def initialize(self):
+        if self._dispatcher is None:
+            self._queue = asyncio.PriorityQueue()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+
+    async def _dispatch(self):
+        while True:
+            _, _, granted = await self._queue.get()
+            if granted.done():  # caller gave up while queued
+                continue
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await self.global_limit.acquire("global")
+            if not granted.done():
+                granted.set_result(None)
+
+    async def _wait_for_slot(self, chat_id: Any, priority: int):
+        if chat_id is not None:
+            limiter = self.group_limit if str(chat_id).startswith(("-", "@")) else self.chat_limit
+            await limiter.acquire(chat_id)
+        if self._queue is None:
+            # Not initialized (e.g. used outside an Application): only the global budget applies
+            await self.global_limit.acquire("global")
+            return
+        granted = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((priority, next(self._sequence), granted))
+        try:
+            await granted
+        except asyncio.CancelledError:
+            granted.cancel()
+            raise
+
+    async def process_request(self, callback: Callable[..., Coroutine[Any, Any, Any]], args: Any, kwargs: Dict[str, Any],
+                              endpoint: str, data: Dict[str, Any], rate_limit_args: Optional[int]) -> Any:
+        priority = INTERACTIVE if rate_limit_args is None else rate_limit_args
+        chat_id = data.get("chat_id")
+        for attempt in range(self.max_retries + 1):
+            queued = time.monotonic()
+            await self._wait_for_slot(chat_id, priority)
+            started = time.monotonic()
+            self.queue_latency.observe(started - queued)
+            try:
+                result = await callback(*args, **kwargs)
+                self.send_latency.observe(time.monotonic() - started)
+                return result
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+                logger.warning(f"Flood control on {endpoint}: pausing outbound messages for {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth,
+            "queue_latency": self.queue_latency.summary(),
+            "send_latency": self.send_latency.summary(),
+            "retries": self.retries,
+        }
+
+
+outbound = OutboundScheduler(
+    global_rate=Config.OUTBOUND_GLOBAL_RATE,
+    chat_rate=Config.OUTBOUND_CHAT_RATE,
+    chat_burst=Config.OUTBOUND_CHAT_BURST,
+    group_rate=Config.OUTBOUND_GROUP_RATE,
+    max_retries=Config.OUTBOUND_MAX_RETRIES
+)
+
+registry.gauge("bunny_outbound_queue_depth", "Bot API calls waiting for a global sending slot", lambda: outbound.queue_depth)
+registry.gauge("bunny_outbound_retries", "Calls retried after flood control", lambda: outbound.retries)
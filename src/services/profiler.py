@@ -0,0 +1,137 @@
+"""
+On-demand sampling profiler for the running bot.
+
+While active, two samplers run every `interval` seconds:
+
+- a daemon thread records the Python stack of every other thread (the
+  event loop and the DB threads), i.e. where CPU time goes;
+- a task on the event loop records the await chain of every pending
+  asyncio task, i.e. where handlers spend their wall-clock time waiting
+  (AI calls, DB queries, rate limits).
+
+The samples are returned in the collapsed-stack format ("root;caller;callee
+count" per line) that flamegraph.pl, speedscope and inferno read. Stacks of
+threads are rooted at "thread <name>", task stacks at "tasks". Nothing is
+traced between samples, so the overhead is a few stack walks per interval.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import List
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_STDLIB = os.path.dirname(os.__file__)
+# Label paths of the bot's own code start with these
+_OWN_CODE = ("src/", "models/", "bot.py")
+
+
+def _label(code) -> str:
+    path = code.co_filename
+    if "site-packages" + os.sep in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    elif path.startswith(_ROOT):
+        path = os.path.relpath(path, _ROOT)
+    elif path.startswith(_STDLIB):
+        path = os.path.relpath(path, _STDLIB)
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({path}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _thread_stack(frame) -> List[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_label(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _task_stack(coro) -> List[str]:
+    """The await chain of a coroutine, outermost first"""
+    stack = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        stack.append(_label(frame.f_code))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return stack
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.running = False
+        self.samples = 0
+
+    def _sample_threads(self, stop: threading.Event, counts: Counter):
+        me = threading.get_ident()
+        names = {}
+        while not stop.is_set():
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                counts[";".join([f"thread {names.get(ident, ident)}"] + _thread_stack(frame))] += 1
+            stop.wait(self.interval)
+
+    def _sample_tasks(self, counts: Counter):
+        me = asyncio.current_task()
+        for task in asyncio.all_tasks():
+            if task is me or task.done():
+                continue
+            stack = _task_stack(task.get_coro())
+            if stack:
+                counts[";".join(["tasks"] + stack)] += 1
+
+    async def run(self, seconds: float) -> str:
+        """Sample for `seconds` and return the collapsed stacks"""
+        if self.running:
+            raise RuntimeError("The profiler is already running")
+        self.running = True
+        thread_counts: Counter = Counter()
+        task_counts: Counter = Counter()
+        stop = threading.Event()
+        sampler = threading.Thread(target=self._sample_threads, args=(stop, thread_counts), name="profiler", daemon=True)
+        samples = 0
+        try:
+            sampler.start()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                self._sample_tasks(task_counts)
+                samples += 1
+                await asyncio.sleep(self.interval)
+        finally:
+            stop.set()
+            await asyncio.get_running_loop().run_in_executor(None, sampler.join)
+            self.running = False
+        self.samples = samples
+        counts = thread_counts + task_counts
+        logger.info(f"Profiled {seconds}s: {samples} samples, {len(counts)} distinct stacks")
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+    @staticmethod
+    def top(collapsed: str, root: str = "tasks", limit: int = 5) -> List[str]:
+        """The bot's own frames seen most often innermost under `root`"""
+        leaves: Counter = Counter()
+        for line in collapsed.splitlines():
+            stack, _, count = line.rpartition(" ")
+            frames = stack.split(";")
+            if frames[0] != root:
+                continue
+            own = [frame for frame in frames[1:] if frame.rpartition(" (")[2].startswith(_OWN_CODE)]
+            if own:
+                leaves[own[-1]] += int(count)
+        return [frame for frame, _ in leaves.most_common(limit)]
+
+
+profiler = SamplingProfiler(Config.PROFILE_INTERVAL_MS / 1000)
@@ -0,0 +1,119 @@
+"""
+GCRA (generic cell rate algorithm) rate limiting.
+
+A limit is `rate` units per `period` seconds with bursts of up to `burst`
+units. Each key costs one float, its theoretical arrival time (TAT), and a
+check is O(1). A key whose TAT has passed is indistinguishable from a key
+never seen, so idle keys are evicted lazily as new requests come in and
+memory tracks the number of recently active users, not all users ever seen.
+
+Everything runs on the event loop thread, so no locks are needed.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+from src.config import Config
+
+# Relative price of each action against the per-user budget
+COSTS: Dict[str, int] = {
+    "command": 1,
+    "message": 2,  # plain text goes to the AI provider
+    "image": 5,  # tens of seconds on an image worker
+}
+
+# Keys checked for eviction per request; > 1 so eviction outpaces inserts,
+# which keeps the map within about twice the keys still live
+EVICT_PER_CALL = 2
+
+
+class GCRA:
+    """The parameters of one limit"""
+
+    def __init__(self, rate: float, period: float = 60.0, burst: Optional[int] = None):
+        self.interval = period / rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.window = self.interval * self.burst
+
+    def next_tat(self, tat: float, now: float, cost: int):
+        """The new TAT and 0.0 if allowed, otherwise the old TAT and the wait in seconds"""
+        # A cost above the burst could never fit; it takes the whole burst instead
+        cost = min(cost, self.burst)
+        new_tat = max(tat, now) + cost * self.interval
+        wait = new_tat - self.window - now
+        if wait > 0:
+            return tat, wait
+        return new_tat, 0.0
+
+
+class RateLimiter:
+    def __init__(self, per_key: GCRA, global_limit: Optional[GCRA] = None, clock: Callable[[], float] = time.monotonic):
+        self.per_key = per_key
+        self.global_limit = global_limit
+        self.clock = clock
+        self._tats: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._global_tat = 0.0
+        self.allowed = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def _evict(self, now: float):
+        """
+        Look at a few keys from the front: idle ones are dropped, live ones
+        go to the back. TATs are not in key order (a costly action pushes
+        its key's TAT further out), so a live key must not stop the sweep;
+        every key is looked at again within len / EVICT_PER_CALL requests.
+        """
+        tats = self._tats
+        for _ in range(min(EVICT_PER_CALL, len(tats))):
+            key, tat = next(iter(tats.items()))
+            if tat > now:
+                tats.move_to_end(key)
+            else:
+                del tats[key]
+
+    def check(self, key: Hashable, cost: int = 1) -> float:
+        """Consume `cost` units for `key`; returns 0.0 if allowed, else seconds to wait"""
+        now = self.clock()
+        self._evict(now)
+
+        tat, wait = self.per_key.next_tat(self._tats.get(key, now), now, cost)
+        if wait:
+            self.rejected += 1
+            return wait
+
+        if self.global_limit is not None:
+            global_tat, global_wait = self.global_limit.next_tat(self._global_tat, now, cost)
+            if global_wait:
+                self.rejected += 1
+                return global_wait
+            self._global_tat = global_tat
+
+        self._tats[key] = tat
+        self._tats.move_to_end(key)
+        self.allowed += 1
+        return 0.0
+
+    def allow(self, key: Hashable, cost: int = 1) -> bool:
+        return self.check(key, cost) == 0.0
+
+    async def acquire(self, key: Hashable, cost: int = 1):
+        """Wait until `cost` units are available for `key`, then consume them"""
+        while True:
+            wait = self.check(key, cost)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def reset(self, key: Hashable):
+        self._tats.pop(key, None)
+
+
+# Shared limiter for incoming user traffic
+user_limiter = RateLimiter(
+    GCRA(Config.RATE_LIMIT, period=60, burst=Config.RATE_LIMIT_BURST),
+    global_limit=GCRA(Config.GLOBAL_RATE_LIMIT, period=60, burst=Config.GLOBAL_RATE_LIMIT_BURST)
+)
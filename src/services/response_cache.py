@@ -0,0 +1,170 @@
+"""
+Bounded cache for AI responses.
+
+An in-memory LRU with a TTL and a byte budget sits in front of the model; an
+optional SQLite file behind it keeps answers across restarts.
+"""
+import asyncio
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from src.config import Config
+from src.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class SqliteCacheStore:
+    """Persistent tier: one small table in its own database file"""
+
+    def __init__(self, path: str, max_rows: int = 50000):
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._writes = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS response_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_expires ON response_cache(expires_at)")
+        self._conn.commit()
+
+    def get(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, value: str, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at)
+            )
+            self._writes += 1
+            if self._writes % 500 == 0:
+                self._prune()
+            self._conn.commit()
+
+    def _prune(self):
+        self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+        self._conn.execute("""
+        DELETE FROM response_cache WHERE key IN (
+            SELECT key FROM response_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+        )""", (self.max_rows,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 2000, max_bytes: int = 8 * 1024 * 1024, ttl: float = 3600, store: Optional[SqliteCacheStore] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.store = store
+        # key -> (value, expires_at, size)
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _sizeof(key: str, value: str) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(value)
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _put(self, key: str, value: str, expires_at: float):
+        if key in self._entries:
+            self._remove(key)
+        size = self._sizeof(key, value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self._remove(key)
+            self.expirations += 1
+
+        if self.store is not None:
+            try:
+                stored = await asyncio.to_thread(self.store.get, key, now)
+            except sqlite3.Error as e:
+                logger.error(f"Response cache read failed: {str(e)}")
+                stored = None
+            if stored is not None:
+                self._put(key, stored[0], stored[1])
+                self.hits += 1
+                return stored[0]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        expires_at = time.time() + self.ttl
+        self._put(key, value, expires_at)
+        if self.store is not None:
+            try:
+                await asyncio.to_thread(self.store.set, key, value, expires_at)
+            except sqlite3.Error as e:
+                logger.error(f"Response cache write failed: {str(e)}")
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+response_cache = ResponseCache(
+    max_entries=Config.RESPONSE_CACHE_MAX_ENTRIES,
+    max_bytes=Config.RESPONSE_CACHE_MAX_BYTES,
+    ttl=Config.RESPONSE_CACHE_TTL,
+    store=SqliteCacheStore(Config.RESPONSE_CACHE_DB) if Config.RESPONSE_CACHE_DB else None
+)
+registry.gauge("bunny_response_cache_events", "Response cache hits and misses, and entries evicted or expired",
+               lambda: {"hit": response_cache.hits, "miss": response_cache.misses,
+                        "eviction": response_cache.evictions, "expiration": response_cache.expirations},
+               labelname="event")
+registry.gauge("bunny_response_cache_size", "Entries and bytes held in memory by the response cache",
+               lambda: {"entries": len(response_cache._entries), "bytes": response_cache._bytes}, labelname="unit")
@@ -0,0 +1,104 @@
+"""
+Single-flight deduplication of concurrent identical calls.
+
+The first caller for a key starts the work as a task; callers arriving while
+it runs wait on that same task instead of starting their own, so a burst of
+N identical AI requests costs one upstream call. Waiters are shielded: a
+waiter that is cancelled (its user gave up, the update timed out) leaves the
+shared call running for everyone else.
+
+Streams are shared the same way. One task drains the source and every
+subscriber replays the chunks from the start, then follows along live.
+"""
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SharedStream:
+    def __init__(self, source: AsyncIterator[str]):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Condition()
+        self.task = asyncio.create_task(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[str]):
+        try:
+            async for chunk in source:
+                async with self._changed:
+                    self.chunks.append(chunk)
+                    self._changed.notify_all()
+        except BaseException as e:
+            self.error = e
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            async with self._changed:
+                self.done = True
+                self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: index < len(self.chunks) or self.done)
+                chunks = self.chunks[index:]
+                done = self.done
+            for chunk in chunks:
+                yield chunk
+            index += len(chunks)
+            if done and index == len(self.chunks):
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._streams: Dict[Hashable, SharedStream] = {}
+        self.calls = 0
+        self.collapsed = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    def _finished(self, registry: Dict, key: Hashable, entry):
+        if registry.get(key) is entry:
+            del registry[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run fn() once for all concurrent callers with the same key"""
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = self._calls[key] = asyncio.create_task(fn())
+            task.add_done_callback(lambda t: self._finished(self._calls, key, t))
+            # Nobody may be left to await it; retrieve the exception so it is not reported as lost
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        else:
+            self.collapsed += 1
+            logger.debug(f"Joined in-flight call {key}")
+        return await asyncio.shield(task)
+
+    async def stream(self, key: Hashable, fn: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Like do(), for async iterators: every caller gets the complete stream"""
+        shared = self._streams.get(key)
+        if shared is None:
+            self.calls += 1
+            shared = self._streams[key] = SharedStream(fn())
+            shared.task.add_done_callback(lambda _: self._finished(self._streams, key, shared))
+        else:
+            self.collapsed += 1
+            logger.debug(f"Joined in-flight stream {key}")
+        async for chunk in shared.subscribe():
+            yield chunk
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "collapsed": self.collapsed, "in_flight": self.in_flight}
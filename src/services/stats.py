@@ -0,0 +1,174 @@
+"""
+Live bot statistics for the admin panel.
+
+Active-user counts come from HyperLogLog sketches, one per hour for the last
+seven days (168 sketches of 2 KiB each), fed as activity happens. Memory is
+fixed no matter how many users are active. The total user count is an
+exact counter. A periodic reconcile folds the database's view back in and
+resets the total, so missed events (e.g. across a restart) never linger.
+Writes carry the writer thread's sequence number, so users written after
+the exact count are added on top of it and users written before are not
+added twice.
+"""
+import asyncio
+import logging
+import math
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HOURS_KEPT = 7 * 24
+MASK64 = (1 << 64) - 1
+# 2**-r for every possible register value
+_INVERSE_POWERS = [2.0 ** -r for r in range(65)]
+
+
+def _mix64(value: int) -> int:
+    """splitmix64 finalizer: spreads sequential user ids over 64 bits"""
+    value = (value + 0x9E3779B97F4A7C15) & MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK64
+    return value ^ (value >> 31)
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = 11):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, item: int):
+        hashed = _mix64(item)
+        index = hashed >> (64 - self.precision)
+        rest = (hashed << self.precision) & MASK64
+        rank = 64 - self.precision + 1 if rest == 0 else 64 - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    @staticmethod
+    def estimate(registers) -> int:
+        m = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(map(_INVERSE_POWERS.__getitem__, registers))
+        zeros = registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+
+def sketch_activity(rows: Iterable[Tuple[int, int]]) -> Dict[int, HyperLogLog]:
+    """Hourly sketches from (user_id, hour since epoch) rows"""
+    sketches: Dict[int, HyperLogLog] = {}
+    for user_id, hour in rows:
+        sketch = sketches.get(hour)
+        if sketch is None:
+            sketch = sketches[hour] = HyperLogLog()
+        sketch.add(user_id)
+    return sketches
+
+
+class BotStats:
+    def __init__(self, reconcile: Callable[[], Awaitable[Tuple[int, int, Dict[int, HyperLogLog]]]], interval: float = 3600, refresh: float = 60):
+        """
+        reconcile() returns the exact user count, the write sequence number it
+        was taken at and sketch_activity() of the last seven days. Cached
+        counts are recomputed at most every `refresh` seconds.
+        """
+        self._reconcile_fn = reconcile
+        self.interval = interval
+        self.refresh = refresh
+        self._hours: Dict[int, HyperLogLog] = {}
+        self.total_users = 0
+        self._counted_seq = 0
+        # (seq, count) of add_users() calls while a reconcile is running
+        self._added: Optional[List[Tuple[int, int]]] = None
+        self.reconciled_at: Optional[float] = None
+        self._cached: Optional[Dict[str, int]] = None
+        self._cached_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def _bucket(self, hour: int) -> HyperLogLog:
+        sketch = self._hours.get(hour)
+        if sketch is None:
+            sketch = self._hours[hour] = HyperLogLog()
+            newest = max(self._hours)
+            for old in [h for h in self._hours if h <= newest - HOURS_KEPT]:
+                del self._hours[old]
+        return sketch
+
+    def record_active(self, user_id: int, now: Optional[float] = None):
+        hour = int((now if now is not None else time.time()) // 3600)
+        self._bucket(hour).add(user_id)
+
+    def add_users(self, count: int, seq: int = 0):
+        """`count` new users, written at write sequence `seq`"""
+        if seq and seq <= self._counted_seq:
+            return  # already in the last exact count
+        if self._added is not None:
+            self._added.append((seq, count))
+        self.total_users += count
+        if self._cached is not None:
+            self._cached["total_users"] = self.total_users
+
+    def _union(self, hours: int, now_hour: int) -> int:
+        registers = None
+        for hour in range(now_hour - hours + 1, now_hour + 1):
+            sketch = self._hours.get(hour)
+            if sketch is None:
+                continue
+            registers = sketch.registers if registers is None else bytes(map(max, registers, sketch.registers))
+        return HyperLogLog.estimate(registers) if registers is not None else 0
+
+    def snapshot(self) -> Dict[str, int]:
+        """Total, 7-day and 1-day active users; O(1) between refreshes"""
+        now = time.monotonic()
+        if self._cached is None or now - self._cached_at >= self.refresh:
+            now_hour = int(time.time() // 3600)
+            self._cached = {
+                "total_users": self.total_users,
+                "active_users": self._union(HOURS_KEPT, now_hour),
+                "daily_active": self._union(24, now_hour),
+            }
+            self._cached_at = now
+        return self._cached
+
+    async def reconcile(self):
+        self._added = []
+        try:
+            total, seq, fresh = await self._reconcile_fn()
+        finally:
+            added, self._added = self._added, None
+        oldest = int(time.time() // 3600) - HOURS_KEPT + 1
+        # Merge rather than replace: activity still in the write-behind buffer is only in the live sketches
+        for hour, sketch in fresh.items():
+            if hour >= oldest:
+                self._bucket(hour).merge(sketch)
+        self.total_users = total + sum(count for added_seq, count in added if added_seq > seq)
+        self._counted_seq = seq
+        self.reconciled_at = time.time()
+        self._cached = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"Stats reconcile failed: {str(e)}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,135 @@
+"""
+Progressive delivery of streamed AI replies.
+
+StreamingReply sends a placeholder right away and edits it as chunks arrive.
+Edits are throttled to Telegram's per-chat edit rate, and text past the
+message size limit spills into follow-up messages.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional
+
+from telegram.error import BadRequest, RetryAfter
+
+from src.config import Config
+from src.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4000
+PLACEHOLDER = "⏳ ..."
+
+
+class LatencyTracker:
+    """Rolling window of latency samples (seconds)"""
+
+    def __init__(self, size: int = 1000):
+        self._samples = deque(maxlen=size)
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        return {"count": self.count, "p50": self.percentile(50), "p95": self.percentile(95)}
+
+
+# Time from the start of a reply until model text is visible to the user
+time_to_first_token = LatencyTracker()
+registry.gauge("bunny_time_to_first_token_seconds", "Time until the first model text is shown, over the last 1000 replies",
+               lambda: {f"{pct / 100:g}": time_to_first_token.percentile(pct) for pct in (50, 95) if time_to_first_token.count},
+               labelname="quantile")
+
+
+def _split_point(text: str, limit: int) -> int:
+    """Where to cut text so the first part fits in one message"""
+    if len(text) <= limit:
+        return len(text)
+    cut = text.rfind("\n", 0, limit)
+    if cut < limit // 2:
+        cut = text.rfind(" ", 0, limit)
+    return cut if cut >= limit // 2 else limit
+
+
+class StreamingReply:
+    def __init__(self, message, edit_interval: float = Config.STREAM_EDIT_INTERVAL, max_length: int = MAX_MESSAGE_LENGTH, parse_mode: Optional[str] = "Markdown"):
+        self.message = message
+        self.edit_interval = edit_interval
+        self.max_length = max_length
+        self.parse_mode = parse_mode
+        self.sent: List = []
+        self.first_token_latency: Optional[float] = None
+        self._current = None
+        self._text = ""
+        self._shown = ""
+        self._next_edit = 0.0
+        self._started = 0.0
+
+    async def run(self, chunks: AsyncIterator[str]) -> str:
+        """Deliver the stream; returns the full text"""
+        self._started = time.monotonic()
+        self._current = await self.message.reply_text(PLACEHOLDER)
+        self.sent.append(self._current)
+        self._next_edit = self._started
+        full = []
+
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            full.append(chunk)
+            self._text += chunk
+            while len(self._text) > self.max_length:
+                await self._spill()
+            if time.monotonic() >= self._next_edit:
+                await self._edit(self._text)
+
+        await self._finish(self._text or "⚠️ Empty response.")
+        return "".join(full)
+
+    async def _edit(self, text: str, parse_mode: Optional[str] = None) -> bool:
+        if not text.strip() or (text == self._shown and parse_mode is None):
+            return True
+        try:
+            await self._current.edit_text(text, parse_mode=parse_mode, disable_web_page_preview=True)
+        except RetryAfter as e:
+            self._next_edit = time.monotonic() + float(e.retry_after)
+            return False
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                return True
+            if parse_mode is None:
+                raise
+            # Markdown the model produced may not parse; show it as plain text
+            logger.debug(f"Falling back to plain text: {str(e)}")
+            return await self._edit(text)
+
+        self._shown = text
+        self._next_edit = time.monotonic() + self.edit_interval
+        if self.first_token_latency is None:
+            self.first_token_latency = time.monotonic() - self._started
+            time_to_first_token.observe(self.first_token_latency)
+        return True
+
+    async def _finish(self, text: str):
+        """Final edit of the current message, with formatting"""
+        while not await self._edit(text, parse_mode=self.parse_mode):
+            await asyncio.sleep(max(0.0, self._next_edit - time.monotonic()))
+
+    async def _spill(self):
+        cut = _split_point(self._text, self.max_length)
+        head, self._text = self._text[:cut], self._text[cut:].lstrip()
+        await self._finish(head)
+        self._current = await self.message.reply_text(self._text[:self.max_length] or PLACEHOLDER)
+        self._shown = self._text[:self.max_length]
+        self.sent.append(self._current)
+        self._next_edit = time.monotonic() + self.edit_interval
+
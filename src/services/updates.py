@@ -0,0 +1,103 @@
+"""
+How updates reach the bot: long polling or a webhook.
+
+UPDATE_MODE=webhook starts PTB's embedded tornado server, registers
+WEBHOOK_URL with Telegram and rejects any request whose
+X-Telegram-Bot-Api-Secret-Token header does not match WEBHOOK_SECRET (a
+random one is generated per start when it is not configured). Either way
+Telegram is only asked for the update types some registered handler can
+use, instead of Update.ALL_TYPES. Edited messages are not subscribed to, so
+edits are no longer answered as new prompts.
+"""
+import logging
+import secrets
+from typing import List
+from urllib.parse import urlsplit
+
+from telegram import Update
+from telegram.ext import (
+    Application,
+    BaseHandler,
+    CallbackQueryHandler,
+    ChatJoinRequestHandler,
+    ChatMemberHandler,
+    ChosenInlineResultHandler,
+    CommandHandler,
+    ConversationHandler,
+    InlineQueryHandler,
+    MessageHandler,
+    PollAnswerHandler,
+    PollHandler,
+    PreCheckoutQueryHandler,
+    PrefixHandler,
+    ShippingQueryHandler,
+)
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+POLLING = "polling"
+WEBHOOK = "webhook"
+
+_HANDLER_UPDATES = (
+    (CommandHandler, [Update.MESSAGE]),
+    (PrefixHandler, [Update.MESSAGE]),
+    (MessageHandler, [Update.MESSAGE]),
+    (CallbackQueryHandler, [Update.CALLBACK_QUERY]),
+    (InlineQueryHandler, [Update.INLINE_QUERY]),
+    (ChosenInlineResultHandler, [Update.CHOSEN_INLINE_RESULT]),
+    (ShippingQueryHandler, [Update.SHIPPING_QUERY]),
+    (PreCheckoutQueryHandler, [Update.PRE_CHECKOUT_QUERY]),
+    (PollHandler, [Update.POLL]),
+    (PollAnswerHandler, [Update.POLL_ANSWER]),
+    (ChatJoinRequestHandler, [Update.CHAT_JOIN_REQUEST]),
+)
+
+
+def _handler_updates(handler: BaseHandler) -> List[str]:
+    if isinstance(handler, ConversationHandler):
+        nested = handler.entry_points + handler.fallbacks + [h for hs in handler.states.values() for h in hs]
+        return [kind for h in nested for kind in _handler_updates(h)]
+    if isinstance(handler, ChatMemberHandler):
+        return {
+            ChatMemberHandler.MY_CHAT_MEMBER: [Update.MY_CHAT_MEMBER],
+            ChatMemberHandler.CHAT_MEMBER: [Update.CHAT_MEMBER],
+        }.get(handler.chat_member_types, [Update.MY_CHAT_MEMBER, Update.CHAT_MEMBER])
+    for handler_type, kinds in _HANDLER_UPDATES:
+        if isinstance(handler, handler_type):
+            return kinds
+    # TypeHandler and friends can match anything
+    logger.warning(f"{type(handler).__name__} may need any update type; subscribing to all of them")
+    return list(Update.ALL_TYPES)
+
+
+def allowed_updates(application: Application) -> List[str]:
+    """The update types the application's handlers can actually use"""
+    kinds = {
+        kind
+        for handlers in application.handlers.values()
+        for handler in handlers
+        for kind in _handler_updates(handler)
+    }
+    return sorted(kinds)
+
+
+def run(application: Application):
+    """Start receiving updates the way Config.UPDATE_MODE asks for; blocks until shutdown"""
+    allowed = allowed_updates(application)
+    logger.info(f"Receiving updates via {Config.UPDATE_MODE}: {', '.join(allowed)}")
+
+    if Config.UPDATE_MODE == WEBHOOK:
+        application.run_webhook(
+            listen=Config.WEBHOOK_LISTEN,
+            port=Config.WEBHOOK_PORT,
+            url_path=Config.WEBHOOK_PATH or urlsplit(Config.WEBHOOK_URL).path,
+            webhook_url=Config.WEBHOOK_URL,
+            secret_token=Config.WEBHOOK_SECRET or secrets.token_urlsafe(32),
+            max_connections=Config.WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=allowed,
+            drop_pending_updates=True,
+        )
+    else:
+        application.run_polling(drop_pending_updates=True, allowed_updates=allowed)
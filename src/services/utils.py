@@ -2,14 +2,20 @@ from functools import wraps
 from telegram import Update
 from telegram.ext import ContextTypes, CallbackQueryHandler
 from src.config import Config
+from src.services.metrics import HANDLER_SECONDS
+from src.services.rate_limiter import COSTS, RateLimiter, user_limiter
 from functools import lru_cache
 import hashlib
+import math
 
-@lru_cache(maxsize=1000)
-def get_cache_key(prompt: str) -> str:
-    return hashlib.md5(prompt.encode()).hexdigest()
+def normalize_prompt(prompt: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt"""
+    return " ".join(prompt.lower().split())
 
-# Then modify your generate_response to check cache first
+@lru_cache(maxsize=1000)
+def get_cache_key(prompt: str, params: str = "") -> str:
+    """Cache key for a prompt under the given model parameters"""
+    return hashlib.md5(f"{params}\x00{normalize_prompt(prompt)}".encode()).hexdigest()
 
 def restricted(func):
     """Restrict access to the command"""
@@ -22,32 +28,26 @@ def restricted(func):
         return await func(update, context, *args, **kwargs)
     return wrapped
 
-def rate_limited(rate_limit: int = Config.RATE_LIMIT):
-    """Rate limit decorator"""
+def rate_limited(cost: int = COSTS["command"], limiter: RateLimiter = user_limiter):
+    """Rate limit decorator; `cost` is charged against the user's budget"""
     def decorator(func):
-        user_timestamps = {}
-        
         @wraps(func)
         async def wrapped(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
-            user_id = update.effective_user.id
-            now = update.message.date
-            
-            if user_id not in user_timestamps:
-                user_timestamps[user_id] = []
-            
-            # Remove old timestamps (keep only last minute)
-            user_timestamps[user_id] = [
-                t for t in user_timestamps[user_id] 
-                if (now - t).total_seconds() < 60
-            ]
-            
-            if len(user_timestamps[user_id]) >= rate_limit:
-                await update.message.reply_text(
-                    "⚠️ You're sending messages too fast. Please wait a minute."
+            wait = limiter.check(update.effective_user.id, cost)
+            if wait:
+                await update.effective_message.reply_text(
+                    f"⚠️ You're sending messages too fast. Please wait {math.ceil(wait)} seconds."
                 )
                 return
-            
-            user_timestamps[user_id].append(now)
             return await func(update, context, *args, **kwargs)
         return wrapped
-    return decorator
\ No newline at end of file
+    return decorator
+
+def instrumented(func):
+    """Count calls and time the handler in metrics; goes outermost, above restricted/rate_limited"""
+    name = func.__name__
+    @wraps(func)
+    async def wrapped(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
+        with HANDLER_SECONDS.time(name):
+            return await func(update, context, *args, **kwargs)
+    return wrapped
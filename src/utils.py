@@ -1,3 +1,53 @@
+import re
+from string import Formatter
+from typing import List, Optional, Tuple
+
+# Characters MarkdownV2 requires to be escaped outside entities
+_MARKDOWN_V2_SPECIAL = r"_*[]()~`>#+-=|{}.!\\"
+# (char, escaped) with the backslash first so later escapes are not escaped again.
+# Most fields (numbers, plain names) need no escaping and are let through after one
+# regex scan; the rest get a C-level replace per special character present, which
+# beats str.translate, whose fast path does not cover one-to-many mappings.
+_ESCAPES = [("\\", "\\\\")] + [(char, f"\\{char}") for char in _MARKDOWN_V2_SPECIAL if char != "\\"]
+_needs_escape = re.compile(f"[{re.escape(_MARKDOWN_V2_SPECIAL)}]").search
+_CONVERSIONS = {"s": str, "r": repr, "a": ascii}
+
+
 def escape_markdown(text: str) -> str:
-    escape_chars = r"_*[]()~`>#+-=|{}.!\\"
-    return ''.join(f"\\{char}" if char in escape_chars else char for char in str(text))
+    text = str(text)
+    if _needs_escape(text) is None:
+        return text
+    for char, escaped in _ESCAPES:
+        if char in text:
+            text = text.replace(char, escaped)
+    return text
+
+
+class MarkdownTemplate:
+    """
+    A str.format-style MarkdownV2 message whose literal text is escaped once,
+    when the template is built; format() escapes only the substituted fields.
+
+        ROW = MarkdownTemplate("{rank}. {name}: {points} points")
+        ROW.format(rank=1, name="some_user", points=42)
+    """
+
+    def __init__(self, template: str):
+        parts = []
+        # (field name, conversion, format spec)
+        self._fields: List[Tuple[str, Optional[str], str]] = []
+        for literal, field, spec, conversion in Formatter().parse(template):
+            parts.append(escape_markdown(literal).replace("{", "{{").replace("}", "}}"))
+            if field is not None:
+                parts.append(f"{{{field}}}")
+                self._fields.append((field, conversion, spec or ""))
+        self._format = "".join(parts)
+
+    def format(self, **fields) -> str:
+        values = {}
+        for name, conversion, spec in self._fields:
+            value = fields[name]
+            if conversion is not None:
+                value = _CONVERSIONS[conversion](value)
+            values[name] = escape_markdown(format(value, spec))
+        return self._format.format_map(values)
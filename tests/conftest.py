@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# src.config reads these at import time
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:TEST")
+os.environ.setdefault("COHERE_API_KEY", "test")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='bunny_test_')}/bot.db")
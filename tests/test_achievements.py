@@ -0,0 +1,57 @@
+import asyncio
+
+from src import database
+from src.achievements import AchievementEngine
+
+
+def activity(user_id, delta, when):
+    return (user_id, None, None, None, delta, when, when)
+
+
+def test_only_crossed_thresholds_are_considered():
+    engine = AchievementEngine(award=None)
+
+    names = lambda rules: [rule["name"] for rule in rules]  # noqa: E731
+    assert names(engine.crossed("message_count", 0, 1)) == ["Chat Starter"]
+    assert names(engine.crossed("message_count", 0, 150)) == ["Chat Starter", "Power User"]
+    assert engine.crossed("message_count", 1, 99) == []
+    assert engine.crossed("points", 100, 100) == []
+    assert engine.crossed("unknown", 0, 10) == []
+
+
+def test_awards_are_batched_and_never_duplicated():
+    database.init_db()
+    database.apply_activity_batch([activity(7001, 1, "2024-01-01 10:00:00"), activity(7002, 1, "2024-01-01 10:00:00")])
+    batches = []
+
+    async def award(rows):
+        batches.append(rows)
+        return database.award_achievements(rows)
+
+    engine = AchievementEngine(award)
+
+    async def run():
+        first = await engine.process([(7001, "message_count", 0, 120), (7002, "points", 90, 110)])
+        again = await engine.process([(7001, "message_count", 0, 1)])
+        return first, again
+
+    first, again = asyncio.run(run())
+
+    assert [rule["name"] for rule in first[7001]] == ["Chat Starter", "Power User"]
+    assert [rule["name"] for rule in first[7002]] == ["Point Collector"]
+    assert again == {}
+    assert len(batches) == 2
+    assert sorted(a["name"] for a in database.get_achievements(7001)) == ["Chat Starter", "Power User"]
+
+
+def test_consecutive_active_days_are_tracked_per_batch():
+    database.init_db()
+    days = ["2024-03-01", "2024-03-02", "2024-03-02", "2024-03-03", "2024-03-05", "2024-03-06"]
+    streaks = []
+    for day in days:
+        _, counters = database.apply_activity_batch([activity(7100, 1, f"{day} 12:00:00")])
+        streaks.append(counters[0][2])
+
+    # None when the day was already counted; a gap restarts the streak
+    assert streaks == [1, 2, None, 3, 1, 2]
+    assert database.get_user_stats(7100)["message_count"] == 6
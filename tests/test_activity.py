@@ -0,0 +1,169 @@
+import asyncio
+
+from src.services.activity import ActivityBuffer
+
+
+class FakeUsers:
+    """Message counts per user as the users table would hold them; `gate` holds writes back"""
+
+    def __init__(self):
+        self.counts = {}
+        self.names = {}
+        self.batches = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.fail = False
+
+    async def write(self, rows):
+        await self.gate.wait()
+        self.batches.append(rows)
+        if self.fail:
+            return False
+        for user_id, username, _, _, delta, _, _ in rows:
+            self.counts[user_id] = self.counts.get(user_id, 0) + delta
+            self.names[user_id] = username or self.names.get(user_id)
+        return True
+
+    def row(self, user_id):
+        if user_id not in self.counts:
+            return None
+        return {"user_id": user_id, "username": self.names[user_id], "message_count": self.counts[user_id]}
+
+
+def test_read_through_retries_when_a_flush_overlaps_the_read():
+    async def run():
+        users = FakeUsers()
+        buffer = ActivityBuffer(users.write)
+        for _ in range(3):
+            buffer.record(1, "bun")
+        fetches = []
+
+        async def fetch():
+            stale = users.row(1)
+            fetches.append(stale)
+            if len(fetches) == 1:
+                # The batch lands between reading the row and overlaying the buffer
+                await buffer.flush()
+            return stale
+
+        first = await buffer.read_through(1, fetch)
+
+        # A read that starts while a batch is being written waits for it
+        buffer.record(1, "bun")
+        users.gate.clear()
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0)
+        read = asyncio.create_task(buffer.read_through(1, lambda: asyncio.sleep(0, users.row(1))))
+        await asyncio.sleep(0.01)
+        assert not read.done()
+        users.gate.set()
+        await flush
+        return first, fetches, await read
+
+    first, fetches, second = asyncio.run(run())
+
+    # The stale row came with deltas that were already gone from the buffer
+    assert fetches == [None, {"user_id": 1, "username": "bun", "message_count": 3}]
+    assert first["message_count"] == 3
+    assert second["message_count"] == 4
+
+
+def test_failed_batch_is_merged_in_front_of_newer_entries():
+    async def run():
+        users = FakeUsers()
+        buffer = ActivityBuffer(users.write)
+        buffer.record(1, "old_name", "Bun")
+        buffer.record(1)
+        buffer.record(2, "two")
+        first_seen = buffer._pending[1].first_seen
+
+        users.gate.clear()
+        users.fail = True
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0)
+        # Arrives while the failing batch is in flight
+        buffer.record(3, "three")
+        buffer.record(1, "new_name")
+        users.gate.set()
+        assert await flush is False
+
+        assert list(buffer._pending) == [1, 2, 3]
+        entry = buffer._pending[1]
+        assert (entry.count, entry.username, entry.first_name, entry.first_seen) == (3, "new_name", "Bun", first_seen)
+
+        users.fail = False
+        assert await buffer.flush() is True
+        return users, buffer
+
+    users, buffer = asyncio.run(run())
+
+    assert [row[0] for row in users.batches[-1]] == [1, 2, 3]
+    assert users.counts == {1: 3, 2: 1, 3: 1}
+    assert users.names[1] == "new_name"
+    assert buffer.pending_users == 0
+
+
+def test_flush_user_writes_before_a_dependent_write():
+    async def run():
+        users = FakeUsers()
+        buffer = ActivityBuffer(users.write)
+        buffer.record(1, "bun")
+        buffer.record(2, "two")
+
+        await buffer.flush_user(1)
+        # The whole batch goes, not only the user asked for
+        assert users.counts == {1: 1, 2: 1} and buffer.pending_users == 0
+
+        # Nothing buffered for the user, but their batch is still being written
+        buffer.record(3, "three")
+        users.gate.clear()
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(buffer.flush_user(3))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        users.gate.set()
+        await waiting
+        assert users.counts[3] == 1
+        await flush
+
+        # Nothing to wait for
+        await asyncio.wait_for(buffer.flush_user(4), timeout=0.1)
+        return users
+
+    users = asyncio.run(run())
+
+    assert len(users.batches) == 2
+
+
+def test_stop_flushes_what_is_left():
+    async def run():
+        users = FakeUsers()
+        buffer = ActivityBuffer(users.write, interval=60)
+        buffer.start()
+        for user_id in (1, 1, 2):
+            buffer.record(user_id)
+        await asyncio.sleep(0.01)
+        assert users.batches == []
+        await buffer.stop()
+        return users, buffer
+
+    users, buffer = asyncio.run(run())
+
+    assert users.counts == {1: 2, 2: 1}
+    assert buffer.pending_users == 0 and buffer._task is None
+
+
+def test_max_events_wakes_the_flush_early():
+    async def run():
+        users = FakeUsers()
+        buffer = ActivityBuffer(users.write, interval=60, max_events=5)
+        buffer.start()
+        for _ in range(5):
+            buffer.record(1)
+        await asyncio.sleep(0.01)
+        written = dict(users.counts)
+        await buffer.stop()
+        return written
+
+    assert asyncio.run(run()) == {1: 5}
@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+from models.ai_router import AIRouter, OPEN, CLOSED
+
+
+class FakeProvider:
+    """Local stand-in for a model backend with injected latency and failures"""
+
+    def __init__(self, name, latency=0.0, fail=False):
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate(self, prompt, **params):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        return f"{self.name}: {prompt}"
+
+    async def stream(self, prompt, **params):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        for word in prompt.split():
+            await asyncio.sleep(self.latency)
+            yield word
+
+
+def test_fast_primary_answers_without_hedging():
+    primary, backup = FakeProvider("primary", 0.01), FakeProvider("backup", 0.01)
+    router = AIRouter([primary, backup], hedge_delay=0.2)
+
+    assert asyncio.run(router.generate("hi")) == "primary: hi"
+    assert backup.calls == 0
+    assert router.hedges == 0
+
+
+def test_slow_primary_is_hedged_and_loser_cancelled():
+    primary, backup = FakeProvider("primary", 1.0), FakeProvider("backup", 0.02)
+    router = AIRouter([primary, backup], hedge_delay=0.05)
+
+    started = time.monotonic()
+    result = asyncio.run(router.generate("hi"))
+
+    assert result == "backup: hi"
+    assert time.monotonic() - started < 0.5
+    assert router.hedges == 1
+    assert primary.cancelled == 1
+    # Losing a hedge race is neither a success nor a failure
+    assert len(router.health["primary"].outcomes) == 0
+
+
+def test_hedge_deadline_follows_observed_p95():
+    primary = FakeProvider("primary", 0.01)
+    router = AIRouter([primary, FakeProvider("backup")], hedge_delay=5.0, min_hedge_delay=0.0, min_samples=5)
+
+    async def warm_up():
+        for _ in range(10):
+            await router.generate("hi")
+
+    asyncio.run(warm_up())
+
+    assert router._deadline(primary) < 0.1
+    assert router.stats()["primary"]["samples"] == 10
+
+
+def test_degrading_primary_loses_its_rank():
+    primary, backup = FakeProvider("primary", 0.01), FakeProvider("backup", 0.03)
+    router = AIRouter([primary, backup], min_hedge_delay=0.1, min_samples=5)
+
+    async def calls(n):
+        return [await router.generate("hi") for _ in range(n)]
+
+    asyncio.run(calls(5))
+    primary.latency = 1.0
+    # Every call is hedged and won by the backup; the cancelled primary
+    # leaves a sample of at least the hedge deadline behind
+    assert asyncio.run(calls(5)) == ["backup: hi"] * 5
+    assert router.stats()["primary"]["abandoned"] == 5
+    assert router.health["primary"].percentile(50) >= 0.1
+
+    hedges, primary_calls = router.hedges, primary.calls
+    assert asyncio.run(calls(3)) == ["backup: hi"] * 3
+    assert router._candidates()[0] is backup
+    assert router.hedges == hedges and primary.calls == primary_calls
+
+
+def test_failures_fall_back_and_open_the_circuit():
+    primary, backup = FakeProvider("primary", fail=True), FakeProvider("backup")
+    router = AIRouter([primary, backup], hedge_delay=1.0, failure_threshold=3, cooldown=60)
+
+    async def burst():
+        return [await router.generate("hi") for _ in range(6)]
+
+    assert asyncio.run(burst()) == ["backup: hi"] * 6
+    assert primary.calls == 3
+    assert router.health["primary"].state == OPEN
+    assert router.stats()["primary"]["error_rate"] == 1.0
+
+
+def test_circuit_half_opens_after_cooldown():
+    primary, backup = FakeProvider("primary", fail=True), FakeProvider("backup")
+    router = AIRouter([primary, backup], failure_threshold=1, cooldown=0.05)
+
+    async def scenario():
+        await router.generate("hi")
+        primary.fail = False
+        await asyncio.sleep(0.06)
+        return await router.generate("hi")
+
+    assert asyncio.run(scenario()) == "primary: hi"
+    assert router.health["primary"].state == CLOSED
+
+
+def test_stream_falls_back_before_first_chunk():
+    primary, backup = FakeProvider("primary", fail=True), FakeProvider("backup")
+    router = AIRouter([primary, backup])
+
+    async def collect():
+        return [chunk async for chunk in router.stream("a b c")]
+
+    assert asyncio.run(collect()) == ["a", "b", "c"]
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+import time
+
+from src import async_db
+from src.config import Config
+from src.services.metrics import DB_SECONDS
+
+
+class Probe:
+    """A blocking query that records which thread ran it and how many ran at once"""
+
+    def __init__(self, name):
+        self.__name__ = name
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.threads = set()
+
+    def __call__(self, seconds):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.threads.add(threading.current_thread().name)
+        time.sleep(seconds)
+        with self.lock:
+            self.active -= 1
+
+
+def test_writes_are_serialized_and_reads_use_the_pool():
+    write, read = Probe("probe_write"), Probe("probe_read")
+    readers = Config.DB_READERS
+    assert readers > 1
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.gather(*(async_db.run_write(write, 0.02) for _ in range(4)))
+        writes = time.monotonic() - started
+        started = time.monotonic()
+        await asyncio.gather(*(async_db.run_read(read, 0.05) for _ in range(readers)))
+        return writes, time.monotonic() - started
+
+    writes, reads = asyncio.run(run())
+
+    # One at a time, always on the same writer thread
+    assert write.peak == 1 and writes >= 0.08
+    assert len(write.threads) == 1 and next(iter(write.threads)).startswith("db-writer")
+    # Side by side on the reader threads, never on the writer
+    assert read.peak == readers and reads < 0.05 * readers
+    assert all(name.startswith("db-reader") for name in read.threads)
+    assert DB_SECONDS.series()[("probe_write", "write")].count == 4
+    assert DB_SECONDS.series()[("probe_read", "read")].count == readers
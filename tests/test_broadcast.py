@@ -0,0 +1,100 @@
+import asyncio
+from collections import Counter
+
+from telegram.error import Forbidden, RetryAfter
+
+from src import database
+from src.services.broadcast import Broadcaster
+
+USERS = list(range(9001, 9051))
+ADMIN_CHAT = 1
+
+
+class FakeBot:
+    def __init__(self, delay=0.001, blocked=(), flood_after=None):
+        self.delay = delay
+        self.blocked = set(blocked)
+        self.flood_after = flood_after
+        self.delivered = Counter()
+        self.progress = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if chat_id == ADMIN_CHAT:
+            message = FakeProgress(self)
+            await message.edit_text(text)
+            return message
+        await asyncio.sleep(self.delay)
+        if chat_id in self.blocked:
+            raise Forbidden("bot was blocked by the user")
+        if self.flood_after is not None and sum(self.delivered.values()) == self.flood_after:
+            self.flood_after = None
+            raise RetryAfter(0.05)
+        self.delivered[chat_id] += 1
+
+
+class FakeProgress:
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def edit_text(self, text, **kwargs):
+        self.bot.progress.append(text)
+
+
+def setup_module():
+    database.init_db()
+    database.apply_activity_batch([(user_id, None, None, None, 0, None, None) for user_id in USERS])
+
+
+def everyone():
+    # Other test modules share the database and add users of their own
+    return set(database.get_user_page(0, 10**6))
+
+
+def broadcaster():
+    return Broadcaster(rate=2000, concurrency=8, page_size=7, progress_interval=0.01)
+
+
+def test_broadcast_reaches_every_user_once():
+    bot = FakeBot(blocked={9003, 9040}, flood_after=10)
+
+    async def run():
+        broadcast = await broadcaster().start(bot, admin_id=ADMIN_CHAT, chat_id=ADMIN_CHAT, text="hello")
+        await broadcast.task
+        return broadcast
+
+    broadcast = asyncio.run(run())
+
+    assert broadcast.status == "done"
+    assert set(bot.delivered) == everyone() - {9003, 9040}
+    assert max(bot.delivered.values()) == 1
+    row = next(row for row in database.get_broadcasts("done") if row["id"] == broadcast.id)
+    assert (row["sent"], row["failed"], row["cursor"]) == (len(everyone()) - 2, 2, max(everyone()))
+    assert "Broadcast finished" in bot.progress[-1]
+
+
+def test_interrupted_broadcast_resumes_without_duplicates():
+    bot = FakeBot(delay=0.005)
+
+    async def interrupt():
+        engine = broadcaster()
+        broadcast = await engine.start(bot, admin_id=ADMIN_CHAT, chat_id=ADMIN_CHAT, text="resume me")
+        while sum(bot.delivered.values()) < 20:
+            await asyncio.sleep(0.001)
+        await engine.stop()
+        return broadcast.id
+
+    async def resume():
+        engine = broadcaster()
+        assert await engine.resume(bot) == 1
+        await asyncio.gather(*(broadcast.task for broadcast in engine.active.values()))
+
+    broadcast_id = asyncio.run(interrupt())
+    stopped_at = sum(bot.delivered.values())
+    assert stopped_at < len(everyone())
+
+    asyncio.run(resume())
+
+    assert set(bot.delivered) == everyone()
+    assert max(bot.delivered.values()) == 1
+    row = next(row for row in database.get_broadcasts("done") if row["id"] == broadcast_id)
+    assert row["sent"] == len(everyone())
@@ -0,0 +1,40 @@
+import asyncio
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder
+
+import bot
+from benchmarks.fake_telegram import FakeTelegram, callback_update
+from src import database
+from src.config import Config
+
+ADMIN = 8201
+USER = 8202
+
+
+def test_buttons_reach_their_handlers(monkeypatch):
+    monkeypatch.setattr(Config, "ADMIN_USER_IDS", [ADMIN])
+    database.init_db()
+    telegram = FakeTelegram()
+    app = bot.build_application(ApplicationBuilder().request(telegram))
+
+    async def press(update_id, user_id, data):
+        await app.process_update(Update.de_json(callback_update(update_id, user_id, data), app.bot))
+
+    async def run():
+        await app.initialize()
+        try:
+            await press(1, ADMIN, "start_broadcast")
+            await press(2, ADMIN, "bot_stats")
+            await press(3, USER, f"achievements_{USER}")
+        finally:
+            await app.shutdown()
+
+    asyncio.run(run())
+
+    edits = [params["text"] for params in telegram.sent if "message_id" in params]
+    assert edits[0].startswith("📢 Send the message you want to broadcast")
+    assert app.user_data[ADMIN]["awaiting_broadcast"] is True
+    assert edits[1].startswith("🤖 *Bot Statistics*")
+    assert "achievements" in edits[2]
+    assert telegram.calls["answerCallbackQuery"] == 3
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import uuid
+
+import httpx
+import pytest
+
+from models.cohere_provider import CohereProvider
+
+
+class Upstream:
+    """An httpx.MockTransport handler answering /v1/generate after `latency` seconds"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.active = 0
+        self.peak = 0
+        self.requests = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active -= 1
+        prompt = json.loads(request.content)["prompt"]
+        return httpx.Response(200, json={
+            "id": str(uuid.uuid4()),
+            "prompt": prompt,
+            "generations": [{"id": str(uuid.uuid4()), "text": f" answer to {prompt} "}],
+        })
+
+
+def provider(upstream, **kwargs):
+    return CohereProvider("test-key", transport=httpx.MockTransport(upstream), **kwargs)
+
+
+def test_in_flight_requests_are_bounded_by_the_semaphore():
+    upstream = Upstream(latency=0.05)
+
+    async def run():
+        cohere = provider(upstream, max_concurrency=3)
+        try:
+            return await asyncio.gather(*(cohere.generate(f"q{i}") for i in range(10)))
+        finally:
+            await cohere.aclose()
+
+    answers = asyncio.run(run())
+
+    assert answers == [f"answer to q{i}" for i in range(10)]
+    assert upstream.requests == 10 and upstream.peak == 3
+
+
+def test_slow_upstream_times_out_and_frees_its_slot():
+    upstream = Upstream(latency=1.0)
+
+    async def run():
+        cohere = provider(upstream, max_concurrency=1, timeout=0.1)
+        try:
+            with pytest.raises((asyncio.TimeoutError, httpx.TimeoutException)):
+                await cohere.generate("slow")
+            upstream.latency = 0
+            # The timed-out call gave its slot back
+            return await asyncio.wait_for(cohere.generate("fast"), timeout=1)
+        finally:
+            await cohere.aclose()
+
+    assert asyncio.run(run()) == "answer to fast"
+    assert upstream.active == 0
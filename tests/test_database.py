@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+
+import pytest
+
+from src.database import ConnectionManager
+
+
+def manager(tmp_path, readers=2):
+    db = ConnectionManager(str(tmp_path / "bot.db"), readers=readers)
+    with db.write() as conn:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.execute("INSERT INTO items (name) VALUES ('first')")
+    return db
+
+
+def test_readers_are_read_only_and_separate_from_the_writer(tmp_path):
+    db = manager(tmp_path)
+
+    with db.read() as reader:
+        assert reader is not db._get_writer()
+        assert reader.execute("SELECT name FROM items").fetchone()[0] == "first"
+        with pytest.raises(sqlite3.OperationalError):
+            reader.execute("INSERT INTO items (name) VALUES ('nope')")
+
+    with db.write() as writer:
+        writer.execute("INSERT INTO items (name) VALUES ('second')")
+        # WAL: readers keep seeing the last commit while a write is open
+        with db.read() as reader:
+            assert reader.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 1
+    with db.read() as reader:
+        assert reader.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 2
+    db.close()
+
+
+def test_failed_write_rolls_back(tmp_path):
+    db = manager(tmp_path)
+
+    with pytest.raises(RuntimeError):
+        with db.write() as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('lost')")
+            raise RuntimeError("handler failed halfway")
+    with pytest.raises(sqlite3.IntegrityError):
+        with db.write() as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('lost too')")
+            conn.execute("INSERT INTO items (id, name) VALUES (1, 'duplicate')")
+
+    # The writer is still usable and nothing of either write is left
+    with db.write() as conn:
+        assert not conn.in_transaction
+        conn.execute("INSERT INTO items (name) VALUES ('kept')")
+    with db.read() as conn:
+        assert [row[0] for row in conn.execute("SELECT name FROM items ORDER BY id")] == ["first", "kept"]
+    db.close()
+
+
+def test_reader_pool_is_bounded_and_reuses_connections(tmp_path):
+    db = manager(tmp_path, readers=2)
+    holding = threading.Barrier(3)
+    release = threading.Event()
+    third = []
+
+    def hold():
+        with db.read():
+            holding.wait()
+            release.wait(5)
+
+    def borrow():
+        with db.read() as conn:
+            third.append(conn)
+
+    holders = [threading.Thread(target=hold) for _ in range(2)]
+    for thread in holders:
+        thread.start()
+    holding.wait()
+    waiter = threading.Thread(target=borrow)
+    waiter.start()
+    # Both readers are out; the third caller waits instead of opening another
+    waiter.join(0.1)
+    assert waiter.is_alive() and len(db._all_readers) == 2
+
+    release.set()
+    for thread in holders + [waiter]:
+        thread.join(5)
+    assert third[0] in db._all_readers
+    assert db._readers.qsize() == 2
+
+    # A reader handed back mid-transaction is rolled back before reuse
+    with db.read() as conn:
+        conn.execute("BEGIN")
+        conn.execute("SELECT * FROM items").fetchall()
+    assert not any(conn.in_transaction for conn in db._all_readers)
+    db.close()
+    assert db._all_readers == [] and db._writer is None
+
+
+def test_in_memory_database_reads_through_the_writer():
+    db = ConnectionManager(":memory:", readers=4)
+    with db.write() as conn:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+    with db.read() as conn:
+        assert conn is db._get_writer()
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+    db.close()
@@ -0,0 +1,157 @@
+import asyncio
+import os
+import time
+
+import pytest
+from telegram import Update
+from telegram.ext import ApplicationBuilder
+
+from benchmarks.fake_images import FakeImageServer
+from benchmarks.fake_telegram import FakeTelegram, text_update
+from models.image_gen import ImageGenerationError, ImageProvider
+from src.handlers import images
+from src.services.image_jobs import DONE, FAILED, STARTED, ImageCache, ImageQueue
+
+
+async def serving(server: FakeImageServer, test, workers: int = 2):
+    """Run `test(provider)` against a started server; `workers` also sizes the connection pool"""
+    await server.start()
+    provider = ImageProvider("hf_test", server.url, timeout=5, max_connections=workers)
+    try:
+        return await test(provider)
+    finally:
+        await provider.aclose()
+        await server.stop()
+
+
+def test_provider_waits_for_the_model_to_load():
+    server = FakeImageServer(latency=0, loading=1)
+
+    async def test(provider):
+        image = await provider.generate("a bunny")
+        with pytest.raises(ImageGenerationError):
+            await provider.generate("please fail")
+        return image
+
+    assert asyncio.run(serving(server, test)) == FakeImageServer.image("a bunny")
+    assert server.requests == 3
+
+
+def test_jobs_run_on_the_pool_and_are_cached(tmp_path):
+    server = FakeImageServer(latency=0.1)
+    updates = {}
+
+    def notifier(prompt):
+        async def notify(state, image):
+            updates.setdefault(prompt, []).append((state, image))
+        return notify
+
+    async def test(provider):
+        queue = ImageQueue(provider.generate, ImageCache(str(tmp_path), 1 << 20), workers=2, max_queue=3)
+        queue.start()
+        try:
+            start = time.monotonic()
+            for prompt in ("one", "two", "three"):
+                queue.submit(prompt, notifier(prompt))
+            with pytest.raises(asyncio.QueueFull):
+                queue.submit("four", notifier("four"))
+            await queue._queue.join()
+            elapsed = time.monotonic() - start
+            return queue, elapsed, await queue.cached("  ONE "), await queue.cached("four")
+        finally:
+            await queue.stop()
+
+    queue, elapsed, cached, missing = asyncio.run(serving(server, test))
+
+    for prompt in ("one", "two", "three"):
+        assert updates[prompt] == [(STARTED, None), (DONE, FakeImageServer.image(prompt))]
+    assert "four" not in updates and queue.rejected == 1
+    # Three jobs on two workers: two rounds, never more than two requests at once
+    assert server.peak == 2 and elapsed < 0.3
+    assert cached == FakeImageServer.image("one") and missing is None
+    assert queue.completed == 3 and queue.cache_hits == 1
+
+
+def test_identical_prompts_share_a_call_and_failures_are_reported(tmp_path):
+    server = FakeImageServer(latency=0.05)
+    states = []
+
+    async def notify(state, image):
+        states.append(state)
+        if state == STARTED:
+            raise RuntimeError("chat is gone")
+
+    async def test(provider):
+        queue = ImageQueue(provider.generate, ImageCache(str(tmp_path), 1 << 20), workers=2)
+        queue.start()
+        try:
+            queue.submit("same prompt", notify)
+            queue.submit("Same  prompt", notify)
+            await queue._queue.join()
+            queue.submit("fail please", notify)
+            await queue._queue.join()
+            return queue
+        finally:
+            await queue.stop()
+
+    queue = asyncio.run(serving(server, test))
+
+    assert server.requests == 2
+    # A notify that raises does not stop the job
+    assert states.count(DONE) == 2 and states[-1] == FAILED
+    assert queue.completed == 2 and queue.failed == 1
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ImageCache(str(tmp_path), max_bytes=3000)
+    for age, key in enumerate(("c", "b", "a")):
+        cache.put(key, b"x" * 1000)
+        os.utime(tmp_path / f"{key}.img", (time.time() - 100 + age, time.time() - 100 + age))
+
+    assert cache.get("c") == b"x" * 1000  # now the most recently used
+    cache.put("d", b"y" * 1000)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) for key in ("a", "c", "d"))
+    assert cache.size == 3000 and cache.evictions == 1
+    assert ImageCache(str(tmp_path), max_bytes=3000).size == 3000
+    # Never cached: would evict everything else
+    cache.put("huge", b"z" * 4000)
+    assert cache.get("huge") is None
+
+
+def test_imagine_reports_progress_and_sends_the_photo(tmp_path, monkeypatch):
+    server = FakeImageServer(latency=0.05)
+    telegram = FakeTelegram()
+    app = ApplicationBuilder().token("123456:TEST").request(telegram).build()
+    images.setup_images(app)
+
+    async def command(update_id, user_id, text):
+        update = text_update(update_id, user_id, text)
+        update["message"]["entities"] = [{"type": "bot_command", "offset": 0, "length": len("/imagine")}]
+        await app.process_update(Update.de_json(update, app.bot))
+
+    async def test(provider):
+        queue = ImageQueue(provider.generate, ImageCache(str(tmp_path), 1 << 20), workers=1)
+        monkeypatch.setattr(images, "image_queue", queue)
+        await app.initialize()
+        queue.start()
+        try:
+            await command(1, 8101, "/imagine a bunny on the moon")
+            # The handler is done before the image is
+            assert telegram.calls.get("sendPhoto") is None
+            await queue._queue.join()
+            # Another user; one image takes the first user's whole burst
+            await command(2, 8102, "/imagine a bunny on the moon")
+        finally:
+            await queue.stop()
+            await app.shutdown()
+
+    asyncio.run(serving(server, test, workers=1))
+
+    assert telegram.calls["sendMessage"] == 1
+    assert telegram.calls["editMessageText"] == 1
+    assert telegram.calls["deleteMessage"] == 1
+    # The second request came from the cache
+    assert telegram.calls["sendPhoto"] == 2 and server.requests == 1
+    assert telegram.sent[0]["text"].startswith("🎨 Queued")
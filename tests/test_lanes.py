@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters
+
+from benchmarks.fake_telegram import FakeTelegram, text_update
+from src.services.lanes import LaneDispatcher, LanedApplication
+
+
+def test_one_lane_runs_in_order_and_lanes_run_concurrently():
+    dispatcher = LaneDispatcher(max_concurrency=10, idle_ttl=60)
+    done = []
+
+    async def job(key, i, delay):
+        await asyncio.sleep(delay)
+        done.append((key, i))
+
+    async def run():
+        start = time.monotonic()
+        # Earlier jobs of a lane are slower; they must still finish first
+        await asyncio.gather(*(
+            dispatcher.run(key, lambda key=key, i=i: job(key, i, 0.05 - i * 0.01))
+            for i in range(5) for key in ("a", "b", "c")
+        ))
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+
+    for key in ("a", "b", "c"):
+        assert [i for k, i in done if k == key] == list(range(5))
+    # Three lanes side by side take as long as one (0.15 s), not three
+    assert elapsed < 0.3
+
+
+def test_global_cap_and_idle_eviction():
+    dispatcher = LaneDispatcher(max_concurrency=2, idle_ttl=0.05)
+    peak = 0
+
+    async def job():
+        nonlocal peak
+        peak = max(peak, dispatcher.running)
+        await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(dispatcher.run(key, job) for key in range(10)))
+        assert len(dispatcher) == 10
+        await asyncio.sleep(0.06)
+        await dispatcher.run(99, job)
+
+    asyncio.run(run())
+
+    assert peak == 2
+    assert len(dispatcher) == 1 and dispatcher.evictions == 10
+
+
+def test_fast_commands_stay_fast_while_ai_calls_are_slow():
+    app = ApplicationBuilder().token("123456:TEST").request(FakeTelegram()).application_class(LanedApplication) \
+        .concurrent_updates(1024).build()
+    app.dispatcher = LaneDispatcher(max_concurrency=64)
+    sent = {}
+    fast = []
+    slow_done = []
+
+    async def slow_ai(update, context):
+        await asyncio.sleep(0.2)
+        slow_done.append(update.effective_user.id)
+
+    async def profile(update, context):
+        fast.append(time.monotonic() - sent[update.update_id])
+
+    app.add_handler(CommandHandler("profile", profile))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, slow_ai))
+
+    async def run():
+        await app.initialize()
+        await app.start()
+        update_id = 0
+        for round_ in range(10):
+            for user_id in range(1, 21):
+                update_id += 1
+                update = text_update(update_id, user_id, "tell me a story")
+                sent[update_id] = time.monotonic()
+                await app.update_queue.put(Update.de_json(update, app.bot))
+            for user_id in range(100, 110):
+                update_id += 1
+                update = text_update(update_id, user_id, "/profile")
+                update["message"]["entities"] = [{"type": "bot_command", "offset": 0, "length": 8}]
+                sent[update_id] = time.monotonic()
+                await app.update_queue.put(Update.de_json(update, app.bot))
+            await asyncio.sleep(0.02)
+        while len(fast) < 100:
+            await asyncio.sleep(0.01)
+        await app.stop()
+        await app.shutdown()
+
+    asyncio.run(run())
+
+    fast.sort()
+    p99 = fast[int(len(fast) * 0.99) - 1]
+    # Ten queued AI calls per user take 2 s; /profile of other users never waits for them
+    assert len(slow_done) == 200
+    assert p99 < 0.1
@@ -0,0 +1,82 @@
+import asyncio
+
+from src import async_db, database
+from src.services.leaderboard import Leaderboard
+
+
+def consistent(board):
+    """The sorted order holds exactly the users and points of the dict"""
+    return list(board._order) == sorted((-points, user_id) for user_id, points in board._points.items())
+
+
+def test_updates_keep_the_order_and_points_in_sync():
+    board = Leaderboard()
+    board.load([(1, 10), (2, None), (3, 30)])
+    assert board.loaded and len(board) == 3 and board.points(2) == 0
+
+    board.set(2, 50)
+    board.set(2, 50)
+    board.add(1, 5)
+    board.add(4, 7)  # an unseen user starts from zero
+    board.ensure(3)  # already known: points untouched
+    board.ensure(5)
+    board.add(3, -30)
+
+    assert consistent(board)
+    assert board._points == {1: 15, 2: 50, 3: 0, 4: 7, 5: 0}
+    assert len(board._order) == len(board) == 5
+
+
+def test_ties_share_a_rank_and_unknown_users_have_none():
+    board = Leaderboard()
+    board.load([(1, 100), (2, 50), (3, 50), (4, 10), (5, 0)])
+
+    # As COUNT(*) + 1 of users with more points
+    assert [board.rank(user_id) for user_id in (1, 2, 3, 4, 5)] == [1, 2, 2, 4, 5]
+    assert board.rank(99) is None and board.points(99) is None
+
+    board.add(4, 40)
+    assert [board.rank(user_id) for user_id in (2, 3, 4, 5)] == [2, 2, 2, 5]
+
+
+def test_top_is_ordered_by_points_then_user():
+    board = Leaderboard()
+    board.load([(3, 5), (1, 20), (2, 5), (4, 30)])
+
+    assert board.top(3) == [(4, 30), (1, 20), (2, 5)]
+    assert board.top(10) == [(4, 30), (1, 20), (2, 5), (3, 5)]
+    assert board.top(0) == []
+    assert Leaderboard().top(5) == []
+
+
+def test_async_db_answers_from_memory_once_loaded(monkeypatch):
+    database.init_db()
+    # Far above anything other tests give out, so these users are the top four
+    scores = {9101: 1_000_300, 9102: 1_000_200, 9103: 1_000_200, 9104: 1_000_100}
+    database.apply_activity_batch([(user_id, f"u{user_id}", None, None, 0, None, None) for user_id in scores])
+    for user_id, points in scores.items():
+        with database.get_db() as conn:
+            conn.execute("UPDATE users SET points = ? WHERE user_id = ?", (points, user_id))
+
+    board = Leaderboard()
+    monkeypatch.setattr(async_db, "leaderboard", board)
+
+    async def ranks():
+        return [await async_db.get_rank(user_id) for user_id in (*scores, 424242)]
+
+    async def top():
+        return [(row["user_id"], row["points"]) for row in await async_db.get_leaderboard(4)]
+
+    # Not loaded yet: straight from the database
+    from_db = asyncio.run(ranks())
+    assert [rank for rank, _ in from_db[:4]] == [1, 2, 2, 4] and from_db[4] is None
+    assert [points for _, points in asyncio.run(top())] == list(scores.values())
+
+    board.load(database.get_all_points())
+    assert asyncio.run(ranks()) == from_db == [database.get_rank(user_id) for user_id in (*scores, 424242)]
+    assert asyncio.run(top()) == list(scores.items())
+
+    # Points changed through async_db show up without a reload
+    assert asyncio.run(async_db.add_points(9104, 250))
+    assert asyncio.run(async_db.get_rank(9104)) == database.get_rank(9104)
+    assert asyncio.run(top())[0] == (9104, 1_000_350)
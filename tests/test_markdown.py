@@ -0,0 +1,27 @@
+import random
+
+from src import messages
+from src.utils import MarkdownTemplate, escape_markdown
+
+SPECIAL = r"_*[]()~`>#+-=|{}.!\\"
+
+
+def reference_escape(text):
+    return "".join(f"\\{char}" if char in SPECIAL else char for char in str(text))
+
+
+def test_escape_matches_per_character_reference():
+    rng = random.Random(7)
+    alphabet = SPECIAL + "ab 1👋\n"
+    for _ in range(500):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        assert escape_markdown(text) == reference_escape(text)
+    assert escape_markdown(-1.5) == "\\-1\\.5"
+
+
+def test_templates_escape_literals_once_and_fields_on_format():
+    row = MarkdownTemplate("{rank}. {name}: {points:,} points {{braces}}")
+
+    assert row.format(rank=1, name="night_owl", points=12345) == "1\\. night\\_owl: 12,345 points \\{braces\\}"
+    assert messages.LEADERBOARD_ROW.format(rank=2, name="a.b", points=5) == reference_escape("2. a.b: 5 points")
+    assert messages.HELP == reference_escape(messages.HELP.replace("\\", ""))
@@ -0,0 +1,59 @@
+import asyncio
+
+from src import database
+from src.services.memory import ConversationMemory, estimate_tokens, render_prompt
+
+
+def test_sessions_keep_only_the_last_turns():
+    memory = ConversationMemory(max_turns=3)
+
+    async def run():
+        for i in range(10):
+            await memory.add_turn(1, f"q{i}", f"a{i}")
+        return await memory.history(1)
+
+    assert asyncio.run(run()) == [("q7", "a7"), ("q8", "a8"), ("q9", "a9")]
+
+
+def test_prompt_is_trimmed_to_the_token_budget():
+    history = [(f"question {i} " * 20, f"answer {i} " * 20) for i in range(50)]
+
+    prompt = render_prompt(history, "latest?", token_budget=300)
+
+    assert estimate_tokens(prompt) <= 300
+    assert prompt.endswith("User: latest?\nAssistant:")
+    # The newest turns survive, the oldest are dropped
+    assert "answer 49" in prompt and "answer 0 " not in prompt
+    assert render_prompt(history, "latest?", token_budget=10) == "latest?"
+
+
+def test_least_recently_used_sessions_are_evicted_and_saved():
+    saved = {}
+
+    async def save(user_id, turns):
+        saved.setdefault(user_id, []).extend(turns)
+        return True
+
+    memory = ConversationMemory(max_turns=5, max_sessions=2, save=save)
+
+    async def run():
+        await memory.add_turn(1, "hi", "hello")
+        await memory.add_turn(2, "hi", "hello")
+        await memory.history(1)  # 1 is now the most recently used
+        await memory.add_turn(3, "hi", "hello")
+
+    asyncio.run(run())
+
+    assert len(memory) == 2
+    assert saved == {2: [("hi", "hello")]}
+
+
+def test_turns_round_trip_through_message_logs():
+    database.init_db()
+    database.apply_activity_batch([(4242, None, None, None, 0, None, None)])
+    turns = [(f"q{i}", f"a{i}") for i in range(4)]
+
+    assert database.save_turns(4242, turns)
+    database.log_message(4242, "command", "/start")
+
+    assert database.load_turns(4242, 3) == turns[1:]
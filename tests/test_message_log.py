@@ -0,0 +1,93 @@
+import asyncio
+import sqlite3
+
+from src import database
+from src.services.message_log import BLOCK, MessageLogWriter
+
+
+def test_entries_are_written_in_batches():
+    batches = []
+
+    async def write(rows):
+        batches.append(rows)
+        return True
+
+    writer = MessageLogWriter(write, batch_size=100)
+
+    async def run():
+        for i in range(250):
+            await writer.log(1, "message", f"m{i}")
+        await writer.flush()
+
+    asyncio.run(run())
+
+    assert [len(batch) for batch in batches] == [100, 100, 50]
+    assert batches[0][0][:3] == (1, "message", "m0")
+    assert writer.written == 250
+
+
+def test_full_queue_drops_the_oldest_entries():
+    async def write(rows):
+        return True
+
+    writer = MessageLogWriter(write, max_queue=10)
+
+    async def run():
+        for i in range(25):
+            await writer.log(1, "message", f"m{i}")
+
+    asyncio.run(run())
+
+    assert len(writer) == 10 and writer.dropped == 15
+    assert [row[2] for row in writer._queue] == [f"m{i}" for i in range(15, 25)]
+
+
+def test_block_policy_applies_backpressure():
+    written = []
+
+    async def write(rows):
+        await asyncio.sleep(0.01)
+        written.extend(rows)
+        return True
+
+    writer = MessageLogWriter(write, max_queue=5, batch_size=5, interval=0.01, overflow=BLOCK)
+
+    async def run():
+        writer.start()
+        for i in range(30):
+            await writer.log(1, "message", f"m{i}")
+            assert len(writer) <= 5
+        await writer.stop()
+
+    asyncio.run(run())
+
+    assert [row[2] for row in written] == [f"m{i}" for i in range(30)]
+    assert writer.dropped == 0
+
+
+def test_retention_prunes_and_archives_in_chunks(tmp_path):
+    database.init_db()
+    database.apply_activity_batch([(8800, None, None, None, 0, None, None)])
+    with database.get_db() as conn:
+        # Pruning walks from the oldest id; rows other tests logged just now would stop it early
+        conn.execute("DELETE FROM message_logs")
+    old = [(8800, "message", f"old{i}", "2020-01-01 00:00:00") for i in range(25)]
+    new = [(8800, "message", "recent", "2999-01-01 00:00:00")]
+    assert database.log_messages(old + new)
+    archive = str(tmp_path / "archive.db")
+    chunks = []
+
+    async def prune(before, limit):
+        removed = database.prune_message_logs(before, limit, archive)
+        chunks.append(removed)
+        return removed
+
+    writer = MessageLogWriter(None, prune=prune, retention_days=30, prune_chunk=10)
+
+    assert asyncio.run(writer.prune()) == 25
+    assert chunks[:3] == [10, 10, 5]
+    with database.get_manager().read() as conn:
+        left = [row[0] for row in conn.execute("SELECT content FROM message_logs WHERE user_id = 8800")]
+    assert left == ["recent"]
+    with sqlite3.connect(archive) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM message_logs").fetchone()[0] == 25
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from src.services.metrics import MetricsServer, Registry
+from src.services.utils import instrumented
+
+
+def test_histogram_percentiles_and_prometheus_text():
+    registry = Registry()
+    errors = registry.counter("test_errors_total", "errors", ("op",))
+    histogram = registry.histogram("test_seconds", "time", ("op",), buckets=(0.01, 0.1, 1.0), errors=errors)
+    for _ in range(90):
+        histogram.observe(0.005, "read")
+    for _ in range(10):
+        histogram.observe(0.5, "read")
+    with pytest.raises(ValueError):
+        with histogram.time("write"):
+            raise ValueError("boom")
+
+    assert histogram.percentile(50, "read") == pytest.approx(0.01 * 50 / 90)
+    assert 0.1 < histogram.percentile(95, "read") <= 1.0
+    assert errors.value("write") == 1
+
+    text = registry.render()
+    assert "# TYPE test_seconds histogram" in text
+    assert 'test_seconds_bucket{op="read",le="0.01"} 90' in text
+    assert 'test_seconds_bucket{op="read",le="+Inf"} 100' in text
+    assert 'test_seconds_count{op="read"} 100' in text
+    assert 'test_errors_total{op="write"} 1' in text
+
+
+def test_instrumented_handlers_are_counted():
+    from src.services.metrics import HANDLER_ERRORS, HANDLER_SECONDS
+
+    @instrumented
+    async def flaky_handler(update, context):
+        if update == "bad":
+            raise RuntimeError("nope")
+
+    async def run():
+        await flaky_handler("good", None)
+        with pytest.raises(RuntimeError):
+            await flaky_handler("bad", None)
+
+    asyncio.run(run())
+
+    assert HANDLER_SECONDS.series()[("flaky_handler",)].count == 2
+    assert HANDLER_ERRORS.value("flaky_handler") == 1
+
+
+def test_metrics_endpoint_serves_the_registry():
+    registry = Registry()
+    registry.gauge("test_queue_depth", "depth", lambda: 7)
+    server = MetricsServer(registry, port=0)
+
+    async def fetch(path):
+        reader, writer = await asyncio.open_connection("127.0.0.1", server._server.sockets[0].getsockname()[1])
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        response = await reader.read()
+        writer.close()
+        return response.decode()
+
+    async def run():
+        await server.start()
+        try:
+            return await fetch("/metrics"), await fetch("/other")
+        finally:
+            await server.stop()
+
+    metrics, other = asyncio.run(run())
+
+    assert metrics.startswith("HTTP/1.1 200 OK")
+    assert "test_queue_depth 7" in metrics
+    assert other.startswith("HTTP/1.1 404")
+
+
+def test_singletons_export_their_counts():
+    from models.ai_router import ai_flights
+    from src.services.metrics import registry
+    from src.services.response_cache import response_cache
+    from src.services.streaming import time_to_first_token
+
+    time_to_first_token.observe(0.25)
+
+    async def run():
+        await response_cache.get("metrics-test-missing")
+        await ai_flights.do("metrics-test", lambda: asyncio.sleep(0, "answer"))
+
+    asyncio.run(run())
+    text = registry.render()
+
+    assert 'bunny_time_to_first_token_seconds{quantile="0.5"}' in text
+    assert 'bunny_time_to_first_token_seconds{quantile="0.95"}' in text
+    assert f'bunny_ai_flights{{state="upstream"}} {ai_flights.calls}' in text
+    assert 'bunny_ai_flights{state="collapsed"}' in text
+    assert f'bunny_response_cache_events{{event="miss"}} {response_cache.misses}' in text
+    assert 'bunny_response_cache_events{event="eviction"}' in text
+    assert 'bunny_response_cache_size{unit="bytes"}' in text
@@ -0,0 +1,186 @@
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from src import database
+from src.migrations import _V1_TABLES, latest_version, migrate
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def schema(conn):
+    """Column definitions, STRICT flag and indexes of the bot's tables"""
+    tables = {
+        table: (
+            conn.execute("SELECT strict FROM pragma_table_list WHERE name = ?", (table,)).fetchone()[0],
+            [tuple(row) for row in conn.execute(f"PRAGMA table_info({table})")],
+        )
+        for table in _V1_TABLES
+    }
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")}
+    return tables, indexes
+
+
+def test_every_legacy_file_reaches_the_same_schema(tmp_path):
+    fresh = connect(tmp_path / "fresh.db")
+    assert migrate(fresh) == latest_version()
+
+    early = tmp_path / "early.db"
+    shutil.copy(ROOT / "data" / "bot.db", early)
+    early = connect(early)
+    users = [tuple(row) for row in early.execute("SELECT user_id, username, message_count FROM users")]
+
+    scripted = tmp_path / "scripted.db"
+    shutil.copy(ROOT / "db" / "bot_data.db", scripted)
+    # The script never turned foreign keys on
+    with sqlite3.connect(scripted) as conn:
+        conn.execute("INSERT INTO users (user_id, username, join_date, last_active) VALUES (5, 'bun', '2024-01-01', '2024-01-02')")
+        conn.execute("INSERT INTO messages (user_id, text, date) VALUES (5, 'hi', '2024-01-02 10:00:00'), (6, 'orphan', '2024-01-02')")
+    scripted = connect(scripted)
+
+    for conn in (early, scripted):
+        assert migrate(conn) == latest_version()
+        assert schema(conn) == schema(fresh)
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+
+    assert [tuple(row) for row in early.execute("SELECT user_id, username, message_count FROM users")] == users
+    # Tables the bot does not own are left alone
+    assert early.execute("SELECT COUNT(*) FROM daily_rewards").fetchone()[0] == 7
+    assert scripted.execute("SELECT user_id, message_type, content, timestamp FROM message_logs").fetchall() == [
+        (5, "message", "hi", "2024-01-02 10:00:00")
+    ]
+    assert not scripted.execute("SELECT 1 FROM sqlite_master WHERE name = 'messages'").fetchone()
+
+    # Already current: nothing to apply
+    assert migrate(scripted) == latest_version()
+    assert scripted.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0] == latest_version()
+
+
+def test_database_from_before_versioning_is_upgraded_in_place(tmp_path):
+    conn = connect(tmp_path / "bot.db")
+    with conn:
+        for sql in _V1_TABLES.values():
+            conn.execute(sql)
+        conn.execute("CREATE INDEX idx_users_user_id ON users(user_id)")
+        conn.execute("CREATE INDEX idx_achievements_user_id ON achievements(user_id)")
+        conn.execute("INSERT INTO users (user_id, points) VALUES (1, 50)")
+        conn.execute("INSERT INTO achievements (user_id, name) VALUES (1, 'Chat Starter'), (1, 'Chat Starter')")
+
+    assert migrate(conn) == latest_version()
+
+    _, indexes = schema(conn)
+    assert "idx_users_user_id" not in indexes and "idx_achievements_user_id" not in indexes
+    assert {"idx_users_points", "idx_users_last_active", "idx_achievements_user_name", "idx_message_logs_user_id"} <= indexes
+    assert conn.execute("SELECT points FROM users").fetchone()[0] == 50
+    assert conn.execute("SELECT COUNT(*) FROM achievements").fetchone()[0] == 1
+
+
+def test_existing_users_get_the_achievements_they_already_qualify_for(tmp_path):
+    conn = connect(tmp_path / "bot.db")
+    with conn:
+        for sql in _V1_TABLES.values():
+            conn.execute(sql)
+        conn.execute("""
+            INSERT INTO users (user_id, message_count, points, active_days)
+            VALUES (1, 150, 20, 9), (2, 3, 100, 0), (3, 0, 0, 0)
+        """)
+        conn.execute("INSERT INTO achievements (user_id, name) VALUES (1, 'Chat Starter')")
+
+    assert migrate(conn) == latest_version()
+
+    assert sorted(conn.execute("SELECT user_id, name FROM achievements")) == [
+        (1, "Chat Starter"), (1, "Daily User"), (1, "Power User"),
+        (2, "Chat Starter"), (2, "Point Collector"),
+    ]
+
+
+def test_each_index_is_built_under_its_own_write_lock(tmp_path):
+    conn = connect(tmp_path / "bot.db")
+    with conn:
+        conn.execute(_V1_TABLES["users"])
+        conn.executemany("INSERT INTO users (user_id, points, last_active) VALUES (?, ?, '2024-01-01')",
+                         ((user_id, user_id % 1000) for user_id in range(20000)))
+    statements = []
+    conn.set_trace_callback(statements.append)
+
+    migrate(conn)
+
+    transactions, current = [], None
+    for sql in (statement.strip().split("\n")[0] for statement in statements):
+        if sql.startswith("BEGIN IMMEDIATE"):
+            current = []
+        elif sql.startswith(("COMMIT", "ROLLBACK")) and current is not None:
+            transactions.append(current)
+            current = None
+        elif current is not None and sql.startswith("CREATE") and "INDEX" in sql:
+            current.append(sql)
+    builds = [len(indexes) for indexes in transactions if indexes]
+    assert len(builds) == 4 and set(builds) == {1}
+
+
+def test_failed_step_rolls_back_and_keeps_its_version(tmp_path):
+    conn = connect(tmp_path / "bot.db")
+    with conn:
+        # A row no STRICT users table can hold
+        conn.execute("CREATE TABLE users (user_id INTEGER PRIMARY KEY, points)")
+        conn.execute("INSERT INTO users VALUES (1, 'lots')")
+
+    with pytest.raises(sqlite3.Error):
+        migrate(conn)
+
+    assert conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] == 2
+    assert conn.execute("SELECT points FROM users").fetchone()[0] == "lots"
+
+
+def traced(monkeypatch, fn, *args):
+    """The SQL statements `fn` runs against the bot's database, with parameters bound"""
+    statements = []
+    connect = database.ConnectionManager._connect
+
+    def tracing(self, readonly=False):
+        conn = connect(self, readonly)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    database.close_db()
+    monkeypatch.setattr(database.ConnectionManager, "_connect", tracing)
+    try:
+        fn(*args)
+    finally:
+        database.close_db()
+    return [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+
+
+def query_plan(sql):
+    with database.get_manager().read() as conn:
+        return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+@pytest.mark.parametrize("fn, args, expected", [
+    (database.get_leaderboard, (10,), ["SCAN users USING INDEX idx_users_points"]),
+    (database.get_all_points, (), ["SCAN users USING COVERING INDEX idx_users_points"]),
+    (database.get_rank, (1,), ["SEARCH users USING COVERING INDEX idx_users_points (points>?)"]),
+    (database.get_bot_stats, (), ["SEARCH users USING COVERING INDEX idx_users_last_active (last_active>?)"]),
+    (lambda: list(database.iter_recent_activity(7)), (), ["SEARCH users USING COVERING INDEX idx_users_last_active (last_active>?)"]),
+    (database.get_achievements, (1,), ["SEARCH achievements USING INDEX idx_achievements_user_name (user_id=?)"]),
+    (database.load_turns, (1, 4), ["SEARCH message_logs USING INDEX idx_message_logs_user_id (user_id=?)"]),
+    (database.get_all_users, (), ["SCAN users USING INDEX idx_users_last_active"]),
+])
+def test_hot_queries_use_their_indexes(monkeypatch, fn, args, expected):
+    database.init_db()
+    statements = traced(monkeypatch, fn, *args)
+    assert statements
+
+    plan = [step for sql in statements for step in query_plan(sql)]
+    for step in expected:
+        assert step in plan
+    # No query reads every row of users or message_logs to find a few
+    assert not [step for step in plan if step in ("SCAN users", "SCAN message_logs")]
@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+from telegram.error import RetryAfter
+
+from src.services.outbound import BULK, INTERACTIVE, OutboundScheduler
+
+
+def send(scheduler, log, chat_id, text, priority=None):
+    async def callback():
+        log.append((text, time.monotonic()))
+        return True
+    return scheduler.process_request(callback, (), {}, "sendMessage", {"chat_id": chat_id, "text": text}, priority)
+
+
+def test_interactive_replies_overtake_queued_bulk_messages():
+    scheduler = OutboundScheduler(global_rate=20, chat_rate=1000, chat_burst=1000)
+    log = []
+
+    async def run():
+        await scheduler.initialize()
+        bulk = [asyncio.create_task(send(scheduler, log, 1000 + i, f"bulk{i}", BULK)) for i in range(40)]
+        await asyncio.sleep(0.1)
+        await send(scheduler, log, 1, "reply", INTERACTIVE)
+        await asyncio.gather(*bulk)
+        await scheduler.shutdown()
+
+    asyncio.run(run())
+
+    order = [text for text, _ in log]
+    # The global burst (20) drains first, then the reply jumps the remaining bulk messages
+    assert order.index("reply") <= 22
+    assert scheduler.queue_depth == 0
+
+
+def test_messages_to_one_chat_are_paced():
+    scheduler = OutboundScheduler(global_rate=1000, chat_rate=20, chat_burst=2)
+    log = []
+
+    async def run():
+        await scheduler.initialize()
+        await asyncio.gather(*(send(scheduler, log, 1, f"part{i}") for i in range(6)))
+        await scheduler.shutdown()
+
+    asyncio.run(run())
+
+    times = [at for _, at in log]
+    # Two go out at once, the other four 50ms apart
+    assert times[-1] - times[0] >= 0.15
+    assert scheduler.send_latency.count == 6
+
+
+def test_retry_after_is_waited_out_and_retried():
+    scheduler = OutboundScheduler(global_rate=1000, chat_rate=1000, chat_burst=1000)
+    attempts = []
+
+    async def callback():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise RetryAfter(0.05)
+        return True
+
+    async def run():
+        await scheduler.initialize()
+        result = await scheduler.process_request(callback, (), {}, "sendMessage", {"chat_id": 1}, None)
+        await scheduler.shutdown()
+        return result
+
+    assert asyncio.run(run()) is True
+    assert attempts[1] - attempts[0] >= 0.05
+    assert scheduler.retries == 1
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import pytest
+
+from src.services.profiler import SamplingProfiler
+
+
+async def waiting_handler():
+    await asyncio.sleep(10)
+
+
+def busy_work(until):
+    while time.monotonic() < until:
+        sum(range(1000))
+
+
+async def busy_handler():
+    # Chunks well over the GIL switch interval, or the sampler only ever
+    # wakes at the loop's select() between them
+    for _ in range(6):
+        busy_work(time.monotonic() + 0.05)
+        await asyncio.sleep(0)
+
+
+def test_collapsed_stacks_cover_threads_and_waiting_tasks():
+    profiler = SamplingProfiler(interval=0.005)
+
+    async def run():
+        waiter = asyncio.create_task(waiting_handler())
+        busy = asyncio.create_task(busy_handler())
+        collapsed = await profiler.run(0.3)
+        waiter.cancel()
+        await busy
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return collapsed
+
+    collapsed = asyncio.run(run())
+    lines = collapsed.splitlines()
+
+    for line in lines:
+        stack, _, count = line.rpartition(" ")
+        assert stack and int(count) > 0
+    assert any(line.startswith("thread MainThread;") and "busy_work" in line for line in lines)
+    assert any(line.startswith("tasks;waiting_handler") and "sleep" in line for line in lines)
+    assert profiler.samples > 0 and not profiler.running
+    # Only the bot's own code is summarised; the test's frames are not part of it
+    assert SamplingProfiler.top(collapsed) == []
+
+
+def test_only_one_profile_at_a_time():
+    profiler = SamplingProfiler(interval=0.01)
+
+    async def run():
+        first = asyncio.create_task(profiler.run(0.05))
+        await asyncio.sleep(0)
+        with pytest.raises(RuntimeError):
+            await profiler.run(0.05)
+        await first
+
+    asyncio.run(run())
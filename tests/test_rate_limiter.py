@@ -0,0 +1,96 @@
+import asyncio
+
+from src.services.rate_limiter import GCRA, RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cost_weights_draw_on_the_same_budget():
+    clock = Clock()
+    # One unit a second, bursts of ten
+    limiter = RateLimiter(GCRA(60, period=60, burst=10), clock=clock)
+
+    assert limiter.check("bun", cost=5) == 0.0
+    assert limiter.check("bun", cost=5) == 0.0
+    assert limiter.check("bun", cost=1) == 1.0
+    # A costly action waits for its whole price
+    clock.now = 1.0
+    assert limiter.check("bun", cost=5) == 4.0
+    assert limiter.allow("bun", cost=1)
+    assert not limiter.allow("bun", cost=1)
+    assert (limiter.allowed, limiter.rejected) == (3, 3)
+
+
+def test_cost_above_the_burst_takes_the_whole_burst():
+    clock = Clock()
+    limiter = RateLimiter(GCRA(60, period=60, burst=3), global_limit=GCRA(60, period=60, burst=2), clock=clock)
+
+    assert limiter.allow("bun", cost=5)
+    assert limiter.check("bun", cost=5) == 3.0
+    clock.now = 3.0
+    assert limiter.allow("bun", cost=5)
+
+    async def acquire():
+        clock.now = 6.0
+        await asyncio.wait_for(limiter.acquire("other", cost=10), timeout=1)
+
+    asyncio.run(acquire())
+
+
+def test_global_and_per_key_rejections():
+    clock = Clock()
+    limiter = RateLimiter(GCRA(60, period=60, burst=2), global_limit=GCRA(60, period=60, burst=3), clock=clock)
+
+    assert limiter.allow("a") and limiter.allow("a")
+    # Over the per-key limit; the global budget is not charged for it
+    assert limiter.check("a") == 1.0
+    assert limiter.allow("b")
+    tat = limiter._tats["b"]
+    # Within b's own budget but over the global one; b is not charged either
+    assert limiter.check("b") == 1.0
+    assert limiter._tats["b"] == tat
+    assert limiter.check("c") == 1.0 and "c" not in limiter._tats
+
+    clock.now = 1.0
+    assert limiter.allow("c")
+    assert (limiter.allowed, limiter.rejected) == (4, 3)
+
+
+def test_idle_keys_are_evicted_as_requests_come_in():
+    clock = Clock()
+    limiter = RateLimiter(GCRA(60, period=60, burst=10), clock=clock)
+    for user_id in range(10):
+        limiter.allow(user_id)
+    assert len(limiter) == 10
+
+    # Every TAT has passed; each request drops more idle keys than it adds
+    clock.now = 5.0
+    for user_id in range(100, 110):
+        limiter.allow(user_id)
+    assert len(limiter) == 10 and not set(range(10)) & set(limiter._tats)
+
+    # An evicted key starts again with a full burst
+    assert all(limiter.allow(0) for _ in range(10))
+
+
+def test_size_stays_bounded_under_mixed_costs():
+    clock = Clock()
+    # One unit a second with a large burst: a costly action keeps its key live for long
+    limiter = RateLimiter(GCRA(60, period=60, burst=100), clock=clock)
+    peak = 0
+    for i in range(1000):
+        clock.now = i * 0.5
+        # Every tenth request is expensive, the rest are one-off cheap ones
+        limiter.allow(("heavy", i) if i % 10 == 0 else i, cost=50 if i % 10 == 0 else 1)
+        peak = max(peak, len(limiter))
+
+    live = sum(1 for tat in limiter._tats.values() if tat > clock.now)
+    # Heavy keys stay live for 50 s (ten of them), cheap ones for 1 s (two)
+    assert live <= 13
+    assert peak <= 2 * 13 + 2
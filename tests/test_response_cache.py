@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+from src.services.response_cache import ResponseCache, SqliteCacheStore
+
+
+def test_entries_expire_after_the_ttl():
+    cache = ResponseCache(ttl=0.05)
+
+    async def run():
+        await cache.set("k", "v")
+        fresh = await cache.get("k")
+        await asyncio.sleep(0.06)
+        return fresh, await cache.get("k")
+
+    assert asyncio.run(run()) == ("v", None)
+    assert cache.stats() == {"entries": 0, "bytes": 0, "hits": 1, "misses": 1, "evictions": 0, "expirations": 1}
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = ResponseCache(max_entries=3)
+
+    async def run():
+        for key in ("a", "b", "c"):
+            await cache.set(key, key.upper())
+        await cache.get("a")  # now the most recently used
+        await cache.set("d", "D")
+        return [await cache.get(key) for key in ("a", "b", "c", "d")]
+
+    assert asyncio.run(run()) == ["A", None, "C", "D"]
+    assert cache.stats()["entries"] == 3
+    assert cache.evictions == 1 and cache.misses == 1 and cache.hits == 4
+
+
+def test_byte_budget_evicts_and_skips_oversized_values():
+    entry = ResponseCache._sizeof("k0", "x" * 1000)
+    cache = ResponseCache(max_entries=100, max_bytes=entry * 3)
+
+    async def run():
+        for i in range(5):
+            await cache.set(f"k{i}", "x" * 1000)
+        # Would not fit even alone; the rest of the cache is left alone
+        await cache.set("huge", "y" * entry * 4)
+        return [await cache.get(f"k{i}") is not None for i in range(5)], await cache.get("huge")
+
+    present, huge = asyncio.run(run())
+
+    assert present == [False, False, True, True, True] and huge is None
+    assert cache.stats()["bytes"] == entry * 3
+    assert cache.evictions == 2
+
+
+def test_replacing_a_key_keeps_the_byte_count_exact():
+    cache = ResponseCache()
+
+    async def run():
+        await cache.set("k", "short")
+        await cache.set("k", "a much longer answer")
+        return await cache.get("k")
+
+    assert asyncio.run(run()) == "a much longer answer"
+    assert cache.stats()["bytes"] == ResponseCache._sizeof("k", "a much longer answer")
+    assert cache.stats()["entries"] == 1
+
+
+def test_sqlite_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache" / "responses.db")
+
+    async def write():
+        cache = ResponseCache(ttl=60, store=SqliteCacheStore(path))
+        await cache.set("kept", "answer")
+        cache.store.set("stale", "old answer", time.time() - 1)
+        cache.store.close()
+
+    async def read():
+        cache = ResponseCache(ttl=60, store=SqliteCacheStore(path))
+        results = [await cache.get("kept"), await cache.get("stale"), await cache.get("kept")]
+        cache.store.close()
+        return cache, results
+
+    asyncio.run(write())
+    cache, results = asyncio.run(read())
+
+    assert results == ["answer", None, "answer"]
+    # The first read came from disk and was promoted; the second was served from memory
+    assert cache.stats()["entries"] == 1
+    assert cache.hits == 2 and cache.misses == 1
+
+
+def test_sqlite_prune_keeps_the_newest_rows(tmp_path):
+    store = SqliteCacheStore(str(tmp_path / "responses.db"), max_rows=3)
+    now = time.time()
+    store.set("expired", "v", now - 1)
+    for i in range(5):
+        store.set(f"k{i}", "v", now + 60 + i)
+
+    with store._lock:
+        store._prune()
+        store._conn.commit()
+
+    assert [store.get(f"k{i}", now) is not None for i in range(5)] == [False, False, True, True, True]
+    assert store._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0] == 3
+    store.close()
@@ -0,0 +1,79 @@
+import asyncio
+
+from src.services.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    async def run():
+        return await asyncio.gather(*(flights.do("key", upstream) for _ in range(50)))
+
+    results = asyncio.run(run())
+
+    assert results == ["answer"] * 50
+    assert len(calls) == 1
+    assert flights.stats() == {"calls": 1, "collapsed": 49, "in_flight": 0}
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    flights = SingleFlight()
+
+    async def upstream():
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    async def run():
+        first = asyncio.create_task(flights.do("key", upstream))
+        second = asyncio.create_task(flights.do("key", upstream))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(run()) == ("answer", True)
+
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    flights = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def run():
+        results = await asyncio.gather(flights.do("key", failing), flights.do("key", failing), return_exceptions=True)
+        retry = await flights.do("key", lambda: asyncio.sleep(0, result="recovered"))
+        return results, retry
+
+    results, retry = asyncio.run(run())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retry == "recovered"
+
+
+def test_late_subscribers_replay_the_whole_stream():
+    flights = SingleFlight()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        for word in ["one ", "two ", "three"]:
+            await asyncio.sleep(0.01)
+            yield word
+
+    async def collect(delay):
+        await asyncio.sleep(delay)
+        return "".join([chunk async for chunk in flights.stream("key", upstream)])
+
+    async def run():
+        return await asyncio.gather(collect(0), collect(0.015), collect(0.025))
+
+    assert asyncio.run(run()) == ["one two three"] * 3
+    assert len(calls) == 1
+    assert flights.collapsed == 2
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# Cumulative `import bot` time allowed, in ms; raise it with IMPORT_BUDGET_MS on slow machines
+IMPORT_BUDGET_MS = int(os.getenv("IMPORT_BUDGET_MS", "750"))
+# Imported on first use only
+DEFERRED = ("cohere", "google.generativeai", "requests")
+
+
+def import_times(module: str, env=None):
+    """{module: cumulative µs} as reported by python -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env or os.environ.copy(), capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_bot_imports_within_budget_without_provider_sdks():
+    runs = [import_times("bot") for _ in range(3)]
+
+    for deferred in DEFERRED:
+        assert deferred not in runs[0], f"{deferred} is imported at startup"
+    best = min(run["bot"] for run in runs) / 1000
+    assert best <= IMPORT_BUDGET_MS, f"import bot took {best:.0f} ms (budget {IMPORT_BUDGET_MS} ms)"
+
+
+def test_config_import_has_no_side_effects(tmp_path):
+    env = {key: value for key, value in os.environ.items() if key not in ("TELEGRAM_BOT_TOKEN", "COHERE_API_KEY")}
+    env["DATABASE_URL"] = f"sqlite:///{tmp_path}/nested/bot.db"
+
+    import_times("src.config", env)
+
+    assert not (tmp_path / "nested").exists()
@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+import pytest
+
+from src.services.stats import HOURS_KEPT, BotStats, HyperLogLog, sketch_activity
+
+HOUR = 3600
+
+
+def estimate(user_ids):
+    sketch = HyperLogLog()
+    for user_id in user_ids:
+        sketch.add(user_id)
+    return HyperLogLog.estimate(sketch.registers)
+
+
+@pytest.mark.parametrize("n", [1, 10, 100, 1000])
+def test_small_counts_are_close_to_exact(n):
+    # Linear counting: exact for a handful, a few percent at most above that
+    assert abs(estimate(range(n)) - n) <= max(1, n * 0.05)
+
+
+@pytest.mark.parametrize("n", [20000, 100000])
+def test_large_counts_stay_within_the_standard_error(n):
+    # 1.04 / sqrt(2048) is about 2.3%
+    assert abs(estimate(range(7_000_000, 7_000_000 + n)) - n) <= n * 0.05
+
+
+def test_repeats_and_merges_do_not_double_count():
+    assert estimate(list(range(500)) * 3) == estimate(range(500))
+
+    left, right = HyperLogLog(), HyperLogLog()
+    for user_id in range(600):
+        (left if user_id < 400 else right).add(user_id)
+        if 300 <= user_id < 400:
+            right.add(user_id)
+    left.merge(right)
+    assert HyperLogLog.estimate(left.registers) == estimate(range(600))
+
+
+def stats_with(activity, refresh=60.0):
+    """BotStats fed (user_id, seconds ago) activity"""
+    stats = BotStats(None, refresh=refresh)
+    now = time.time()
+    for user_id, ago in activity:
+        stats.record_active(user_id, now - ago)
+    return stats
+
+
+def test_daily_and_weekly_unions():
+    stats = stats_with(
+        # Active today, some of them in several hours
+        [(user_id, 0) for user_id in range(100)]
+        + [(user_id, 3 * HOUR) for user_id in range(50, 150)]
+        # Earlier this week only
+        + [(user_id, 3 * 24 * HOUR) for user_id in range(1000, 1200)]
+        # Older than the week
+        + [(user_id, 9 * 24 * HOUR) for user_id in range(5000, 5300)]
+    )
+
+    snapshot = stats.snapshot()
+
+    assert abs(snapshot["daily_active"] - 150) <= 3
+    assert abs(snapshot["active_users"] - 350) <= 7
+    assert len(stats._hours) <= HOURS_KEPT
+
+
+def test_snapshot_is_cached_between_refreshes():
+    stats = stats_with([(1, 0)])
+    assert stats.snapshot()["daily_active"] == 1
+
+    stats.record_active(2)
+    stats.add_users(3)
+    snapshot = stats.snapshot()
+    # Counts wait for the refresh; the exact total does not
+    assert snapshot["daily_active"] == 1 and snapshot["total_users"] == 3
+
+    stats.refresh = 0
+    assert stats.snapshot()["daily_active"] == 2
+
+
+def test_reconcile_merges_the_database_view_and_resets_the_total():
+    now_hour = int(time.time() // HOUR)
+    rows = [(user_id, now_hour) for user_id in range(10)] + [
+        (user_id, now_hour - 48) for user_id in range(100, 120)
+    ] + [(user_id, now_hour - HOURS_KEPT - 5) for user_id in range(500, 600)]
+
+    async def load():
+        return 42, 1, sketch_activity(rows)
+
+    stats = BotStats(load)
+    stats.add_users(7)
+    # Still in the write-behind buffer, so only the live sketch has it
+    stats.record_active(999)
+    stats.snapshot()
+
+    asyncio.run(stats.reconcile())
+
+    snapshot = stats.snapshot()
+    assert snapshot["total_users"] == 42
+    assert snapshot["daily_active"] == 11
+    assert abs(snapshot["active_users"] - 31) <= 1
+    assert stats.reconciled_at is not None
+    # Hours older than the week are not kept
+    assert min(stats._hours) > now_hour - HOURS_KEPT
+
+
+def test_users_written_around_the_count_are_counted_once():
+    async def load():
+        # Flushes finishing while the count is in flight: one written before
+        # it (already counted), one after
+        stats.add_users(2, seq=4)
+        stats.add_users(3, seq=6)
+        await asyncio.sleep(0)
+        return 100, 5, {}
+
+    stats = BotStats(load)
+    stats.add_users(1, seq=1)
+
+    async def run():
+        await stats.reconcile()
+        # A flush written before the count, reporting only now
+        stats.add_users(2, seq=3)
+        stats.add_users(4, seq=7)
+
+    asyncio.run(run())
+
+    assert stats.total_users == 100 + 3 + 4
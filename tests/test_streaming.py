@@ -0,0 +1,87 @@
+import asyncio
+
+from telegram.error import RetryAfter
+
+from src.services.streaming import StreamingReply, time_to_first_token
+
+
+class FakeMessage:
+    def __init__(self, text=""):
+        self.text = text
+        self.edits = []
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        msg = FakeMessage(text)
+        self.replies.append(msg)
+        return msg
+
+    async def edit_text(self, text, **kwargs):
+        self.edits.append(text)
+        self.text = text
+
+
+class FloodedMessage(FakeMessage):
+    """Rejects the first edit the way Telegram does under flood control"""
+
+    async def reply_text(self, text, **kwargs):
+        msg = FloodedMessage(text)
+        self.replies.append(msg)
+        return msg
+
+    async def edit_text(self, text, **kwargs):
+        if not self.edits:
+            self.edits.append(None)
+            raise RetryAfter(0.05)
+        await super().edit_text(text, **kwargs)
+
+
+async def fake_provider(chunks, delay):
+    """Stands in for the model's streaming API"""
+    for chunk in chunks:
+        await asyncio.sleep(delay)
+        yield chunk
+
+
+def test_edits_are_throttled():
+    message = FakeMessage()
+    chunks = ["word "] * 40
+    reply = StreamingReply(message, edit_interval=0.05)
+
+    text = asyncio.run(reply.run(fake_provider(chunks, 0.005)))
+
+    placeholder = message.replies[0]
+    assert text == "".join(chunks)
+    assert placeholder.text == text
+    # ~0.2s of streaming at one edit per 50ms, plus the final formatted edit
+    assert 2 <= len(placeholder.edits) <= 8
+
+
+def test_long_replies_spill_into_follow_up_messages():
+    message = FakeMessage()
+    chunks = [f"chunk{i:03d} " for i in range(60)]
+
+    asyncio.run(StreamingReply(message, edit_interval=0, max_length=100).run(fake_provider(chunks, 0)))
+
+    assert len(message.replies) >= 6
+    assert all(len(m.text) <= 100 for m in message.replies)
+    delivered = " ".join(m.text for m in message.replies).split()
+    assert delivered == "".join(chunks).split()
+
+
+def test_time_to_first_token_is_tracked():
+    before = time_to_first_token.count
+    reply = StreamingReply(FakeMessage(), edit_interval=0.05)
+
+    asyncio.run(reply.run(fake_provider(["hello", " world"], 0.02)))
+
+    assert time_to_first_token.count == before + 1
+    assert 0.02 <= reply.first_token_latency < 0.5
+
+
+def test_retry_after_is_honoured():
+    message = FloodedMessage()
+
+    text = asyncio.run(StreamingReply(message, edit_interval=0.01).run(fake_provider(["a", "b", "c"], 0.01)))
+
+    assert message.replies[0].text == text == "abc"
@@ -0,0 +1,74 @@
+import asyncio
+import socket
+
+import httpx
+from telegram.ext import ApplicationBuilder, CallbackQueryHandler, ChatMemberHandler, CommandHandler, MessageHandler, filters
+
+from benchmarks.fake_telegram import FakeTelegram, text_update
+from src.handlers import setup_commands
+from src.handlers.admin import setup_admin
+from src.services.updates import allowed_updates
+
+
+def application(telegram=None):
+    builder = ApplicationBuilder().token("123456:TEST")
+    if telegram is not None:
+        builder = builder.request(telegram).get_updates_request(telegram)
+    return builder.build()
+
+
+async def noop(update, context):
+    pass
+
+
+def test_allowed_updates_follow_the_registered_handlers():
+    app = application()
+    setup_commands(app)
+    setup_admin(app)
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, noop))
+
+    assert allowed_updates(app) == ["callback_query", "message"]
+
+    app.add_handler(ChatMemberHandler(noop, ChatMemberHandler.MY_CHAT_MEMBER))
+    assert allowed_updates(app) == ["callback_query", "message", "my_chat_member"]
+
+
+def test_webhook_rejects_a_wrong_secret_token():
+    telegram = FakeTelegram()
+    app = application(telegram)
+    received = []
+
+    async def handle(update, context):
+        received.append(update.message.text)
+
+    app.add_handler(MessageHandler(filters.TEXT, handle))
+    app.add_handler(CommandHandler("start", noop))
+    app.add_handler(CallbackQueryHandler(noop))
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    async def run():
+        await app.initialize()
+        await app.updater.start_webhook(
+            listen="127.0.0.1", port=port, url_path="hook", secret_token="right",
+            webhook_url="https://example.invalid/hook", allowed_updates=allowed_updates(app)
+        )
+        await app.start()
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            bad = await client.post("/hook", json=text_update(1, 5, "forged"), headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"})
+            missing = await client.post("/hook", json=text_update(2, 5, "forged"))
+            good = await client.post("/hook", json=text_update(3, 5, "hello"), headers={"X-Telegram-Bot-Api-Secret-Token": "right"})
+        for _ in range(100):
+            if received:
+                break
+            await asyncio.sleep(0.01)
+        await app.updater.stop()
+        await app.stop()
+        await app.shutdown()
+        return bad.status_code, missing.status_code, good.status_code
+
+    assert asyncio.run(run()) == (403, 403, 200)
+    assert received == ["hello"]
+    assert telegram.calls["setWebhook"] == 1